@@ -0,0 +1,354 @@
+# backend/benchmarks/run.py
+# Run with: python -m benchmarks.run [--sizes 1000,10000] [--save-baseline]
+#
+# Offline benchmark of the photo pipeline. Everything it touches is synthetic:
+# images, faces and embeddings are generated from fixed seeds, rows go into a
+# throwaway test database and files into a temporary MEDIA_ROOT, so two runs on
+# the same machine measure the same work. Realtime pushes go to an in-memory
+# channel layer instead of Redis.
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import django
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from PIL import Image
+
+from benchmarks.synthetic import EMBEDDING_DIM, make_encodings, make_image, make_queries
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+FULL_SIZES = DEFAULT_SIZES + [1_000_000]
+# Detection / masking / encode run on images of these sizes (px)
+IMAGE_SIZES = [(640, 480), (1600, 1200), (3000, 2000)]
+# Faces per image, and queries per matching run (one per detected face)
+FACES_PER_IMAGE = 8
+# Timings below this (seconds) are noise, never a regression
+NOISE_FLOOR = 0.002
+
+
+def measure(fn, repeat, warmup=1):
+    """Time `fn` `repeat` times after `warmup` untimed calls."""
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    return {
+        'runs': repeat,
+        'min': round(timings[0], 6),
+        'median': round(float(np.median(timings)), 6),
+        'p95': round(float(np.percentile(timings, 95)), 6),
+    }
+
+
+def _jpeg(img_bgr):
+    ok, encoded = cv2.imencode('.jpg', img_bgr, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def _load_engine():
+    from users.face_engine import get_face_engine
+
+    try:
+        return get_face_engine(settings.FACE_MODEL_NAME), None
+    except Exception as e:
+        return None, f"face engine unavailable: {e}"
+
+
+def bench_detection(engine, repeat):
+    results = {}
+    for width, height in IMAGE_SIZES:
+        img, _ = make_image(width, height, faces=FACES_PER_IMAGE)
+        results[f'{width}x{height}'] = measure(lambda: engine.detect(img), repeat)
+    return results
+
+
+def bench_matching(sizes, repeat, workdir):
+    """
+    Match one photo's worth of faces against N known users.
+    The matrix is a memory-mapped file, like a compacted snapshot.
+    """
+    from users.face_index import FaceIndex
+
+    model_version = 'benchmark'
+    results = {}
+    for count in sizes:
+        path = os.path.join(workdir, f'encodings_{count}.f32')
+        matrix = np.memmap(path, dtype=np.float32, mode='w+', shape=(count, EMBEDDING_DIM))
+        offset = 0
+        for chunk in make_encodings(count):
+            matrix[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+        matrix.flush()
+        del matrix
+
+        matrix = np.memmap(path, dtype=np.float32, mode='r', shape=(count, EMBEDDING_DIM))
+        index = FaceIndex(model_version, matrix, np.arange(1, count + 1))
+        queries = make_queries(matrix, FACES_PER_IMAGE)
+        results[str(count)] = measure(lambda: index.match_many(queries, model_version), repeat)
+
+        del index, matrix
+        os.remove(path)
+    return results
+
+
+def _make_fixture():
+    """Uploader, matched users and one photo in the throwaway database."""
+    from photos.models import Photo
+    from users.models import CustomUser
+
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=f'bench_{i}', email=f'bench_{i}@example.com')
+        for i in range(FACES_PER_IMAGE + 1)
+    ])
+    uploader, matched = users[0], users[1:]
+
+    width, height = IMAGE_SIZES[-1]
+    img, boxes = make_image(width, height, faces=FACES_PER_IMAGE)
+    photo = Photo(uploader=uploader)
+    photo.original_image.save('bench.jpg', ContentFile(_jpeg(img)), save=False)
+    photo.save()
+    return photo, matched, boxes
+
+
+def bench_persistence(photo, matched, boxes, repeat):
+    """Write one photo's detected faces and consent requests."""
+    from photos.models import ConsentRequest, DetectedFace
+    from photos.services import _save_detected_face
+
+    bbox_strs = [','.join(str(v) for v in box) for box in boxes]
+
+    def run():
+        DetectedFace.objects.filter(photo=photo).delete()
+        ConsentRequest.objects.filter(photo=photo).delete()
+        found_users_for_consent = set()
+        for bbox_str, user in zip(bbox_strs, matched):
+            _save_detected_face(photo, bbox_str, user, 0.9, False, found_users_for_consent)
+
+    return {'faces': measure(run, repeat)}
+
+
+def bench_masking(repeat):
+    from photos.services import _blur_faces
+
+    results = {}
+    for width, height in IMAGE_SIZES:
+        img, boxes = make_image(width, height, faces=FACES_PER_IMAGE)
+        original = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        bbox_strs = [','.join(str(v) for v in box) for box in boxes]
+        results[f'{width}x{height}'] = measure(lambda: _blur_faces(original.copy(), bbox_strs), repeat)
+    return results
+
+
+def bench_encode(repeat):
+    from photos.services import _encode_public_image
+
+    results = {}
+    for width, height in IMAGE_SIZES:
+        img, _ = make_image(width, height, faces=FACES_PER_IMAGE)
+        image = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        results[f'{width}x{height}'] = measure(lambda: _encode_public_image(image).close(), repeat)
+    return results
+
+
+def bench_end_to_end(photo, repeat):
+    """Full process_photo_for_faces on the fixture photo, including masking and saving."""
+    from photos.models import ConsentRequest, DetectedFace
+    from photos.services import process_photo_for_faces
+
+    def run():
+        # Start from an unprocessed photo every time
+        DetectedFace.objects.filter(photo=photo).delete()
+        ConsentRequest.objects.filter(photo=photo).delete()
+        process_photo_for_faces(photo.id)
+
+    return {'photo': measure(run, repeat)}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(sizes, repeat):
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+            'sizes': sizes,
+            'faces_per_image': FACES_PER_IMAGE,
+        },
+        'stages': {},
+        'skipped': {},
+    }
+    stages = results['stages']
+
+    engine, reason = _load_engine()
+    if engine is not None:
+        results['meta']['model_version'] = engine.model_version
+
+    with tempfile.TemporaryDirectory(prefix='unmask-bench-') as workdir:
+        # Consent requests and notifications push over the channel layer; keep
+        # that in process so persistence timings don't include Redis
+        overrides = override_settings(
+            MEDIA_ROOT=os.path.join(workdir, 'media'),
+            FACE_INDEX_DIR=os.path.join(workdir, 'face_index'),
+            CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+        )
+        overrides.enable()
+
+        setup_test_environment()
+        old_db_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            print("Matching...")
+            stages['matching'] = bench_matching(sizes, repeat, workdir)
+
+            print("Masking / encode...")
+            stages['masking'] = bench_masking(repeat)
+            stages['encode'] = bench_encode(repeat)
+
+            print("DB persistence...")
+            photo, matched, boxes = _make_fixture()
+            stages['persistence'] = bench_persistence(photo, matched, boxes, repeat)
+
+            if engine is not None:
+                print("Detection...")
+                stages['detection'] = bench_detection(engine, repeat)
+                print("End to end...")
+                stages['end_to_end'] = bench_end_to_end(photo, repeat)
+            else:
+                results['skipped']['detection'] = reason
+                results['skipped']['end_to_end'] = reason
+        finally:
+            connection.creation.destroy_test_db(old_db_name, verbosity=0)
+            teardown_test_environment()
+            overrides.disable()
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare stage medians with a baseline.
+
+    Returns:
+        list: (name, baseline median, current median) for every regression
+    """
+    regressions = []
+    for stage, cases in results['stages'].items():
+        for case, timing in cases.items():
+            base = baseline.get('stages', {}).get(stage, {}).get(case)
+            if base is None:
+                continue
+            current, previous = timing['median'], base['median']
+            if current - previous > NOISE_FLOOR and current > previous * (1 + tolerance):
+                regressions.append((f'{stage}/{case}', previous, current))
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'stage':<32}{'min':>10}{'median':>10}{'p95':>10}")
+    for stage, cases in results['stages'].items():
+        for case, timing in cases.items():
+            print(
+                f"{stage + '/' + case:<32}"
+                f"{timing['min'] * 1000:>9.1f}ms{timing['median'] * 1000:>8.1f}ms{timing['p95'] * 1000:>8.1f}ms"
+            )
+    for stage, reason in results['skipped'].items():
+        print(f"{stage:<32}skipped ({reason})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of the photo processing pipeline')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs per case')
+    parser.add_argument(
+        '--sizes',
+        type=lambda value: [int(v) for v in value.split(',')],
+        default=None,
+        help='Comma-separated numbers of known users to match against (default: 1000,10000,100000)',
+    )
+    parser.add_argument('--full', action='store_true', help='Also match against 1,000,000 users')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.25,
+        help='Allowed slowdown of a median vs the baseline (0.25 = 25%%)',
+    )
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    args = parser.parse_args()
+
+    # Per-photo INFO logs would drown the results and time the log handlers too
+    logging.disable(logging.INFO)
+
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+    results = run_benchmarks(sizes, args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline found, nothing to compare (use --save-baseline)")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%} (baseline {baseline['meta'].get('commit')}):")
+        for name, previous, current in regressions:
+            print(f"  {name}: {previous * 1000:.1f}ms -> {current * 1000:.1f}ms ({current / previous - 1:+.0%})")
+        sys.exit(1)
+
+    print(f"\n✅ No regressions vs baseline {baseline['meta'].get('commit')}")
+
+
+if __name__ == "__main__":
+    main()
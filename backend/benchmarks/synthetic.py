@@ -0,0 +1,66 @@
+# backend/benchmarks/synthetic.py
+"""
+Synthetic inputs for the benchmark suite, so runs never depend on the
+contents of a live database or on real people's photos.
+"""
+
+import cv2
+import numpy as np
+
+EMBEDDING_DIM = 512
+
+
+def make_image(width, height, faces=8, seed=0):
+    """
+    A BGR image with a noisy background and `faces` face-like blobs
+    (skin-toned ellipse, eyes, mouth) spread over it.
+
+    Returns:
+        tuple: (image, list of (left, top, right, bottom) boxes)
+    """
+    rng = np.random.default_rng(seed)
+    img = rng.integers(40, 200, size=(height, width, 3), dtype=np.uint8)
+    img = cv2.GaussianBlur(img, (0, 0), 3)
+
+    boxes = []
+    size = max(24, min(width, height) // 12)
+    for _ in range(faces):
+        cx = int(rng.integers(size, width - size))
+        cy = int(rng.integers(size, height - size))
+        half_w, half_h = size // 2, int(size * 0.65)
+
+        cv2.ellipse(img, (cx, cy), (half_w, half_h), 0, 0, 360, (140, 170, 220), -1)
+        eye_dx, eye_y = half_w // 2, cy - half_h // 4
+        cv2.circle(img, (cx - eye_dx, eye_y), max(2, size // 14), (40, 30, 30), -1)
+        cv2.circle(img, (cx + eye_dx, eye_y), max(2, size // 14), (40, 30, 30), -1)
+        cv2.ellipse(img, (cx, cy + half_h // 2), (half_w // 2, max(2, size // 16)), 0, 0, 180, (60, 60, 150), -1)
+
+        boxes.append((cx - half_w, cy - half_h, cx + half_w, cy + half_h))
+
+    return img, boxes
+
+
+def make_encodings(count, dim=EMBEDDING_DIM, seed=0, chunk_size=100_000):
+    """
+    Yield L2-normalised random embeddings in chunks, so a million rows
+    never have to exist twice in memory.
+    """
+    rng = np.random.default_rng(seed)
+    remaining = count
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        chunk = rng.standard_normal((n, dim), dtype=np.float32)
+        chunk /= np.linalg.norm(chunk, axis=1, keepdims=True)
+        yield chunk
+        remaining -= n
+
+
+def make_queries(matrix, count, noise=0.3, seed=1):
+    """
+    Query embeddings close to random rows of `matrix` (a re-photographed
+    known user), so matching follows the same code path as a real hit.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(matrix), size=count)
+    queries = np.asarray(matrix[rows]) + noise * rng.standard_normal((count, matrix.shape[1]), dtype=np.float32) / np.sqrt(matrix.shape[1])
+    return queries.astype(np.float32)
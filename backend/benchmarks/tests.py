@@ -0,0 +1,63 @@
+# backend/benchmarks/tests.py
+"""
+Baseline comparison of the offline benchmark; the benchmarks themselves are not run.
+"""
+
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from benchmarks import run
+
+
+def results(**medians):
+    """Benchmark results with one case per stage, e.g. results(matching=0.010)."""
+    return {
+        'meta': {'commit': 'abc1234'},
+        'stages': {stage: {'case': {'min': median, 'median': median, 'p95': median}} for stage, median in medians.items()},
+        'skipped': {},
+    }
+
+
+class CompareTests(SimpleTestCase):
+    def test_slowdowns_beyond_the_tolerance_are_regressions(self):
+        baseline = results(matching=0.010, masking=0.100)
+        current = results(matching=0.0124, masking=0.130)
+        self.assertEqual(run.compare(current, baseline, 0.25), [('masking/case', 0.100, 0.130)])
+
+    def test_differences_below_the_noise_floor_are_ignored(self):
+        self.assertEqual(run.compare(results(encode=0.0025), results(encode=0.001), 0.25), [])
+
+    def test_cases_missing_from_the_baseline_are_ignored(self):
+        self.assertEqual(run.compare(results(detection=1.0), results(matching=0.010), 0.25), [])
+
+
+class BaselineExitStatusTests(SimpleTestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.baseline = os.path.join(workdir.name, 'baseline.json')
+        with open(self.baseline, 'w') as f:
+            json.dump(results(matching=0.010), f)
+
+    def main(self, current, *args):
+        argv = ['run', '--baseline', self.baseline, *args]
+        with mock.patch.object(run, 'run_benchmarks', return_value=current), \
+                mock.patch.object(run.sys, 'argv', argv), \
+                mock.patch.object(run.logging, 'disable'), \
+                redirect_stdout(io.StringIO()) as output:
+            run.main()
+        return output.getvalue()
+
+    def test_regression_exits_with_status_1(self):
+        with self.assertRaises(SystemExit) as cm:
+            self.main(results(matching=0.020))
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_higher_tolerance_passes(self):
+        self.assertIn('No regressions', self.main(results(matching=0.020), '--tolerance', '1.5'))
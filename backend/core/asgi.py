@@ -13,8 +13,12 @@ django_asgi_app = get_asgi_application()
 
 # Now import Channels components
 from channels.routing import ProtocolTypeRouter, URLRouter
-from direct_chat.routing import websocket_urlpatterns
+from direct_chat.routing import websocket_urlpatterns as chat_urlpatterns
 from direct_chat.middleware import JWTAuthMiddlewareStack
+from notifications.routing import websocket_urlpatterns as notification_urlpatterns
+
+from django.conf import settings
+from users.face_engine import start_warmup
 
 application = ProtocolTypeRouter({
     # HTTP requests → Django's traditional request/response
@@ -22,6 +26,10 @@ application = ProtocolTypeRouter({
     
     # WebSocket requests → Django Channels
     "websocket": JWTAuthMiddlewareStack(  # Removed AllowedHostsOriginValidator for testing
-        URLRouter(websocket_urlpatterns)
+        URLRouter(chat_urlpatterns + notification_urlpatterns)
     ),
-})
\ No newline at end of file
+})
+
+# Load and warm the face models before uploads arrive (/readyz reports progress)
+if settings.FACE_WARMUP_ON_STARTUP:
+    start_warmup()
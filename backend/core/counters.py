@@ -0,0 +1,78 @@
+# backend/core/counters.py
+"""
+Denormalised counters (Photo.like_count, CustomUser.follower_count, ...).
+
+Write paths bump them with `increment` in the same transaction as the row
+they count, as an `UPDATE ... SET n = n + 1`, so concurrent likes never lose
+an update. Paths that bypass that (cascading deletes, bulk inserts, raw SQL)
+leave drift, which `reconcile` recounts; run `manage.py reconcile_counters`
+periodically.
+"""
+
+from collections import namedtuple
+
+from django.apps import apps
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+# `field` on `model` counts the `source` rows whose `source_fk` points at it
+Counter = namedtuple('Counter', ['model', 'field', 'source', 'source_fk'])
+
+COUNTERS = [
+    Counter('photos.Photo', 'like_count', 'interactions.Like', 'photo'),
+    Counter('photos.Photo', 'comment_count', 'interactions.Comment', 'photo'),
+    Counter('users.CustomUser', 'follower_count', 'users.Follow', 'following'),
+    Counter('users.CustomUser', 'following_count', 'users.Follow', 'follower'),
+]
+
+
+def increment(model, pk, **deltas):
+    """
+    increment(Photo, photo.id, like_count=1): atomic, in the database.
+    `auto_now` fields are refreshed too, as save() would.
+    """
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False):
+            updates[field.name] = timezone.now()
+    model.objects.filter(pk=pk).update(**updates)
+
+
+def actual_count(counter):
+    """Expression that counts a counter's source rows for each outer row."""
+    source = apps.get_model(counter.source)
+    counts = source.objects.filter(**{counter.source_fk: OuterRef('pk')}).order_by().values(
+        counter.source_fk
+    ).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def reconcile(counters=None, batch_size=1000, dry_run=False):
+    """
+    Recount in primary-key chunks, so no statement locks more than
+    `batch_size` rows. Only rows that drifted are written.
+
+    Yields:
+        tuple: (counter, rows checked, rows fixed) per chunk
+    """
+    for counter in counters or COUNTERS:
+        model = apps.get_model(counter.model)
+        last_pk = 0
+        while True:
+            chunk = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1]
+
+            drifted = list(
+                model.objects.filter(pk__in=chunk).annotate(
+                    actual=actual_count(counter)
+                ).filter(~Q(**{counter.field: F('actual')})).values_list('pk', flat=True)
+            )
+            if drifted and not dry_run:
+                # Recomputed inside the UPDATE, not from the value just read
+                model.objects.filter(pk__in=drifted).update(**{counter.field: actual_count(counter)})
+            yield counter, len(chunk), len(drifted)
@@ -0,0 +1,44 @@
+# backend/core/etags.py
+"""
+Conditional GET for API views whose content has a cheap version.
+
+A version is a few values that change whenever the response would: typically
+a count and the newest `updated_at` of the rows it shows, one aggregate query.
+The ETag is a hash of the version and the viewer, so a client polling with
+If-None-Match gets a 304 before the view fetches or serializes anything.
+
+Responses are marked `private, no-cache` and vary on Authorization: browsers
+keep them, revalidate on every request (adding If-None-Match themselves) and
+never reuse one account's copy for another.
+"""
+
+import hashlib
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def conditional(version):
+    """
+    Decorate a viewset method with ETag support.
+
+    Args:
+        version: Called like the method, `version(request, *args, **kwargs)`;
+            returns a tuple of values, or None when there's nothing to version
+            (the view then runs as usual, e.g. to return a 404)
+    """
+    def etag(request, *args, **kwargs):
+        parts = version(request, *args, **kwargs)
+        return None if parts is None else make_etag(request.user.pk, *parts)
+
+    return method_decorator([
+        vary_on_headers('Authorization'),
+        cache_control(private=True, no_cache=True),
+        condition(etag_func=etag),
+    ])
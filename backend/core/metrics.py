@@ -0,0 +1,123 @@
+# backend/core/metrics.py
+"""
+Prometheus metrics, served at /metrics.
+
+Workers that run in several processes (gunicorn/uvicorn workers, several daphne
+instances) must share a directory through PROMETHEUS_MULTIPROC_DIR, set in the
+environment before the server starts and emptied on every deploy. Each process
+then writes its samples there and /metrics aggregates all of them. Without the
+variable, the metrics of the serving process alone are reported.
+"""
+
+import atexit
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# Latencies from a few ms (DB, masking) to tens of seconds (tiled detection)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# --- HTTP ---
+REQUEST_LATENCY = Histogram(
+    'unmask_http_request_duration_seconds',
+    'HTTP request latency by view and DRF viewset action',
+    ['view', 'action', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'unmask_http_request_db_queries',
+    'Database queries executed per HTTP request',
+    ['view', 'action', 'method'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'unmask_http_requests_in_progress',
+    'HTTP requests being served',
+    multiprocess_mode='livesum',
+)
+
+# --- FACE PIPELINE ---
+FACE_STAGE_LATENCY = Histogram(
+    'unmask_face_stage_duration_seconds',
+    'Duration of each photo processing stage (see PhotoProcessingRun.STAGES)',
+    ['stage'],
+    buckets=LATENCY_BUCKETS,
+)
+PHOTO_PROCESSING_RUNS = Counter(
+    'unmask_photo_processing_runs',
+    'Finished photo processing runs by outcome',
+    ['outcome'],
+)
+PHOTOS_IN_PROCESSING = Gauge(
+    'unmask_photos_in_processing',
+    'Photos being processed right now (uploads waiting on face processing)',
+    multiprocess_mode='livesum',
+)
+FACES_DETECTED = Counter(
+    'unmask_faces_detected',
+    'Faces found by detection',
+)
+
+# --- RESPONSE CACHE ---
+FEED_CACHE_LOOKUPS = Counter(
+    'unmask_feed_cache_lookups',
+    'Feed/profile response cache lookups; result is hit, miss or stale (found but invalidated)',
+    ['view', 'result'],
+)
+
+# --- WEBSOCKETS ---
+WEBSOCKET_CONNECTIONS = Gauge(
+    'unmask_websocket_connections',
+    'Open WebSocket connections',
+    ['consumer'],
+    multiprocess_mode='livesum',
+)
+CHANNEL_LAYER_LATENCY = Histogram(
+    'unmask_channel_layer_duration_seconds',
+    'Channel layer call latency',
+    ['operation'],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def multiprocess_enabled():
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+if multiprocess_enabled():
+    # Drop this process's live gauges (in-progress, connections) when it exits
+    atexit.register(multiprocess.mark_process_dead, os.getpid())
+
+
+def render_metrics():
+    """
+    Returns:
+        tuple: (body, content type) in the Prometheus text format
+    """
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def observe_processing_run(run):
+    """Record the stage timings and outcome of a finished PhotoProcessingRun."""
+    for stage in run.STAGES:
+        seconds = getattr(run, f'{stage}_seconds')
+        if seconds is not None:
+            FACE_STAGE_LATENCY.labels(stage=stage).observe(seconds)
+    PHOTO_PROCESSING_RUNS.labels(outcome=run.outcome).inc()
+    FACES_DETECTED.inc(run.faces_detected)
+
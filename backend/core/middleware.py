@@ -0,0 +1,280 @@
+# backend/core/middleware.py
+
+import contextvars
+import cProfile
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import REQUEST_LATENCY, REQUEST_QUERIES, REQUESTS_IN_PROGRESS
+
+logger = logging.getLogger('core')
+
+
+class QueryStats:
+    """Execute wrapper that counts queries and the time spent in the database."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start_time = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start_time
+
+
+def _view_labels(request, view_func):
+    """
+    (view, action) labels for a resolved view. DRF viewsets report the action
+    the router mapped the method to ('list', 'retrieve', 'follow', ...).
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    view = view_class.__name__ if view_class else getattr(view_func, '__name__', 'unknown')
+
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), '')
+    return view, action
+
+
+class MetricsMiddleware:
+    """
+    Records latency and database query count of every request, labelled by
+    view and viewset action. Unresolved URLs (404s) share one label so random
+    paths can't blow up the number of series.
+
+    The request's QueryStats is left on `request.query_stats` for the
+    middleware below it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_stats = request.query_stats = QueryStats()
+
+        start_time = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            with connection.execute_wrapper(query_stats):
+                response = self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+        duration = time.perf_counter() - start_time
+
+        view, action = getattr(request, '_metrics_labels', ('unresolved', ''))
+        REQUEST_LATENCY.labels(
+            view=view,
+            action=action,
+            method=request.method,
+            status=f'{response.status_code // 100}xx'
+        ).observe(duration)
+        REQUEST_QUERIES.labels(view=view, action=action, method=request.method).observe(query_stats.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_labels = _view_labels(request, view_func)
+        return None
+
+
+# Server-Timing of the request being served, for serializers to add their time to
+_request_timings = contextvars.ContextVar('server_timing', default=None)
+
+
+@contextmanager
+def serializer_timing():
+    """
+    Add the time spent in the block to the request's `serialize` timing
+    (core.serializers.TimedSerializerMixin). Nested blocks count once, and
+    outside a timed request this is a no-op.
+    """
+    timings = _request_timings.get()
+    if timings is None or timings.get('serializing'):
+        yield
+        return
+
+    timings['serializing'] = True
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings['serialize'] = timings.get('serialize', 0.0) + time.perf_counter() - start_time
+        timings['serializing'] = False
+
+
+class ServerTimingMiddleware:
+    """
+    Adds a Server-Timing header, visible in the browser's network panel:
+
+        Server-Timing: db;dur=12.1;desc="7 queries", view;dur=18.3, serialize;dur=12.2, render;dur=4.2, total;dur=36.0
+
+    `view` runs from URL resolution until the view returns, minus `serialize`,
+    the time the project's serializers (TimedSerializerMixin) spent producing
+    the response data, their lazy queries included. `render` is DRF turning the data into JSON. `db`
+    overlaps the others. Disabled with SERVER_TIMING_ENABLED = False.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SERVER_TIMING_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        query_stats = getattr(request, 'query_stats', None)
+        if query_stats is None:
+            query_stats = request.query_stats = QueryStats()
+            with connection.execute_wrapper(query_stats):
+                return self._timed(request, query_stats)
+        return self._timed(request, query_stats)
+
+    def _timed(self, request, query_stats):
+        timings = request._server_timing = {}
+        token = _request_timings.set(timings)
+        start_time = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        total = time.perf_counter() - start_time
+
+        view_start = timings.get('view_start')
+        view_end = timings.get('view_end', time.perf_counter() - timings.get('render', 0.0))
+        serialize = timings.get('serialize')
+
+        metrics = [f'db;dur={query_stats.seconds * 1000:.1f};desc="{query_stats.count} queries"']
+        if view_start is not None:
+            metrics.append(f'view;dur={(view_end - view_start - (serialize or 0.0)) * 1000:.1f}')
+        if serialize is not None:
+            metrics.append(f'serialize;dur={serialize * 1000:.1f}')
+        if 'render' in timings:
+            metrics.append(f'render;dur={timings["render"] * 1000:.1f}')
+        metrics.append(f'total;dur={total * 1000:.1f}')
+
+        response['Server-Timing'] = ', '.join(metrics)
+        # Cross-origin frontends can only read Server-Timing with this header
+        response['Timing-Allow-Origin'] = getattr(settings, 'SERVER_TIMING_ALLOW_ORIGIN', '*')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.enabled:
+            request._server_timing['view_start'] = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        """Render here, so rendering is timed separately from the view."""
+        timings = request.__dict__.get('_server_timing')
+        if not timings or 'view_start' not in timings:
+            return response
+
+        timings['view_end'] = time.perf_counter()
+        response.render()
+        timings['render'] = time.perf_counter() - timings['view_end']
+        return response
+
+
+def _authenticated_staff(request):
+    """
+    The API authenticates with JWT inside DRF views, after middleware has run,
+    so the token is checked here. Only done for requests asking for a profile.
+    """
+    if request.user.is_authenticated:
+        return request.user.is_staff
+
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def get_profile_dir():
+    return str(getattr(settings, 'PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles')))
+
+
+def _prune_profiles(profile_dir, keep):
+    artifacts = sorted(
+        (os.path.join(profile_dir, name) for name in os.listdir(profile_dir)),
+        key=os.path.getmtime
+    )
+    for path in artifacts[:-keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a single request for staff users who send `X-Profile: cprofile`
+    (deterministic, a .prof file for pstats/snakeviz) or `X-Profile: pyinstrument`
+    (statistical, an HTML report; needs `pip install pyinstrument`).
+
+    The artifact is saved under PROFILE_DIR and the response carries
+    X-Profile-Id and X-Profile-Url, the staff-only download link.
+    Requests without the header only pay for one dict lookup.
+    """
+
+    PROFILERS = {'cprofile': 'prof', 'pyinstrument': 'html'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler_name = request.META.get('HTTP_X_PROFILE')
+        if not profiler_name:
+            return self.get_response(request)
+
+        profiler_name = profiler_name.strip().lower()
+        if profiler_name not in self.PROFILERS or not _authenticated_staff(request):
+            response = self.get_response(request)
+            response['X-Profile-Error'] = 'Profiling is available to staff with X-Profile: cprofile|pyinstrument'
+            return response
+
+        if profiler_name == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                response = self.get_response(request)
+                response['X-Profile-Error'] = 'pyinstrument is not installed'
+                return response
+            profiler = Profiler(interval=getattr(settings, 'PROFILE_SAMPLE_INTERVAL', 0.001))
+            start, stop = profiler.start, profiler.stop
+        else:
+            profiler = cProfile.Profile()
+            start, stop = profiler.enable, profiler.disable
+
+        start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop()
+
+        profile_id = uuid.uuid4().hex
+        profile_dir = get_profile_dir()
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f'{profile_id}.{self.PROFILERS[profiler_name]}')
+
+        if profiler_name == 'pyinstrument':
+            with open(path, 'w') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.dump_stats(path)
+        _prune_profiles(profile_dir, getattr(settings, 'PROFILE_MAX_ARTIFACTS', 50))
+
+        logger.info(f"[Profiling] {request.method} {request.path} profiled with {profiler_name}: {profile_id}")
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-Url'] = f'/api/profiles/{profile_id}/'
+        return response
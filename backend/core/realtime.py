@@ -0,0 +1,39 @@
+# backend/core/realtime.py
+"""
+Server-initiated WebSocket events for one user.
+
+Every socket a user opens joins their group, `user_<id>`, so an event sent
+there reaches all of their tabs and devices. Sends are best-effort: with the
+channel layer down the write still succeeds, and clients catch up from the
+REST endpoints when they next load or reconnect.
+"""
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from core.metrics import CHANNEL_LAYER_LATENCY
+
+logger = logging.getLogger('core')
+
+
+def user_group(user_id):
+    return f'user_{user_id}'
+
+
+def group_send(group, message):
+    """Best-effort group_send from synchronous code."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        with CHANNEL_LAYER_LATENCY.labels(operation='group_send').time():
+            async_to_sync(layer.group_send)(group, message)
+    except Exception as e:
+        logger.warning(f"[Realtime] Could not send {message['type']} to {group}: {e}")
+
+
+def send_to_user(user_id, event, **payload):
+    """Deliver {"type": event, **payload} to every open socket of the user."""
+    group_send(user_group(user_id), {'type': 'user.event', 'event': {'type': event, **payload}})
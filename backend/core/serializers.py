@@ -0,0 +1,15 @@
+# backend/core/serializers.py
+
+from .middleware import serializer_timing
+
+
+class TimedSerializerMixin:
+    """
+    Reports the time spent turning objects into data as the `serialize` entry
+    of the Server-Timing header (ServerTimingMiddleware). Goes before the DRF
+    serializer class in the bases.
+    """
+
+    def to_representation(self, instance):
+        with serializer_timing():
+            return super().to_representation(instance)
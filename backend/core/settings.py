@@ -35,9 +35,12 @@ INSTALLED_APPS = [
     'photos.apps.PhotosConfig',
     'interactions.apps.InteractionsConfig',
     'direct_chat.apps.DirectChatConfig',  # ADD THIS
+    'notifications.apps.NotificationsConfig',
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",  # Outermost, so it times the whole stack
+    "core.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # <-- Add this here
@@ -46,6 +49,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.ProfilingMiddleware",  # Staff-only, opt-in with the X-Profile header
 ]
 
 ROOT_URLCONF = "core.urls"
@@ -136,6 +140,9 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Let the frontend read the profiling headers (Server-Timing needs Timing-Allow-Origin instead)
+CORS_EXPOSE_HEADERS = ['X-Profile-Id', 'X-Profile-Url', 'X-Profile-Error']
+
 # --- DJANGO REST FRAMEWORK ---
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -144,6 +151,52 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# --- PHOTO FEED ---
+# Photos per page of /api/photos/; clients may ask for up to the max with ?page_size=
+PHOTO_FEED_PAGE_SIZE = 20
+PHOTO_FEED_MAX_PAGE_SIZE = 100
+# Latest comments embedded in each feed photo; the rest are at /api/photos/<id>/comments/
+PHOTO_COMMENT_PREVIEW_SIZE = 2
+
+# --- CACHE ---
+# 'default' is per process. With several server processes, set FEED_CACHE_ALIAS
+# to 'shared' so that invalidations reach every process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'unmask-default',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    },
+}
+
+# Serialized feed/timeline/profile pages per viewer (photos/cache.py)
+FEED_CACHE_ENABLED = True
+FEED_CACHE_ALIAS = 'default'
+FEED_CACHE_TIMEOUT = 300  # seconds; bounds staleness of what isn't invalidated explicitly
+
+# --- HOME TIMELINE ---
+# Accounts with this many followers aren't fanned out on write; their photos
+# are merged into followers' timelines when read
+TIMELINE_FANOUT_LIMIT = 10000
+# Recent photos copied into a timeline on a new follow
+TIMELINE_BACKFILL_SIZE = 50
+
+# --- USER DIRECTORY ---
+# Most matches /api/users/search/ returns across all its pages
+USER_SEARCH_MAX_RESULTS = 50
+# Follow suggestions stored per user by compute_follow_suggestions (users/suggestions.py)
+FOLLOW_SUGGESTIONS_PER_USER = 20
+
+# --- NOTIFICATIONS ---
+# Inbox changes within this many seconds reach a socket as one message
+NOTIFICATION_BATCH_SECONDS = 2
+# Most entries sent when a socket connects (or reconnects with ?since=)
+NOTIFICATION_CATCH_UP_SIZE = 50
+
 
 from datetime import timedelta
 
@@ -164,6 +217,66 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# --- FACE RECOGNITION ---
+# Default InsightFace model pack. Once a FaceModelVersion is activated
+# (see `manage.py reembed_faces`), the active version takes precedence.
+FACE_MODEL_NAME = 'buffalo_l'
+FACE_DET_SIZE = (640, 640)
+# 'adaptive' sizes detection to the image and tiles very large photos so small
+# faces in crowd shots are still found (and masked); 'fixed' always uses FACE_DET_SIZE
+FACE_DETECTION_MODE = 'adaptive'
+FACE_ADAPTIVE_MAX_DET_SIZE = 1280
+# Smallest face (px in the original photo) adaptive detection guarantees to look for
+FACE_MIN_FACE_SIZE = 24
+# Seconds of detection after which remaining tiles are skipped
+FACE_DETECTION_TIME_BUDGET = 8.0
+# Faces smaller than this (px) or with a lower detector score are masked but
+# never sent through recognition, since they cannot match reliably
+FACE_RECOGNITION_MIN_SIZE = 40
+FACE_RECOGNITION_MIN_SCORE = 0.6
+FACE_EXECUTION_PROVIDERS = ['CUDAExecutionProvider', 'CPUExecutionProvider']
+# Cosine similarity above which a detected face is matched to a user (InsightFace: 0.5 - 0.6)
+FACE_MATCH_THRESHOLD = 0.5
+# Users can register extra reference images; each user is still one index row
+# (the quality-weighted centroid of their references)
+FACE_MAX_REFERENCES = 10
+# Reference faces smaller than this (px) get a proportionally lower centroid weight
+FACE_REFERENCE_MIN_SIZE = 112
+# Re-uploads whose perceptual hash is within this many bits (of 64) of an earlier
+# photo by the same uploader reuse its faces instead of running detection
+PHOTO_DUPLICATE_MAX_DISTANCE = 6
+PHOTO_DUPLICATE_LOOKBACK = 200
+# Server processes (core.asgi / core.wsgi) load and warm the face engine at
+# startup; /readyz answers 503 until that is done. When off, /readyz is ready
+# straight away and the first upload loads the engine
+FACE_WARMUP_ON_STARTUP = True
+# Detector input sizes to run a dummy inference at (whole-image passes and tiles)
+FACE_WARMUP_SIZES = [(640, 640), (960, 960), (1280, 1280)]
+# Memory-mapped embedding snapshots shared by every worker process
+FACE_INDEX_DIR = BASE_DIR / 'face_index'
+# Embeddings saved since the last snapshot before `build_face_index --if-needed`
+# writes a new one (run it from cron; lookups never write snapshots)
+FACE_INDEX_COMPACT_THRESHOLD = 1000
+
+# --- METRICS ---
+# Prometheus metrics are served at /metrics (see core/metrics.py). With more than
+# one worker process, export PROMETHEUS_MULTIPROC_DIR (an empty, writable
+# directory) before starting the server so every worker's samples are aggregated.
+# Only scrapers on these networks (REMOTE_ADDR, so the proxy's address when
+# behind one) may read /metrics; others need `Authorization: Bearer <METRICS_TOKEN>`
+METRICS_ALLOWED_NETWORKS = ['127.0.0.1', '::1']
+METRICS_TOKEN = None
+
+# --- PROFILING ---
+# Server-Timing header (db, view, serialize, render, total) on every response
+SERVER_TIMING_ENABLED = True
+SERVER_TIMING_ALLOW_ORIGIN = '*'
+# Staff requests with `X-Profile: cprofile` or `X-Profile: pyinstrument`
+# (pyinstrument is optional: pip install pyinstrument) are saved here
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_SAMPLE_INTERVAL = 0.001
+PROFILE_MAX_ARTIFACTS = 50
+
 # --- LOGGING CONFIGURATION ---
 LOGGING = {
     "version": 1,
@@ -207,6 +320,16 @@ LOGGING = {
             "level": "DEBUG",
             "propagate": False,
         },
+        "notifications": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "core": { # Middleware (metrics, profiling)
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
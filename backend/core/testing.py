@@ -0,0 +1,40 @@
+# backend/core/testing.py
+"""
+Fixtures shared by the apps' test modules.
+"""
+
+from interactions.models import Comment, Like
+from photos.models import Photo
+from users.models import CustomUser
+
+
+def seed_users(count, prefix='user'):
+    return CustomUser.objects.bulk_create([
+        CustomUser(username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com')
+        for i in range(count)
+    ])
+
+
+def seed_photos(uploader, users, count, likes_per_photo=5, comments_per_photo=3):
+    """Photos with likes and comments, inserted without running Photo.save()'s image processing."""
+    photos = Photo.objects.bulk_create([
+        Photo(
+            uploader=uploader,
+            original_image=f'photos/originals/seed_{uploader.id}_{i}.jpg',
+            caption=f'Photo {i}',
+            like_count=len(users[:likes_per_photo]),
+            comment_count=comments_per_photo,
+        )
+        for i in range(count)
+    ])
+    Like.objects.bulk_create([
+        Like(photo=photo, user=user)
+        for photo in photos
+        for user in users[:likes_per_photo]
+    ])
+    Comment.objects.bulk_create([
+        Comment(photo=photo, user=users[i % len(users)], text=f'Comment {i}')
+        for photo in photos
+        for i in range(comments_per_photo)
+    ])
+    return photos
@@ -0,0 +1,197 @@
+# backend/core/tests.py
+"""
+Health checks, metrics and request profiling.
+"""
+
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import middleware
+from core.metrics import observe_processing_run
+from photos.models import Photo, PhotoProcessingRun
+from photos.serializers import PhotoSerializer
+from core.testing import seed_photos, seed_users
+from users import face_engine
+
+
+class HealthCheckTests(TestCase):
+    def warmup_state(self, **state):
+        return mock.patch.dict(face_engine._warmup_state, {
+            'model_version': 'buffalo_l', 'loaded': False, 'warm': False, 'seconds': None, 'error': None, **state
+        })
+
+    def test_healthz(self):
+        response = self.client.get('/healthz/')
+        self.assertEqual((response.status_code, response.json()), (200, {'status': 'ok'}))
+
+    @override_settings(FACE_WARMUP_ON_STARTUP=True)
+    def test_readyz_once_the_engine_is_warm(self):
+        with self.warmup_state(loaded=True):
+            response = self.client.get('/readyz/')
+        self.assertEqual((response.status_code, response.json()['status']), (503, 'warming_up'))
+
+        with self.warmup_state(loaded=True, warm=True, seconds=1.5):
+            response = self.client.get('/readyz/')
+        self.assertEqual((response.status_code, response.json()['status']), (200, 'ready'))
+
+    @override_settings(FACE_WARMUP_ON_STARTUP=True)
+    def test_readyz_reports_a_failed_warmup(self):
+        with self.warmup_state(error='model pack not found'):
+            response = self.client.get('/readyz/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'failed')
+        self.assertEqual(response.json()['error'], 'model pack not found')
+
+    @override_settings(FACE_WARMUP_ON_STARTUP=False)
+    def test_readyz_without_startup_warmup(self):
+        with self.warmup_state():
+            response = self.client.get('/readyz/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['status'], response.json()['warmup']), ('ready', 'disabled'))
+
+
+class MetricsEndpointTests(TestCase):
+    def test_renders_request_and_processing_histograms(self):
+        labels = {'view': 'healthz', 'action': '', 'method': 'GET', 'status': '2xx'}
+        requests = REGISTRY.get_sample_value('unmask_http_request_duration_seconds_count', labels) or 0
+        stages = REGISTRY.get_sample_value('unmask_face_stage_duration_seconds_count', {'stage': 'total'}) or 0
+
+        self.client.get('/healthz/')
+        observe_processing_run(PhotoProcessingRun(outcome='SUCCESS', detection_seconds=0.5, total_seconds=0.8))
+
+        self.assertEqual(REGISTRY.get_sample_value('unmask_http_request_duration_seconds_count', labels), requests + 1)
+        self.assertEqual(REGISTRY.get_sample_value('unmask_face_stage_duration_seconds_count', {'stage': 'total'}), stages + 1)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('unmask_http_request_duration_seconds_bucket{', body)
+        self.assertIn('unmask_face_stage_duration_seconds_bucket{', body)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=['10.0.0.0/8'], METRICS_TOKEN='s3cret')
+    def test_only_allowed_networks_or_the_token(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+        self.assertEqual(self.client.get(
+            '/metrics', REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION='Bearer s3cret'
+        ).status_code, 200)
+        self.assertEqual(self.client.get(
+            '/metrics', REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=[], METRICS_TOKEN=None)
+    def test_no_token_configured_never_matches(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer None').status_code, 403)
+
+
+def server_timing(response):
+    """{'db': 1.2, 'view': 3.4, ...} from the Server-Timing header."""
+    metrics = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, duration = metric.split(';')[:2]
+        metrics[name] = float(duration.removeprefix('dur='))
+    return metrics
+
+
+@override_settings(FEED_CACHE_ENABLED=False)
+class ServerTimingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(3)
+        seed_photos(cls.users[0], cls.users, 3)
+
+    def test_drf_views_report_every_stage(self):
+        self.client.force_authenticate(self.users[1])
+        original = serializers.ModelSerializer.to_representation
+
+        def slow_representation(serializer, instance):
+            if isinstance(serializer, PhotoSerializer):
+                time.sleep(0.02)
+            return original(serializer, instance)
+
+        # Beneath TimedSerializerMixin, like any slow field
+        with mock.patch.object(serializers.ModelSerializer, 'to_representation', slow_representation):
+            response = self.client.get(reverse('photo-list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Timing-Allow-Origin'], '*')
+        metrics = server_timing(response)
+        self.assertEqual(list(metrics), ['db', 'view', 'serialize', 'render', 'total'])
+        # Three photos serialized inside one timed (outermost) serializer
+        self.assertGreaterEqual(metrics['serialize'], 60)
+        self.assertLess(metrics['view'], metrics['serialize'])
+        self.assertLessEqual(metrics['view'] + metrics['serialize'] + metrics['render'], metrics['total'])
+
+    def test_plain_views_have_no_serialize_or_render(self):
+        self.assertEqual(list(server_timing(self.client.get('/healthz/'))), ['db', 'view', 'total'])
+
+    def test_serializers_outside_requests_are_not_timed(self):
+        photo = Photo.objects.first()
+        with mock.patch.object(middleware.time, 'perf_counter') as perf_counter:
+            PhotoSerializer(photo).data
+        perf_counter.assert_not_called()
+
+
+class ProfilingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.staff = seed_users(2)
+        cls.staff.is_staff = True
+        cls.staff.save(update_fields=['is_staff'])
+
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        self.profile_dir = profile_dir.name
+        settings = override_settings(PROFILE_DIR=self.profile_dir, PROFILE_MAX_ARTIFACTS=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def authorization(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+    def test_staff_get_a_downloadable_profile(self):
+        response = self.client.get('/healthz/', HTTP_X_PROFILE='cprofile', **self.authorization(self.staff))
+        profile_id = response['X-Profile-Id']
+        self.assertEqual(response['X-Profile-Url'], f'/api/profiles/{profile_id}/')
+        self.assertEqual(os.listdir(self.profile_dir), [f'{profile_id}.prof'])
+
+        download = self.client.get(response['X-Profile-Url'], **self.authorization(self.staff))
+        self.assertEqual(download.status_code, 200)
+        self.assertIn(f'{profile_id}.prof', download['Content-Disposition'])
+
+        self.assertEqual(self.client.get(response['X-Profile-Url'], **self.authorization(self.user)).status_code, 403)
+        self.assertEqual(self.client.get(response['X-Profile-Url']).status_code, 401)
+
+    def test_only_staff_can_profile(self):
+        for headers in ({}, self.authorization(self.user), {'HTTP_AUTHORIZATION': 'Bearer invalid'}):
+            response = self.client.get('/healthz/', HTTP_X_PROFILE='cprofile', **headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('X-Profile-Error', response)
+            self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_unknown_profiler_and_profile_ids(self):
+        response = self.client.get('/healthz/', HTTP_X_PROFILE='perf', **self.authorization(self.staff))
+        self.assertIn('X-Profile-Error', response)
+
+        for profile_id in ('0' * 32, '..%2F..%2Fsettings'):
+            self.assertEqual(
+                self.client.get(f'/api/profiles/{profile_id}/', **self.authorization(self.staff)).status_code, 404
+            )
+
+    def test_old_artifacts_are_pruned(self):
+        for _ in range(3):
+            self.client.get('/healthz/', HTTP_X_PROFILE='cprofile', **self.authorization(self.staff))
+        self.assertEqual(len(os.listdir(self.profile_dir)), 2)
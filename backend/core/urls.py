@@ -18,6 +18,8 @@ from drf_spectacular.views import (
     SpectacularRedocView
 )
 
+from .views import healthz, metrics, profile_artifact, readyz
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -26,15 +28,27 @@ urlpatterns = [
     path('api/', include('photos.urls')),
     path('api/', include('interactions.urls')),
     path('api/', include('direct_chat.urls')), 
+    path('api/', include('notifications.urls')),
 
     # JWT Token Authentication URLs
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
+    # Request profiles recorded with the X-Profile header (staff only)
+    path('api/profiles/<str:profile_id>/', profile_artifact, name='profile-artifact'),
+
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+
+    # Load balancer probes
+    path('healthz/', healthz, name='healthz'),
+    path('readyz/', readyz, name='readyz'),
+
+    # Prometheus scrape target (no trailing slash, Prometheus' default path);
+    # restricted to METRICS_ALLOWED_NETWORKS or METRICS_TOKEN
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
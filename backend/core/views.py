@@ -0,0 +1,93 @@
+# backend/core/views.py
+"""
+Liveness and readiness probes for load balancers, Prometheus metrics and
+request profile downloads.
+"""
+
+import hmac
+import ipaddress
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from users.face_engine import get_warmup_state
+from .metrics import render_metrics
+from .middleware import ProfilingMiddleware, get_profile_dir
+
+
+def healthz(request):
+    """The process is up and serving requests."""
+    return JsonResponse({'status': 'ok'})
+
+
+def readyz(request):
+    """
+    The face engine is loaded and warm, so uploads won't pay the
+    first-inference penalty. Returns 503 until then.
+
+    With FACE_WARMUP_ON_STARTUP off nothing warms the engine (the first upload
+    loads it), so there is nothing to wait for and the process is ready.
+    """
+    state = get_warmup_state()
+    if not settings.FACE_WARMUP_ON_STARTUP:
+        return JsonResponse({'status': 'ready', 'warmup': 'disabled', **state})
+
+    ready = state['loaded'] and state['warm']
+    if ready:
+        status = 'ready'
+    elif state['error']:
+        status = 'failed'
+    else:
+        status = 'warming_up'
+    return JsonResponse(
+        {'status': status, **state},
+        status=200 if ready else 503
+    )
+
+
+def _metrics_allowed(request):
+    """The scraper is on an allowed network or sends METRICS_TOKEN as a bearer token."""
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        address = None
+    networks = getattr(settings, 'METRICS_ALLOWED_NETWORKS', ['127.0.0.1', '::1'])
+    if address and any(address in ipaddress.ip_network(network) for network in networks):
+        return True
+
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint (all worker processes when multiprocess mode is on).
+    Only for METRICS_ALLOWED_NETWORKS or requests carrying METRICS_TOKEN.
+    """
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def profile_artifact(request, profile_id):
+    """
+    Download a request profile recorded by ProfilingMiddleware.
+    GET /api/profiles/{id}/
+    """
+    if not re.fullmatch(r'[0-9a-f]{32}', profile_id):
+        raise Http404
+
+    profile_dir = get_profile_dir()
+    for extension in ProfilingMiddleware.PROFILERS.values():
+        path = os.path.join(profile_dir, f'{profile_id}.{extension}')
+        if os.path.exists(path):
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+    raise Http404
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+from users.face_engine import start_warmup  # noqa: E402
+
+# Load and warm the face models before uploads arrive (/readyz reports progress)
+if settings.FACE_WARMUP_ON_STARTUP:
+    start_warmup()
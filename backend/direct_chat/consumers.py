@@ -7,6 +7,8 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.utils import timezone
+from core.metrics import CHANNEL_LAYER_LATENCY, WEBSOCKET_CONNECTIONS
+from core.realtime import user_group
 from .models import Conversation, Message
 from .serializers import MessageSerializer
 import logging
@@ -38,6 +40,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             "created_at": "2025-01-15T10:30:00Z"
         }
     }
+
+    The socket also carries events for the user themselves, such as
+    { "type": "consent_count", "pending": 3 } (core/realtime.py).
     """
     
     async def connect(self):
@@ -54,13 +59,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         # Accept the connection
         await self.accept()
+        self.counted_connection = True
+        WEBSOCKET_CONNECTIONS.labels(consumer='chat').inc()
         logger.info(f"WebSocket connected: {self.user.username}")
         
+        # Events for this user alone (badge counts), see core/realtime.py
+        with CHANNEL_LAYER_LATENCY.labels(operation='group_add').time():
+            await self.channel_layer.group_add(user_group(self.user.id), self.channel_name)
+
         # Join all conversation groups for this user
         conversations = await self.get_user_conversations()
         for conversation in conversations:
             group_name = f"chat_{conversation.id}"
-            await self.channel_layer.group_add(group_name, self.channel_name)
+            with CHANNEL_LAYER_LATENCY.labels(operation='group_add').time():
+                await self.channel_layer.group_add(group_name, self.channel_name)
             logger.debug(f"{self.user.username} joined group: {group_name}")
         
         # Send connection confirmation
@@ -73,12 +85,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """
         Called when WebSocket connection is closed.
         """
+        if getattr(self, 'counted_connection', False):
+            WEBSOCKET_CONNECTIONS.labels(consumer='chat').dec()
+            self.counted_connection = False
+
         if hasattr(self, 'user') and not self.user.is_anonymous:
+            with CHANNEL_LAYER_LATENCY.labels(operation='group_discard').time():
+                await self.channel_layer.group_discard(user_group(self.user.id), self.channel_name)
+
             # Leave all conversation groups
             conversations = await self.get_user_conversations()
             for conversation in conversations:
                 group_name = f"chat_{conversation.id}"
-                await self.channel_layer.group_discard(group_name, self.channel_name)
+                with CHANNEL_LAYER_LATENCY.labels(operation='group_discard').time():
+                    await self.channel_layer.group_discard(group_name, self.channel_name)
             
             logger.info(f"WebSocket disconnected: {self.user.username} (code: {close_code})")
     
@@ -138,13 +158,14 @@ class ChatConsumer(AsyncWebsocketConsumer):
             
             # Broadcast to conversation group
             group_name = f"chat_{conversation_id}"
-            await self.channel_layer.group_send(
-                group_name,
-                {
-                    'type': 'chat_message_broadcast',
-                    'message': message_data
-                }
-            )
+            with CHANNEL_LAYER_LATENCY.labels(operation='group_send').time():
+                await self.channel_layer.group_send(
+                    group_name,
+                    {
+                        'type': 'chat_message_broadcast',
+                        'message': message_data
+                    }
+                )
             
             logger.info(f"Message {message.id} sent by {self.user.username} to conversation {conversation_id}")
     
@@ -165,15 +186,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         # Broadcast typing indicator
         group_name = f"chat_{conversation_id}"
-        await self.channel_layer.group_send(
-            group_name,
-            {
-                'type': 'typing_indicator_broadcast',
-                'user_id': self.user.id,
-                'username': self.user.username,
-                'is_typing': is_typing
-            }
-        )
+        with CHANNEL_LAYER_LATENCY.labels(operation='group_send').time():
+            await self.channel_layer.group_send(
+                group_name,
+                {
+                    'type': 'typing_indicator_broadcast',
+                    'user_id': self.user.id,
+                    'username': self.user.username,
+                    'is_typing': is_typing
+                }
+            )
     
     async def handle_mark_read(self, data):
         """
@@ -216,6 +238,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'is_typing': event['is_typing']
             }))
     
+    async def user_event(self, event):
+        """
+        An event for this user from core.realtime.send_to_user, e.g.
+        {"type": "consent_count", "pending": 3}. Sent as is.
+        """
+        await self.send(text_data=json.dumps(event['event']))
+
     # Database operations (sync functions wrapped with database_sync_to_async)
     
     @database_sync_to_async
@@ -21,8 +21,11 @@ class Conversation(models.Model):
         return f"Conversation: {participant_names}"
     
     def get_other_participant(self, user):
-        """Get the other participant in a 1-on-1 conversation"""
-        return self.participants.exclude(id=user.id).first()
+        """
+        Get the other participant in a 1-on-1 conversation.
+        Filters in Python so prefetched participants are reused.
+        """
+        return next((p for p in self.participants.all() if p.id != user.id), None)
 
 
 class Message(models.Model):
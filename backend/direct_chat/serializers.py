@@ -1,16 +1,17 @@
 # backend/direct_chat/serializers.py
 from rest_framework import serializers
+from core.serializers import TimedSerializerMixin
 from .models import Conversation, Message
 from users.models import CustomUser
 
-class MessageSenderSerializer(serializers.ModelSerializer):
+class MessageSenderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Minimal user info for message sender"""
     class Meta:
         model = CustomUser
         fields = ['id', 'username', 'profile_pic']
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for messages"""
     sender = MessageSenderSerializer(read_only=True)
     
@@ -20,14 +21,14 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'sender', 'created_at']
 
 
-class ConversationParticipantSerializer(serializers.ModelSerializer):
+class ConversationParticipantSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Minimal user info for conversation participants"""
     class Meta:
         model = CustomUser
         fields = ['id', 'username', 'profile_pic']
 
 
-class ConversationSerializer(serializers.ModelSerializer):
+class ConversationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for conversations"""
     participants = ConversationParticipantSerializer(many=True, read_only=True)
     last_message = serializers.SerializerMethodField()
@@ -48,12 +49,19 @@ class ConversationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'last_message_at']
     
     def get_last_message(self, obj):
-        last_msg = obj.messages.first()  # Already ordered by -created_at
+        # Prefetched by ConversationViewSet; single conversations query it
+        if hasattr(obj, 'latest_messages'):
+            last_msg = obj.latest_messages[0] if obj.latest_messages else None
+        else:
+            last_msg = obj.messages.select_related('sender').first()  # Already ordered by -created_at
         if last_msg:
             return MessageSerializer(last_msg).data
         return None
     
     def get_unread_count(self, obj):
+        # Annotated by ConversationViewSet
+        if hasattr(obj, 'unread'):
+            return obj.unread
         user = self.context['request'].user
         return obj.messages.filter(is_read=False).exclude(sender=user).count()
     
@@ -65,7 +73,7 @@ class ConversationSerializer(serializers.ModelSerializer):
         return None
 
 
-class ConversationCreateSerializer(serializers.Serializer):
+class ConversationCreateSerializer(TimedSerializerMixin, serializers.Serializer):
     """Serializer for creating a conversation"""
     user_id = serializers.IntegerField()
     
@@ -1,3 +1,80 @@
-from django.test import TestCase
+# backend/direct_chat/tests.py
+"""
+Query budgets for the conversation and message endpoints.
+"""
 
-# Create your tests here.
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core.testing import seed_users
+from .models import Conversation, Message
+
+
+class ChatQueryCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(15)
+        cls.viewer = cls.users[0]
+        cls.conversations = cls.seed_conversations(cls.users[1:6], messages_per_conversation=10)
+
+    @classmethod
+    def seed_conversations(cls, others, messages_per_conversation):
+        conversations = []
+        for other in others:
+            conversation = Conversation.objects.create()
+            conversation.participants.add(cls.viewer, other)
+            Message.objects.bulk_create([
+                Message(
+                    conversation=conversation,
+                    sender=cls.viewer if i % 2 else other,
+                    text=f'Message {i}',
+                    is_read=i % 3 == 0
+                )
+                for i in range(messages_per_conversation)
+            ])
+            conversations.append(conversation)
+        return conversations
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+
+    def assertQueryBudget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_conversations_query_budget_does_not_grow(self):
+        url = reverse('conversation-list')
+        # Conversations + unread counts, participants, latest messages + senders
+        response = self.assertQueryBudget(url, 3)
+        self.assertEqual(len(response.data), 5)
+
+        self.seed_conversations(self.users[6:], messages_per_conversation=25)
+        response = self.assertQueryBudget(url, 3)
+        self.assertEqual(len(response.data), 14)
+
+    def test_conversation_list_fields(self):
+        response = self.client.get(reverse('conversation-list'))
+        conversation = next(c for c in response.data if c['id'] == self.conversations[0].id)
+        other = self.users[1]
+
+        latest = self.conversations[0].messages.first()
+        unread = self.conversations[0].messages.filter(is_read=False).exclude(sender=self.viewer).count()
+        self.assertEqual(conversation['other_participant']['id'], other.id)
+        self.assertEqual(conversation['last_message']['id'], latest.id)
+        self.assertEqual(conversation['unread_count'], unread)
+
+    def test_messages_query_budget_does_not_grow(self):
+        conversation = self.conversations[0]
+        url = f"{reverse('message-list')}?conversation={conversation.id}"
+        # Participant check, page count, page of messages + senders
+        response = self.assertQueryBudget(url, 3)
+        self.assertEqual(len(response.data['results']), 10)
+
+        Message.objects.bulk_create([
+            Message(conversation=conversation, sender=self.users[1], text=f'More {i}')
+            for i in range(30)
+        ])
+        response = self.assertQueryBudget(url, 3)
+        self.assertEqual(len(response.data['results']), 40)
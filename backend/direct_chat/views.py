@@ -4,7 +4,8 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, Max
+from django.db.models import Count, F, Prefetch, Q, Window
+from django.db.models.functions import RowNumber
 from .models import Conversation, Message
 from .serializers import (
     ConversationSerializer, 
@@ -34,10 +35,30 @@ class ConversationViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        """Return conversations for the current user"""
+        """
+        Return conversations for the current user.
+
+        The unread count is annotated and only each conversation's latest
+        message is prefetched, so the list costs the same number of queries
+        however many conversations and messages there are.
+        """
+        user = self.request.user
+        latest_messages = Message.objects.annotate(
+            position=Window(
+                expression=RowNumber(),
+                partition_by=[F('conversation')],
+                order_by=F('created_at').desc()
+            )
+        ).filter(position=1).select_related('sender')
+
         return Conversation.objects.filter(
-            participants=self.request.user
-        ).prefetch_related('participants', 'messages')
+            participants=user
+        ).annotate(
+            unread=Count('messages', filter=Q(messages__is_read=False) & ~Q(messages__sender=user))
+        ).prefetch_related(
+            'participants',
+            Prefetch('messages', queryset=latest_messages, to_attr='latest_messages')
+        )
     
     def create(self, request, *args, **kwargs):
         """
@@ -1,10 +1,11 @@
 from rest_framework import serializers
+from core.serializers import TimedSerializerMixin
 from .models import Like, Comment
-from users.serializers import CustomUserSerializer
+from users.serializers import UserSummarySerializer
 
 
-class LikeSerializer(serializers.ModelSerializer):
-    user = CustomUserSerializer(read_only=True)
+class LikeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
 
     class Meta:
         model = Like
@@ -12,8 +13,8 @@ class LikeSerializer(serializers.ModelSerializer):
         read_only_fields = ['user']
 
 
-class CommentSerializer(serializers.ModelSerializer):
-    user = CustomUserSerializer(read_only=True)
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
 
     class Meta:
         model = Comment
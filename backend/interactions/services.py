@@ -0,0 +1,81 @@
+# backend/interactions/services.py
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.counters import increment
+from notifications.models import Notification
+from notifications.services import notify
+from photos.models import Photo
+from .models import Comment, Like
+from .signals import interaction_deleted
+
+
+def like_photo(user, photo):
+    """
+    Returns:
+        bool: True if the like was added, False if it already existed
+    """
+    with transaction.atomic():
+        _, created = Like.objects.get_or_create(user=user, photo=photo)
+        if created:
+            increment(Photo, photo.pk, like_count=1)
+            notify(photo.uploader_id, Notification.Verb.LIKE, actor_id=user.pk, photo_id=photo.pk)
+    return created
+
+
+def unlike_photo(user, photo):
+    """
+    Returns:
+        bool: True if a like was removed
+    """
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, photo=photo).delete()
+        if deleted:
+            increment(Photo, photo.pk, like_count=-deleted)
+    if deleted:
+        interaction_deleted.send(sender=Like, photo_id=photo.pk)
+    return bool(deleted)
+
+
+def save_like(serializer, user):
+    with transaction.atomic():
+        like = serializer.save(user=user)
+        increment(Photo, like.photo_id, like_count=1)
+        notify(like.photo.uploader_id, Notification.Verb.LIKE, actor_id=user.pk, photo_id=like.photo_id)
+    return like
+
+
+def delete_like(like):
+    with transaction.atomic():
+        # Counted by rows actually deleted, so a concurrent delete can't decrement twice
+        deleted, _ = Like.objects.filter(pk=like.pk).delete()
+        if deleted:
+            increment(Photo, like.photo_id, like_count=-1)
+    if deleted:
+        interaction_deleted.send(sender=Like, photo_id=like.photo_id)
+
+
+def save_comment(serializer, user):
+    with transaction.atomic():
+        comment = serializer.save(user=user)
+        increment(Photo, comment.photo_id, comment_count=1)
+        notify(comment.photo.uploader_id, Notification.Verb.COMMENT, actor_id=user.pk, photo_id=comment.photo_id)
+    return comment
+
+
+def edit_comment(serializer):
+    with transaction.atomic():
+        comment = serializer.save()
+        # Photos show their latest comments, so an edit is a new version of the photo
+        Photo.objects.filter(pk=comment.photo_id).update(updated_at=timezone.now())
+    return comment
+
+
+def delete_comment(comment):
+    with transaction.atomic():
+        deleted, _ = Comment.objects.filter(pk=comment.pk).delete()
+        if deleted:
+            increment(Photo, comment.photo_id, comment_count=-1)
+    if deleted:
+        interaction_deleted.send(sender=Comment, photo_id=comment.photo_id)
@@ -0,0 +1,6 @@
+# backend/interactions/signals.py
+
+from django.dispatch import Signal
+
+# Sent with photo_id after interactions.services deletes a like or comment
+interaction_deleted = Signal()
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions
 from .models import Like, Comment
 from .serializers import LikeSerializer, CommentSerializer
+from . import services
 
 
 class LikeViewSet(viewsets.ModelViewSet):
@@ -9,7 +10,10 @@ class LikeViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        services.save_like(serializer, self.request.user)
+
+    def perform_destroy(self, instance):
+        services.delete_like(instance)
 
 
 class CommentViewSet(viewsets.ModelViewSet):
@@ -18,4 +22,10 @@ class CommentViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        services.save_comment(serializer, self.request.user)
+
+    def perform_update(self, serializer):
+        services.edit_comment(serializer)
+
+    def perform_destroy(self, instance):
+        services.delete_comment(instance)
@@ -0,0 +1,269 @@
+# backend/loadtest/run.py
+# Run with: python -m loadtest.run --start-server --concurrency 20 --duration 60
+#
+# Replays the frontend's main flows (feed, profile, like, consent, upload)
+# against a running API and reports throughput, latency percentiles and error
+# rates per request. Seed the database first (manage.py seed_scale) so every
+# virtual user can log in as <prefix>_<n>.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from .client import HTTPClient
+from .scenarios import DEFAULT_WEIGHTS, SCENARIOS, VirtualUser
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Latencies below this (seconds) are noise, never a regression
+NOISE_FLOOR = 0.005
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.measuring = False
+
+    def record(self, scenario, name, seconds, status, error=None):
+        # Setup (login, id lookups) is never part of the results
+        if not self.measuring and scenario != 'setup':
+            return
+        key = f'{scenario}:{name}'
+        self.samples[key].append(seconds)
+        if error or status is None or status >= 400:
+            self.errors[key][error or str(status)] += 1
+
+    def summary(self, elapsed):
+        results = {}
+        for key, samples in sorted(self.samples.items()):
+            if key.startswith('setup:'):
+                continue
+            samples = sorted(samples)
+            errors = sum(self.errors[key].values())
+            results[key] = {
+                'requests': len(samples),
+                'rps': round(len(samples) / elapsed, 2),
+                'errors': errors,
+                'error_rate': round(errors / len(samples), 4),
+                'error_kinds': dict(self.errors[key]),
+                'p50': round(_percentile(samples, 50), 4),
+                'p95': round(_percentile(samples, 95), 4),
+                'p99': round(_percentile(samples, 99), 4),
+                'max': round(samples[-1], 4),
+            }
+        return results
+
+
+def _percentile(sorted_samples, percentile):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(percentile / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def _parse_weights(value):
+    weights = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+async def _virtual_user(index, args, recorder, deadline, started):
+    rng = random.Random(args.seed * 1000 + index)
+    client = HTTPClient(args.base_url)
+    vu = VirtualUser(client, f'{args.prefix}_{index % args.users}', rng, recorder)
+    names = list(args.weights)
+    weights = [args.weights[name] for name in names]
+    try:
+        await vu.login(args.password)
+        await started.wait()
+        while time.perf_counter() < deadline[0]:
+            scenario = rng.choices(names, weights)[0]
+            try:
+                await SCENARIOS[scenario](vu)
+            except Exception as e:
+                # An unexpected response shape is an error of the run, not a crash
+                recorder.record(scenario, 'scenario', 0.0, None, type(e).__name__)
+    finally:
+        await client.close()
+
+
+async def run_load(args):
+    recorder = Recorder()
+    started = asyncio.Event()
+    deadline = [float('inf')]
+
+    tasks = [
+        asyncio.create_task(_virtual_user(i, args, recorder, deadline, started))
+        for i in range(args.concurrency)
+    ]
+
+    # Every virtual user logs in before the clock starts
+    while len(recorder.samples.get('setup:photos', [])) < args.concurrency:
+        failed = [task for task in tasks if task.done() and task.exception()]
+        if failed:
+            for task in tasks:
+                task.cancel()
+            raise failed[0].exception()
+        await asyncio.sleep(0.05)
+
+    recorder.measuring = True
+    start_time = time.perf_counter()
+    deadline[0] = start_time + args.duration
+    started.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start_time
+
+    return recorder.summary(elapsed), elapsed
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def start_server(port):
+    """Start daphne on this machine and wait until /healthz/ answers."""
+    process = subprocess.Popen(
+        ['daphne', '-b', '127.0.0.1', '-p', str(port), 'core.asgi:application'],
+        cwd=BACKEND_DIR,
+    )
+
+    async def wait_healthy():
+        client = HTTPClient(f'http://127.0.0.1:{port}', timeout=2)
+        for _ in range(120):
+            if process.poll() is not None:
+                # Exited, e.g. the port is taken; don't test against whatever holds it
+                return False
+            try:
+                if (await client.request('GET', '/healthz/')).ok:
+                    return True
+            except (OSError, asyncio.TimeoutError):
+                pass
+            finally:
+                await client.close()
+            await asyncio.sleep(0.5)
+        return False
+
+    if not asyncio.run(wait_healthy()):
+        process.terminate()
+        raise RuntimeError('daphne exited or did not become healthy within 60s')
+    return process
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns:
+        list: (request, metric, baseline value, current value) for every regression
+    """
+    regressions = []
+    for key, current in results['requests'].items():
+        previous = baseline.get('requests', {}).get(key)
+        if previous is None:
+            continue
+        if current['p95'] - previous['p95'] > NOISE_FLOOR and current['p95'] > previous['p95'] * (1 + tolerance):
+            regressions.append((key, 'p95', previous['p95'], current['p95']))
+        if current['error_rate'] > previous['error_rate'] + 0.01:
+            regressions.append((key, 'error_rate', previous['error_rate'], current['error_rate']))
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'request':<28}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for key, r in results['requests'].items():
+        print(
+            f"{key:<28}{r['requests']:>7}{r['rps']:>8.1f}{r['error_rate'] * 100:>6.1f}%"
+            f"{r['p50'] * 1000:>7.0f}ms{r['p95'] * 1000:>7.0f}ms{r['p99'] * 1000:>7.0f}ms"
+        )
+    total = results['total']
+    print(f"\nTotal: {total['requests']} requests, {total['rps']:.1f} req/s, {total['error_rate']:.2%} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the REST API with the frontend\'s main flows')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--start-server', action='store_true', help='Start daphne for the run (port from --base-url)')
+    parser.add_argument('--concurrency', type=int, default=10, help='Virtual users running at once')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run after everyone logged in')
+    parser.add_argument(
+        '--weights',
+        type=_parse_weights,
+        default=DEFAULT_WEIGHTS,
+        help='Scenario mix, e.g. feed=50,profile=25,like=15,consent=7,upload=3',
+    )
+    parser.add_argument('--prefix', default='seed', help='Username prefix of the seeded accounts')
+    parser.add_argument('--users', type=int, default=100, help='Log in as <prefix>_0 .. <prefix>_<users-1>')
+    parser.add_argument('--password', default='seed-password')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for scenario choices')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Earlier --output to compare against; regressions exit non-zero')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 slowdown vs the baseline')
+    args = parser.parse_args()
+
+    server = None
+    if args.start_server:
+        port = int(args.base_url.rsplit(':', 1)[1].split('/')[0])
+        server = start_server(port)
+
+    try:
+        requests, elapsed = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    total_requests = sum(r['requests'] for r in requests.values())
+    total_errors = sum(r['errors'] for r in requests.values())
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'base_url': args.base_url,
+            'concurrency': args.concurrency,
+            'duration': round(elapsed, 2),
+            'weights': args.weights,
+            'seed': args.seed,
+        },
+        'total': {
+            'requests': total_requests,
+            'rps': round(total_requests / elapsed, 2),
+            'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+        },
+        'requests': requests,
+    }
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs {baseline['meta'].get('commit')}:")
+            for key, metric, previous, current in regressions:
+                print(f"  {key} {metric}: {previous} -> {current}")
+            sys.exit(1)
+        print(f"\n✅ No regressions vs {baseline['meta'].get('commit')}")
+
+
+if __name__ == "__main__":
+    main()
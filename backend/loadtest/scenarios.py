@@ -0,0 +1,145 @@
+# backend/loadtest/scenarios.py
+"""
+What the frontend does, request by request. Scenarios that write undo their
+change at the end (unlike, revert the consent decision, delete the upload), so
+repeated runs see the same data and stay comparable.
+"""
+
+import io
+import time
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+
+class VirtualUser:
+    """One logged-in user with a keep-alive connection, running scenarios in a loop."""
+
+    def __init__(self, client, username, rng, recorder):
+        self.client = client
+        self.username = username
+        self.rng = rng
+        self.recorder = recorder
+        self.user_id = None
+        self.photo_ids = []
+        self.usernames = []
+
+    async def step(self, scenario, name, method, path, **kwargs):
+        """One timed request, recorded under `scenario:name`."""
+        start_time = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except Exception as e:
+            self.recorder.record(scenario, name, time.perf_counter() - start_time, None, type(e).__name__)
+            return None
+        self.recorder.record(scenario, name, time.perf_counter() - start_time, response.status)
+        return response
+
+    async def login(self, password):
+        response = await self.step(
+            'setup', 'login', 'POST', '/api/token/',
+            json_body={'username': self.username, 'password': password}
+        )
+        if response is None or not response.ok:
+            raise RuntimeError(f"Login failed for {self.username}")
+        self.client.token = response.json()['access']
+
+        # Ids the scenarios pick from
+        users = await self.step('setup', 'users', 'GET', '/api/users/?page_size=100')
+        if users is not None and users.ok:
+            self.usernames = [u['username'] for u in _results(users.json())]
+        # The directory leaves out the current user
+        me = await self.step('setup', 'search', 'GET', f'/api/users/search/?q={self.username}')
+        if me is not None and me.ok:
+            self.user_id = next((u['id'] for u in _results(me.json()) if u['username'] == self.username), None)
+        photos = await self.step('setup', 'photos', 'GET', '/api/photos/')
+        if photos is not None and photos.ok:
+            self.photo_ids = [p['id'] for p in _results(photos.json())]
+
+
+def _results(data):
+    """List endpoints may or may not be paginated."""
+    return data['results'] if isinstance(data, dict) and 'results' in data else data
+
+
+async def feed(vu):
+    """Opening the feed: the home timeline, the suggestions strip and the consent badge."""
+    await vu.step('feed', 'home', 'GET', '/api/photos/home/')
+    await vu.step('feed', 'suggestions', 'GET', '/api/users/suggestions/?limit=20')
+    await vu.step('feed', 'consent_count', 'GET', '/api/consent-requests/pending-count/')
+
+
+async def profile(vu):
+    """Opening someone's profile page and scrolling to the second page of the grid."""
+    if not vu.usernames:
+        return
+    username = vu.rng.choice(vu.usernames)
+    response = await vu.step('profile', 'profile', 'GET', f'/api/users/profile/{username}/')
+    if response is None or not response.ok:
+        return
+    next_url = response.json()['photos']['next']
+    if next_url:
+        await vu.step('profile', 'photos', 'GET', urlsplit(next_url)._replace(scheme='', netloc='').geturl())
+
+
+async def like_toggle(vu):
+    """Liking a photo from the feed, then taking the like back."""
+    if not vu.photo_ids:
+        return
+    photo_id = vu.rng.choice(vu.photo_ids)
+    response = await vu.step('like', 'like', 'POST', f'/api/photos/{photo_id}/like/')
+    if response is not None and response.status == 201:
+        await vu.step('like', 'unlike', 'DELETE', f'/api/photos/{photo_id}/like/')
+
+
+async def consent_approve(vu):
+    """Approving a pending consent request (unmasks the face), then putting it back to pending (masks it again)."""
+    response = await vu.step('consent', 'list', 'GET', '/api/consent-requests/')
+    if response is None or not response.ok:
+        return
+    pending = [r for r in _results(response.json()) if r.get('status') == 'PENDING']
+    if not pending:
+        return
+    request_id = vu.rng.choice(pending)['id']
+    approved = await vu.step(
+        'consent', 'approve', 'PATCH', f'/api/consent-requests/{request_id}/',
+        json_body={'status': 'APPROVED'}
+    )
+    if approved is not None and approved.ok:
+        await vu.step(
+            'consent', 'revert', 'PATCH', f'/api/consent-requests/{request_id}/',
+            json_body={'status': 'PENDING'}
+        )
+
+
+def _jpeg(rng, width=1600, height=1200):
+    pixels = bytes(rng.getrandbits(8) for _ in range(64 * 48 * 3))
+    image = Image.frombytes('RGB', (64, 48), pixels).resize((width, height))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+async def upload(vu):
+    """Uploading a photo (processed inline, face detection included), then deleting it."""
+    from .client import encode_multipart
+
+    body, content_type = encode_multipart(
+        {'caption': 'Load test upload'},
+        {'original_image': ('loadtest.jpg', _jpeg(vu.rng), 'image/jpeg')}
+    )
+    response = await vu.step('upload', 'upload', 'POST', '/api/photos/', body=body, content_type=content_type)
+    if response is not None and response.status == 201:
+        await vu.step('upload', 'delete', 'DELETE', f"/api/photos/{response.json()['id']}/")
+
+
+SCENARIOS = {
+    'feed': feed,
+    'profile': profile,
+    'like': like_toggle,
+    'consent': consent_approve,
+    'upload': upload,
+}
+
+# Roughly how often the frontend does each, per 100 actions
+DEFAULT_WEIGHTS = {'feed': 50, 'profile': 25, 'like': 15, 'consent': 7, 'upload': 3}
@@ -0,0 +1,11 @@
+# backend/notifications/admin.py
+from django.contrib import admin
+from .models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'recipient', 'verb', 'count', 'last_actor', 'is_read', 'updated_at']
+    list_filter = ['verb', 'is_read']
+    search_fields = ['recipient__username']
+    raw_id_fields = ['recipient', 'photo', 'last_actor']
@@ -0,0 +1,92 @@
+# backend/notifications/consumers.py
+"""
+WebSocket consumer for the notification inbox.
+"""
+
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from core.metrics import CHANNEL_LAYER_LATENCY, WEBSOCKET_CONNECTIONS
+from . import services
+
+logger = logging.getLogger('notifications')
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Connection URL: ws://localhost:8000/ws/notifications/?token=<jwt_token>&since=<cursor>
+
+    On connect the client gets what changed since `since` (the `cursor` of
+    the last message it saw), or its latest notifications without it. After
+    that, a message whenever entries change (services.inbox_message):
+    {
+        "type": "notifications",
+        "notifications": [{"id": 7, "verb": "LIKE", "count": 12, ...}],
+        "unread": 4,
+        "cursor": "2025-01-15T10:30:00.123456+00:00",
+        "has_more": false
+    }
+
+    Changes are batched: everything arriving within NOTIFICATION_BATCH_SECONDS
+    of the first goes out in one message, each entry once with its latest state.
+    """
+
+    async def connect(self):
+        self.user = self.scope['user']
+        if self.user.is_anonymous:
+            await self.close(code=4001)
+            return
+
+        self.group_name = services.inbox_group(self.user.id)
+        self.pending_ids = set()
+        self.flush_task = None
+
+        await self.accept()
+        self.counted_connection = True
+        WEBSOCKET_CONNECTIONS.labels(consumer='notifications').inc()
+
+        with CHANNEL_LAYER_LATENCY.labels(operation='group_add').time():
+            await self.channel_layer.group_add(self.group_name, self.channel_name)
+
+        query_params = parse_qs(self.scope.get('query_string', b'').decode())
+        since = parse_datetime(query_params.get('since', [''])[0] or '')
+        await self.send_message(await self.get_message(since=since))
+        logger.info(f"Notification socket connected: {self.user.username}")
+
+    async def disconnect(self, close_code):
+        if getattr(self, 'counted_connection', False):
+            WEBSOCKET_CONNECTIONS.labels(consumer='notifications').dec()
+            self.counted_connection = False
+
+        if getattr(self, 'flush_task', None):
+            self.flush_task.cancel()
+
+        if hasattr(self, 'group_name'):
+            with CHANNEL_LAYER_LATENCY.labels(operation='group_discard').time():
+                await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notification_updated(self, event):
+        """Entries changed (services.publish); sent at the end of the batch window."""
+        self.pending_ids.update(event['ids'])
+        if self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(getattr(settings, 'NOTIFICATION_BATCH_SECONDS', 2))
+        ids, self.pending_ids = self.pending_ids, set()
+        self.flush_task = None
+        await self.send_message(await self.get_message(ids=ids))
+
+    async def send_message(self, message):
+        await self.send(text_data=json.dumps(message))
+
+    @database_sync_to_async
+    def get_message(self, ids=None, since=None):
+        return services.inbox_message(self.user.id, ids=ids, since=since)
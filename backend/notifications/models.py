@@ -0,0 +1,57 @@
+# backend/notifications/models.py
+from django.conf import settings
+from django.db import models
+
+
+class Notification(models.Model):
+    """
+    One entry in a user's inbox.
+
+    Events of the same kind about the same thing coalesce into its unread
+    entry ("12 new likes on your photo"): `count` goes up and `last_actor` is
+    whoever came last. Once read, the next event starts a new entry.
+    `updated_at` moves with every event, so clients catch up on everything
+    changed since the last one they saw.
+    """
+    class Verb(models.TextChoices):
+        LIKE = 'LIKE', 'Like'
+        COMMENT = 'COMMENT', 'Comment'
+        FOLLOW = 'FOLLOW', 'Follow'
+        CONSENT_REQUEST = 'CONSENT_REQUEST', 'Consent request'
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    verb = models.CharField(max_length=20, choices=Verb.choices)
+    # What it's about; empty for follows
+    photo = models.ForeignKey(
+        'photos.Photo',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notifications'
+    )
+    last_actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    count = models.PositiveIntegerField(default=1)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at', '-id']
+        indexes = [
+            models.Index(fields=['recipient', '-updated_at', '-id'], name='notification_inbox_idx'),
+            # Coalescing looks up the recipient's unread entries
+            models.Index(fields=['recipient', 'is_read', 'verb'], name='notification_unread_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.count} x {self.verb} for {self.recipient_id}"
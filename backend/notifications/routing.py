@@ -0,0 +1,11 @@
+# backend/notifications/routing.py
+"""
+WebSocket URL routing for notifications.
+"""
+
+from django.urls import re_path
+from .consumers import NotificationConsumer
+
+websocket_urlpatterns = [
+    re_path(r'^ws/notifications/$', NotificationConsumer.as_asgi()),
+]
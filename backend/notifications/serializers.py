@@ -0,0 +1,29 @@
+# backend/notifications/serializers.py
+from rest_framework import serializers
+from core.serializers import TimedSerializerMixin
+
+from photos.models import Photo
+from users.serializers import UserSummarySerializer
+from .models import Notification
+
+
+class NotificationPhotoSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Photo
+        fields = ['id', 'public_image']
+        read_only_fields = fields
+
+
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    An inbox entry. `count` events of `verb`, the latest by `last_actor`:
+    { "verb": "LIKE", "count": 12, "last_actor": {...}, "photo": {...} }
+    reads as "<last_actor> and 11 others liked your photo".
+    """
+    last_actor = UserSummarySerializer(read_only=True)
+    photo = NotificationPhotoSerializer(read_only=True)
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'verb', 'photo', 'last_actor', 'count', 'is_read', 'created_at', 'updated_at']
+        read_only_fields = fields
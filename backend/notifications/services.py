@@ -0,0 +1,133 @@
+# backend/notifications/services.py
+"""
+Writing to inboxes and telling the recipients' open sockets.
+
+`notify` coalesces the event into the recipient's unread entry for it and,
+once the transaction commits, sends the entry's id to their inbox group.
+NotificationConsumer batches what arrives there (see consumers.py), so a
+burst of likes reaches the client as one message with the final count.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.realtime import group_send
+from .models import Notification
+from .serializers import NotificationSerializer
+
+logger = logging.getLogger('notifications')
+
+
+def inbox_group(user_id):
+    return f'inbox_{user_id}'
+
+
+def publish(recipient_id, notification_ids):
+    """Tell the recipient's sockets these entries changed, after the current transaction commits."""
+    ids = list(notification_ids)
+    if ids:
+        transaction.on_commit(
+            lambda: group_send(inbox_group(recipient_id), {'type': 'notification.updated', 'ids': ids})
+        )
+
+
+def notify(recipient_id, verb, actor_id=None, photo_id=None):
+    """
+    Record one event in the recipient's inbox. Nobody is notified of their
+    own actions.
+
+    Returns:
+        Notification: The entry it went into, or None
+    """
+    if recipient_id == actor_id:
+        return None
+
+    with transaction.atomic():
+        notification = Notification.objects.select_for_update().filter(
+            recipient_id=recipient_id,
+            verb=verb,
+            photo_id=photo_id,
+            is_read=False
+        ).order_by('-updated_at').first()
+
+        if notification is None:
+            notification = Notification.objects.create(
+                recipient_id=recipient_id,
+                verb=verb,
+                photo_id=photo_id,
+                last_actor_id=actor_id
+            )
+        else:
+            Notification.objects.filter(pk=notification.pk).update(
+                count=F('count') + 1,
+                last_actor_id=actor_id,
+                updated_at=timezone.now()
+            )
+        publish(recipient_id, [notification.pk])
+
+    logger.debug(f"[Notifications] {verb} for user {recipient_id} in notification {notification.pk}")
+    return notification
+
+
+def mark_read(recipient_id, ids=None):
+    """
+    Mark the recipient's entries read, all of them unless `ids` is given.
+
+    Returns:
+        int: Unread entries left
+    """
+    unread = Notification.objects.filter(recipient_id=recipient_id, is_read=False)
+    if ids is not None:
+        unread = unread.filter(pk__in=ids)
+    with transaction.atomic():
+        marked = list(unread.values_list('pk', flat=True))
+        Notification.objects.filter(pk__in=marked).update(is_read=True, updated_at=timezone.now())
+        publish(recipient_id, marked)
+    return unread_count(recipient_id)
+
+
+def unread_count(recipient_id):
+    return Notification.objects.filter(recipient_id=recipient_id, is_read=False).count()
+
+
+def inbox_message(recipient_id, ids=None, since=None):
+    """
+    The socket message for some of the recipient's entries: the given `ids`,
+    or the newest NOTIFICATION_CATCH_UP_SIZE updated at or after `since`
+    (of all of them without it).
+
+    { "type": "notifications", "notifications": [...], "unread": 4,
+      "cursor": "<newest updated_at; reconnect with ?since=<cursor>>",
+      "has_more": false }
+
+    has_more means there were more than one message carries; the rest are
+    paged at /api/notifications/.
+    """
+    queryset = Notification.objects.filter(recipient_id=recipient_id).select_related(
+        'last_actor', 'photo'
+    ).order_by('-updated_at', '-id')
+
+    has_more = False
+    if ids is not None:
+        notifications = list(queryset.filter(pk__in=ids))
+    else:
+        if since is not None:
+            # Inclusive, so entries sharing the cursor's instant aren't lost; clients upsert by id
+            queryset = queryset.filter(updated_at__gte=since)
+        limit = getattr(settings, 'NOTIFICATION_CATCH_UP_SIZE', 50)
+        notifications = list(queryset[:limit + 1])
+        has_more = len(notifications) > limit
+        notifications = notifications[:limit]
+
+    cursor = notifications[0].updated_at if notifications else since
+    return {
+        'type': 'notifications',
+        'notifications': NotificationSerializer(notifications, many=True).data,
+        'unread': unread_count(recipient_id),
+        'cursor': cursor.isoformat() if cursor else None,
+        'has_more': has_more,
+    }
@@ -0,0 +1,118 @@
+# backend/notifications/tests.py
+"""
+Coalescing into the inbox, catching up, and batching on the socket.
+"""
+
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core.testing import seed_photos, seed_users
+from .consumers import NotificationConsumer
+from .models import Notification
+from . import services
+
+
+class InboxTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(5)
+        cls.owner = cls.users[0]
+        cls.photo = seed_photos(cls.owner, [], 1, likes_per_photo=0, comments_per_photo=0)[0]
+
+    def like(self, user):
+        self.client.force_authenticate(user)
+        self.client.post(reverse('photo-like', kwargs={'pk': self.photo.pk}))
+
+    def test_likes_coalesce_until_read(self):
+        for user in self.users[1:4]:
+            self.like(user)
+        self.like(self.owner)  # Not notified of their own like
+
+        notification = Notification.objects.get(recipient=self.owner)
+        self.assertEqual((notification.verb, notification.count), (Notification.Verb.LIKE, 3))
+        self.assertEqual(notification.last_actor, self.users[3])
+
+        self.assertEqual(services.mark_read(self.owner.pk), 0)
+        self.like(self.users[4])
+        self.assertEqual(Notification.objects.filter(recipient=self.owner, is_read=False).count(), 1)
+        self.assertEqual(Notification.objects.filter(recipient=self.owner).count(), 2)
+
+    def test_comments_and_follows_are_notified(self):
+        self.client.force_authenticate(self.users[1])
+        self.client.post(reverse('comment-list'), {'photo': self.photo.pk, 'text': 'Nice'})
+        self.client.post(reverse('user-follow', kwargs={'pk': self.owner.pk}))
+
+        verbs = set(Notification.objects.filter(recipient=self.owner).values_list('verb', flat=True))
+        self.assertEqual(verbs, {Notification.Verb.COMMENT, Notification.Verb.FOLLOW})
+
+    def test_inbox_catches_up_since_a_cursor(self):
+        self.like(self.users[1])
+        cursor = services.inbox_message(self.owner.pk)['cursor']
+
+        self.client.force_authenticate(self.users[2])
+        self.client.post(reverse('user-follow', kwargs={'pk': self.owner.pk}))
+
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(reverse('notification-list'), {'since': cursor, 'unread': 'true'})
+        # The like is included again (the cursor's instant); clients upsert by id
+        self.assertEqual(
+            [n['verb'] for n in response.data['results']],
+            [Notification.Verb.FOLLOW, Notification.Verb.LIKE]
+        )
+
+        response = self.client.post(
+            reverse('notification-mark-read'), {'ids': [response.data['results'][0]['id']]}, format='json'
+        )
+        self.assertEqual(response.data, {'unread': 1})
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    NOTIFICATION_BATCH_SECONDS=0.1,
+)
+class NotificationConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.users = seed_users(4)
+        self.owner = self.users[0]
+        self.photo = seed_photos(self.owner, [], 1, likes_per_photo=0, comments_per_photo=0)[0]
+
+    async def connect(self, since=''):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), f'/ws/notifications/?since={since}')
+        communicator.scope['user'] = self.owner
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_a_burst_of_likes_arrives_as_one_message(self):
+        communicator = await self.connect()
+        self.assertEqual((await communicator.receive_json_from())['notifications'], [])
+
+        notify = database_sync_to_async(services.notify)
+        for user in self.users[1:]:
+            await notify(self.owner.pk, Notification.Verb.LIKE, actor_id=user.pk, photo_id=self.photo.pk)
+
+        message = await communicator.receive_json_from(timeout=2)
+        self.assertEqual(len(message['notifications']), 1)
+        self.assertEqual(message['notifications'][0]['count'], 3)
+        self.assertEqual(message['unread'], 1)
+        self.assertTrue(await communicator.receive_nothing(timeout=0.3))
+        await communicator.disconnect()
+
+    async def test_reconnecting_catches_up(self):
+        notify = database_sync_to_async(services.notify)
+        await notify(self.owner.pk, Notification.Verb.FOLLOW, actor_id=self.users[1].pk)
+        communicator = await self.connect()
+        cursor = (await communicator.receive_json_from())['cursor']
+        await communicator.disconnect()
+
+        await notify(self.owner.pk, Notification.Verb.COMMENT, actor_id=self.users[2].pk, photo_id=self.photo.pk)
+        communicator = await self.connect(since=cursor.replace('+', '%2B'))
+        message = await communicator.receive_json_from()
+        self.assertEqual(
+            [n['verb'] for n in message['notifications']],
+            [Notification.Verb.COMMENT, Notification.Verb.FOLLOW]
+        )
+        await communicator.disconnect()
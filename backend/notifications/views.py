@@ -0,0 +1,55 @@
+# backend/notifications/views.py
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from .models import Notification
+from .serializers import NotificationSerializer
+from . import services
+
+
+class NotificationPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    The current user's inbox, most recently updated first. Live updates
+    arrive on ws/notifications/ (notifications/consumers.py).
+
+    Filters: ?unread=true, ?since=<cursor from the socket>
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(
+            recipient=self.request.user
+        ).select_related('last_actor', 'photo').order_by('-updated_at', '-id')
+        params = self.request.query_params
+
+        if params.get('unread') == 'true':
+            queryset = queryset.filter(is_read=False)
+        if params.get('since'):
+            since = parse_datetime(params['since'])
+            if since is None:
+                raise ValidationError({'since': 'Expected an ISO 8601 timestamp'})
+            queryset = queryset.filter(updated_at__gte=since)
+        return queryset
+
+    @action(detail=False, methods=['post'], url_path='mark-read')
+    def mark_read(self, request):
+        """
+        Mark entries read: { "ids": [1, 2] }, or every entry without ids.
+        POST /api/notifications/mark-read/ -> { "unread": 0 }
+        """
+        ids = request.data.get('ids')
+        if ids is not None and not isinstance(ids, list):
+            raise ValidationError({'ids': 'Expected a list of ids'})
+        return Response({'unread': services.mark_read(request.user.pk, ids)})
@@ -1,7 +1,63 @@
 # photos/admin.py
 
 from django.contrib import admin
-from .models import Photo, ConsentRequest
+from .models import Photo, ConsentRequest, DetectedFace, PhotoProcessingRun
+from .services import retry_processing_run
 
 admin.site.register(Photo)
-admin.site.register(ConsentRequest)
\ No newline at end of file
+admin.site.register(ConsentRequest)
+
+
+@admin.register(DetectedFace)
+class DetectedFaceAdmin(admin.ModelAdmin):
+    """
+    Every face found in a photo, including the ones that skipped recognition.
+    """
+    list_display = ['id', 'photo', 'matched_user', 'det_score', 'recognition_skipped']
+    list_filter = ['recognition_skipped']
+    raw_id_fields = ['photo', 'matched_user']
+
+    def get_queryset(self, request):
+        """Optimize queries."""
+        return super().get_queryset(request).select_related('photo__uploader', 'matched_user')
+
+
+@admin.register(PhotoProcessingRun)
+class PhotoProcessingRunAdmin(admin.ModelAdmin):
+    """
+    Timing ledger of photo processing. Percentiles over time are served by
+    /api/processing-runs/stats/.
+    """
+    list_display = [
+        'id', 'photo', 'outcome', 'model_version', 'faces_detected', 'matches',
+        'detection_seconds', 'persistence_seconds', 'regeneration_seconds', 'total_seconds',
+        'started_at',
+    ]
+    list_filter = ['outcome', 'model_version', 'started_at']
+    date_hierarchy = 'started_at'
+    raw_id_fields = ['photo', 'retry_of', 'duplicate_of']
+    readonly_fields = [field.name for field in PhotoProcessingRun._meta.fields]
+
+    actions = ['retry_failed_runs']
+
+    def has_add_permission(self, request):
+        """Runs are only recorded by photo processing"""
+        return False
+
+    def retry_failed_runs(self, request, queryset):
+        """Admin action to process the photos of failed runs again"""
+        retried = 0
+        skipped = 0
+
+        for run in queryset.select_related('photo'):
+            try:
+                retry_processing_run(run)
+                retried += 1
+            except ValueError:
+                skipped += 1
+
+        self.message_user(
+            request,
+            f"Retried {retried} runs, skipped {skipped} (not failed or already reprocessed)"
+        )
+    retry_failed_runs.short_description = "Retry selected failed runs"
@@ -0,0 +1,19 @@
+# backend/photos/aggregates.py
+
+from django.db.models import Aggregate, FloatField
+
+
+class Percentile(Aggregate):
+    """
+    PostgreSQL percentile_cont, e.g. Percentile('total_seconds', 0.95).
+    Other databases lack it; get_processing_stats computes percentiles in Python there.
+    """
+    function = 'PERCENTILE_CONT'
+    name = 'Percentile'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        if not 0 <= percentile <= 1:
+            raise ValueError('percentile must be between 0 and 1')
+        super().__init__(expression, percentile=percentile, **extra)
@@ -0,0 +1,161 @@
+# backend/photos/cache.py
+"""
+Cache of serialized feed, home timeline and profile pages, per viewer and URL.
+
+Every cached page lists the version tokens it was built from:
+
+    photo:<id>      each photo on the page (likes, comments, new public image, deletion)
+    timeline:<id>   the viewer's home timeline (new entries, follows)
+    author:<id>     an uploader's photo list (profiles, accounts merged on read)
+    follows:<id>    who an account follows and is followed by (profile counts, follow state)
+    photos:all      the global photo list
+
+A write replaces the tokens it affects with fresh ones (photos/signals.py), and
+a read serves the page only if all of its tokens are unchanged, checked in one
+get_many. Fresh tokens carry the next number of a shared sequence: a page whose
+tokens turn out newer than the sequence was when the page started building may
+hold data from before that write, so it is served but not cached. So a like invalidates exactly the pages showing that photo, for
+every viewer, without knowing who they are. FEED_CACHE_TIMEOUT bounds how
+stale anything not tracked by a token (an uploader's new avatar) can get.
+
+Runs on the FEED_CACHE_ALIAS cache (local memory by default; point it at a
+shared backend such as Redis when running several processes).
+"""
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.metrics import FEED_CACHE_LOOKUPS
+
+
+def is_enabled():
+    return getattr(settings, 'FEED_CACHE_ENABLED', True)
+
+
+def get_cache():
+    return caches[getattr(settings, 'FEED_CACHE_ALIAS', 'default')]
+
+
+def photo_token(photo_id):
+    return f'feed:token:photo:{photo_id}'
+
+
+def timeline_token(user_id):
+    return f'feed:token:timeline:{user_id}'
+
+
+def author_token(user_id):
+    return f'feed:token:author:{user_id}'
+
+
+def follows_token(user_id):
+    return f'feed:token:follows:{user_id}'
+
+
+ALL_PHOTOS_TOKEN = 'feed:token:photos:all'
+
+
+SEQUENCE_KEY = 'feed:token:sequence'
+
+
+def _sequence():
+    return get_cache().get(SEQUENCE_KEY, 0)
+
+
+def _next_sequence():
+    cache = get_cache()
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    try:
+        return cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        # Evicted since add()
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        return cache.incr(SEQUENCE_KEY)
+
+
+def _new_token(sequence):
+    # The random part keeps tokens unique should the sequence be evicted and restart
+    return f'{sequence}.{uuid.uuid4().hex}'
+
+
+def _token_sequence(token):
+    try:
+        return int(token.split('.', 1)[0])
+    except ValueError:
+        return 0
+
+
+def bump(token_keys):
+    """Invalidate every cached page built from any of these tokens."""
+    if token_keys:
+        token = _new_token(_next_sequence())
+        get_cache().set_many({key: token for key in token_keys}, timeout=None)
+
+
+def _current_tokens(token_keys, sequence):
+    """
+    Current values, creating the ones that don't exist yet (never set, or
+    evicted) as of `sequence`. add() never overwrites a concurrent bump.
+    """
+    cache = get_cache()
+    tokens = cache.get_many(token_keys)
+    missing = [key for key in token_keys if key not in tokens]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_token(sequence), timeout=None)
+        tokens.update(cache.get_many(missing))
+    return tokens
+
+
+def _page_key(view, request):
+    url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f'feed:page:{view}:{request.user.pk}:{url}'
+
+
+def cached_page(view, request, build):
+    """
+    The cached response data for this viewer and URL, or `build()`'s, cached.
+
+    Args:
+        view: Label for the metrics ('photos', 'home', 'profile')
+        build: Returns (response data, token keys it depends on), or None when
+            the response must not be cached (errors)
+    """
+    if not is_enabled():
+        result = build()
+        return result[0] if result else None
+
+    cache = get_cache()
+    key = _page_key(view, request)
+
+    entry = cache.get(key)
+    if entry is not None:
+        if cache.get_many(list(entry['tokens'])) == entry['tokens']:
+            FEED_CACHE_LOOKUPS.labels(view=view, result='hit').inc()
+            return entry['data']
+        FEED_CACHE_LOOKUPS.labels(view=view, result='stale').inc()
+    else:
+        FEED_CACHE_LOOKUPS.labels(view=view, result='miss').inc()
+
+    # Writes after this point get a higher sequence number than any the page can hold
+    started = _sequence()
+    result = build()
+    if result is None:
+        return None
+    data, token_keys = result
+
+    tokens = _current_tokens(list(token_keys), started)
+    if any(_token_sequence(token) > started for token in tokens.values()):
+        # Something the page shows changed while it was built
+        return data
+
+    cache.set(key, {'data': data, 'tokens': tokens}, getattr(settings, 'FEED_CACHE_TIMEOUT', 300))
+    return data
+
+
+def photo_tokens(photos):
+    """Token keys of the photos in serialized page data."""
+    return [photo_token(photo['id']) for photo in photos]
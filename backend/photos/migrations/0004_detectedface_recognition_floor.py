@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-19 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0003_detectedface'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detectedface',
+            name='det_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='detectedface',
+            name='recognition_skipped',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.13 on 2026-10-19 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0004_detectedface_recognition_floor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['uploader', 'perceptual_hash'], name='photos_phot_uploade_262f1e_idx'),
+        ),
+    ]
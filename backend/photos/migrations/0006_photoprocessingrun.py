@@ -0,0 +1,47 @@
+# Generated by Django 4.2.13 on 2026-10-19 07:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0005_photo_perceptual_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoProcessingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outcome', models.CharField(choices=[('RUNNING', 'Running'), ('SUCCESS', 'Success'), ('NO_FACES', 'No faces'), ('DUPLICATE', 'Duplicate reused'), ('FAILED', 'Failed')], default='RUNNING', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('model_version', models.CharField(blank=True, max_length=50)),
+                ('image_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('image_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('faces_detected', models.PositiveIntegerField(default=0)),
+                ('faces_recognized', models.PositiveIntegerField(default=0)),
+                ('faces_skipped', models.PositiveIntegerField(default=0)),
+                ('matches', models.PositiveIntegerField(default=0)),
+                ('consent_requests', models.PositiveIntegerField(default=0)),
+                ('load_seconds', models.FloatField(blank=True, null=True)),
+                ('image_read_seconds', models.FloatField(blank=True, null=True)),
+                ('detection_seconds', models.FloatField(blank=True, null=True)),
+                ('recognition_seconds', models.FloatField(blank=True, null=True)),
+                ('matching_seconds', models.FloatField(blank=True, null=True)),
+                ('persistence_seconds', models.FloatField(blank=True, null=True)),
+                ('regeneration_seconds', models.FloatField(blank=True, null=True)),
+                ('total_seconds', models.FloatField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duplicate_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='photos.photo')),
+                ('photo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='processing_runs', to='photos.photo')),
+                ('retry_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='retries', to='photos.photoprocessingrun')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['outcome', 'started_at'], name='photos_phot_outcome_d6491e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-19 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0006_photoprocessingrun'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['-created_at', '-id'], name='photo_feed_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.13 on 2026-10-19 08:29
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model):
+    counts = model.objects.filter(photo=OuterRef('pk')).order_by().values('photo').annotate(
+        count=Count('*')
+    ).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Photo = apps.get_model('photos', 'Photo')
+    Photo.objects.update(
+        like_count=_count(apps.get_model('interactions', 'Like')),
+        comment_count=_count(apps.get_model('interactions', 'Comment')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0007_photo_feed_keyset_idx'),
+        ('interactions', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
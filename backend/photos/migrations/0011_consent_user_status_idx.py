@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0010_photo_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consentrequest',
+            index=models.Index(fields=['requested_user', 'status'], name='consent_user_status_idx'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.db import models
 from django.core.files.base import ContentFile # For saving memory-buffer as file
 from PIL import Image
+from .phash import compute_perceptual_hash
 import io
 import os
 
@@ -16,13 +17,33 @@ class Photo(models.Model):
     public_image = models.ImageField(upload_to='photos/public/%Y/%m/%d/', null=True, blank=True)
     caption = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Any change to what the API shows of the photo, likes and comments included
+    # (core/counters.py refreshes it), so it works as a version for ETags
+    updated_at = models.DateTimeField(auto_now=True)
+    # dHash of the original, used to spot re-uploads and skip face detection
+    perceptual_hash = models.CharField(max_length=16, blank=True)
+    # Denormalised counts, kept in step by the like/comment write paths (core/counters.py)
+    like_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['uploader', 'perceptual_hash']),
+            # Feed pagination seeks on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='photo_feed_keyset_idx'),
+            # Profiles, and home timelines reading high-follower accounts' photos
+            models.Index(fields=['uploader', '-created_at', '-id'], name='photo_uploader_recent_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """
         Optimizes the image by resizing to a max of 2000px and 
         compressing it before saving.
+
+        This only happens at ingest; later saves (e.g. writing public_image)
+        must not re-encode the original.
         """
-        if self.original_image:
+        if self.original_image and self._state.adding:
             # 1. Open the image
             img = Image.open(self.original_image)
             
@@ -36,6 +57,8 @@ class Photo(models.Model):
                 # thumbnail() maintains the aspect ratio automatically
                 img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
 
+            self.perceptual_hash = compute_perceptual_hash(img)
+
             # 3. Save the result to a memory buffer
             buffer = io.BytesIO()
             img.save(buffer, format='JPEG', quality=90, optimize=True)
@@ -73,6 +96,12 @@ class ConsentRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Pending-request badge counts
+            models.Index(fields=['requested_user', 'status'], name='consent_user_status_idx'),
+        ]
+
     def __str__(self):
         return f"Request for {self.requested_user.username} on photo {self.photo.id} is {self.status}"
 
@@ -99,6 +128,107 @@ class DetectedFace(models.Model):
         related_name='faces_detected_in_photos'
     )
 
+    # Detector confidence, and whether recognition was skipped because the face
+    # was below the size/score floor (such faces are always masked)
+    det_score = models.FloatField(null=True, blank=True)
+    recognition_skipped = models.BooleanField(default=False)
+
     def __str__(self):
         user_str = self.matched_user.username if self.matched_user else "Unknown"
-        return f"Face ({user_str}) in Photo {self.photo.id} at {self.bounding_box}"
\ No newline at end of file
+        return f"Face ({user_str}) in Photo {self.photo.id} at {self.bounding_box}"
+
+class PhotoProcessingRun(models.Model):
+    """
+    One execution of process_photo_for_faces: how long every stage took, what it
+    found and how it ended. Stage durations are in seconds and stay empty for
+    stages the run never reached.
+    """
+    class Outcome(models.TextChoices):
+        RUNNING = 'RUNNING', 'Running'
+        SUCCESS = 'SUCCESS', 'Success'
+        NO_FACES = 'NO_FACES', 'No faces'
+        DUPLICATE = 'DUPLICATE', 'Duplicate reused'
+        FAILED = 'FAILED', 'Failed'
+
+    # Stage fields are named '<stage>_seconds'
+    STAGES = [
+        'load', 'image_read', 'detection', 'recognition',
+        'matching', 'persistence', 'regeneration', 'total',
+    ]
+
+    photo = models.ForeignKey(Photo, on_delete=models.CASCADE, related_name='processing_runs')
+    retry_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='retries'
+    )
+    duplicate_of = models.ForeignKey(
+        Photo,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    outcome = models.CharField(max_length=10, choices=Outcome.choices, default=Outcome.RUNNING)
+    error = models.TextField(blank=True)
+    model_version = models.CharField(max_length=50, blank=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+
+    faces_detected = models.PositiveIntegerField(default=0)
+    faces_recognized = models.PositiveIntegerField(default=0)
+    faces_skipped = models.PositiveIntegerField(default=0)
+    matches = models.PositiveIntegerField(default=0)
+    consent_requests = models.PositiveIntegerField(default=0)
+
+    # Resolving the model version, engine and index
+    load_seconds = models.FloatField(null=True, blank=True)
+    image_read_seconds = models.FloatField(null=True, blank=True)
+    detection_seconds = models.FloatField(null=True, blank=True)
+    recognition_seconds = models.FloatField(null=True, blank=True)
+    matching_seconds = models.FloatField(null=True, blank=True)
+    # Writing detected faces and consent requests
+    persistence_seconds = models.FloatField(null=True, blank=True)
+    # Masking and saving public_image
+    regeneration_seconds = models.FloatField(null=True, blank=True)
+    total_seconds = models.FloatField(null=True, blank=True)
+
+    started_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['outcome', 'started_at']),
+        ]
+
+    def __str__(self):
+        return f"Run {self.id} of photo {self.photo_id}: {self.outcome}"
+
+
+class TimelineEntry(models.Model):
+    """
+    A photo in someone's home timeline, written when the photo is posted
+    (fan-out-on-write, see photos/timeline.py) so reading the timeline is a
+    range scan over one owner's rows instead of a join with Follow.
+
+    created_at is the photo's, copied so entries sort and page like photos.
+    """
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    photo = models.ForeignKey(Photo, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('owner', 'photo')
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-photo'], name='timeline_owner_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"Photo {self.photo_id} in {self.owner_id}'s timeline"
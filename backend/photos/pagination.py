@@ -0,0 +1,189 @@
+# backend/photos/pagination.py
+
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first pagination on (created_at, id).
+
+    The cursor is the position of the last (or first) row the client saw, and
+    the next page is "everything older than that row", a range scan on the
+    (created_at, id) index. Unlike page numbers or offsets, pages don't shift
+    when new photos are posted while someone scrolls, and page 500 costs the
+    same as page 1. `id` breaks ties between rows created in the same instant.
+
+    Response: {"next": url|null, "previous": url|null, "results": [...]}
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    timestamp_field = 'created_at'
+    invalid_cursor_message = 'Invalid cursor'
+    # Links point here instead of the request's URL (a page embedded in another response)
+    base_url = None
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'PHOTO_FEED_PAGE_SIZE', 20)
+        max_page_size = getattr(settings, 'PHOTO_FEED_MAX_PAGE_SIZE', 100)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return min(max(requested, 1), max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor = self._start(request)
+        rows = list(self._seek(queryset, cursor, 'id'))
+        return self._finish(rows, cursor, key=lambda row: (getattr(row, self.timestamp_field), row.pk))
+
+    def paginate_merged(self, sources, request):
+        """
+        One page from several sources merged by (timestamp, id), each source a
+        (queryset of (timestamp, id) values, id field) pair. Rows with the same
+        id in more than one source are returned once.
+
+        Returns:
+            list: (timestamp, id) tuples
+        """
+        cursor = self._start(request)
+        reverse = cursor is not None and cursor[0]
+
+        rows = {}
+        for queryset, id_field in sources:
+            for timestamp, pk in self._seek(queryset, cursor, id_field):
+                rows[pk] = (timestamp, pk)
+        rows = sorted(rows.values(), reverse=not reverse)[:self.page_size + 1]
+        return self._finish(rows, cursor, key=lambda row: row)
+
+    def _start(self, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        return self.decode_cursor(request)
+
+    def _seek(self, queryset, cursor, id_field):
+        """The rows after the cursor, ordered away from it, one more than a page."""
+        field = self.timestamp_field
+
+        if cursor is None:
+            queryset = queryset.order_by(f'-{field}', f'-{id_field}')
+        else:
+            reverse, timestamp, pk = cursor
+            if reverse:
+                # Newer than the first row of the current page
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, f'{id_field}__gt': pk})
+                ).order_by(field, id_field)
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, f'{id_field}__lt': pk})
+                ).order_by(f'-{field}', f'-{id_field}')
+
+        # One extra row tells whether there is another page in this direction
+        return queryset[:self.page_size + 1]
+
+    def _finish(self, rows, cursor, key):
+        reverse = cursor is not None and cursor[0]
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        self.key = key
+        return rows
+
+    def decode_cursor(self, request):
+        """
+        Returns:
+            tuple: (reverse, timestamp, id), or None on the first page
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            direction, timestamp, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if direction not in ('n', 'p') or timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return direction == 'p', timestamp, pk
+
+    def get_base_url(self):
+        return self.base_url or self.request.build_absolute_uri()
+
+    def encode_cursor(self, row, reverse):
+        timestamp, pk = self.key(row)
+        position = f"{'p' if reverse else 'n'}|{timestamp.isoformat()}|{pk}"
+        encoded = base64.urlsafe_b64encode(position.encode()).decode()
+        return replace_query_param(self.get_base_url(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Paged past the end; the previous page is the newest one
+            return remove_query_param(self.get_base_url(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor from the next/previous link',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Photos per page',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class InteractionPagination(PageNumberPagination):
+    """Pages of a photo's likes or comments."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
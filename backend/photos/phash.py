@@ -0,0 +1,35 @@
+# backend/photos/phash.py
+"""
+Perceptual hashing for near-duplicate photo detection.
+
+A 64-bit difference hash (dHash) survives resizing and re-compression, so a
+re-upload of the same picture lands within a few bits of the original.
+"""
+
+from PIL import Image
+
+HASH_SIZE = 8
+
+
+def compute_perceptual_hash(img: Image.Image) -> str:
+    """
+    Return the dHash of a PIL image as a 16-character hex string.
+    Each bit says whether a pixel is brighter than its right neighbour
+    in a 9x8 grayscale thumbnail.
+    """
+    small = img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+
+    return f"{value:0{HASH_SIZE * HASH_SIZE // 4}x}"
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """Number of differing bits between two hex hashes."""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
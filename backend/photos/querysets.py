@@ -0,0 +1,40 @@
+# backend/photos/querysets.py
+
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Prefetch, Window
+from django.db.models.functions import RowNumber
+
+
+def latest_comments(limit=None):
+    """
+    The newest `limit` comments of each photo (oldest of them first, the way
+    they're displayed), for prefetching onto `photo.latest_comments`.
+    """
+    from interactions.models import Comment
+
+    if limit is None:
+        limit = getattr(settings, 'PHOTO_COMMENT_PREVIEW_SIZE', 2)
+
+    return Comment.objects.annotate(
+        position=Window(
+            expression=RowNumber(),
+            partition_by=[F('photo')],
+            order_by=[F('created_at').desc(), F('id').desc()]
+        )
+    ).filter(position__lte=limit).select_related('user').order_by('created_at', 'id')
+
+
+def with_feed_relations(queryset, viewer):
+    """
+    Everything PhotoSerializer reads, in a fixed number of queries however many
+    photos, likes and comments there are: one for the photos with their
+    uploaders, one for the latest-comments preview. Like and comment counts
+    are columns on Photo.
+    """
+    from interactions.models import Like
+
+    return queryset.select_related('uploader').annotate(
+        liked_by_me=Exists(Like.objects.filter(photo=OuterRef('pk'), user=viewer)),
+    ).prefetch_related(
+        Prefetch('comments', queryset=latest_comments(), to_attr='latest_comments'),
+    )
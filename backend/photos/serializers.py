@@ -1,5 +1,7 @@
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from .models import Photo, ConsentRequest
+from core.serializers import TimedSerializerMixin
+from .models import Photo, ConsentRequest, PhotoProcessingRun
 from users.models import CustomUser
 # Import the new serializers from the interactions app
 from interactions.serializers import LikeSerializer, CommentSerializer
@@ -7,13 +9,13 @@ from interactions.serializers import LikeSerializer, CommentSerializer
 # --- NESTED SERIALIZERS ---
 # These are small, read-only serializers to represent related objects.
 
-class UploaderInfoSerializer(serializers.ModelSerializer):
+class UploaderInfoSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """A simple serializer for displaying uploader info."""
     class Meta:
         model = CustomUser
         fields = ['username', 'profile_pic']
 
-class NestedPhotoSerializer(serializers.ModelSerializer):
+class NestedPhotoSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """A simple serializer for displaying photo info within a consent request."""
     uploader = UploaderInfoSerializer(read_only=True)
     class Meta:
@@ -23,31 +25,49 @@ class NestedPhotoSerializer(serializers.ModelSerializer):
 
 # --- MAIN SERIALIZERS ---
 
-class PhotoSerializer(serializers.ModelSerializer):
+class PhotoSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the main Photo model.
-    This version includes nested serializers for likes and comments.
+
+    Engagement is summarised rather than embedded: counts, whether the viewer
+    liked it and a short preview of the latest comments. The full lists are
+    paginated at /api/photos/{id}/likes/ and /api/photos/{id}/comments/.
+    liked_by_me and latest_comments come from `with_feed_relations`; a photo
+    without them (one just uploaded) has no engagement yet.
     """
     # Instead of a simple username, we'll show the full uploader object
     uploader = UploaderInfoSerializer(read_only=True)
-    # These lines will include a list of all like/comment objects for each photo
-    likes = LikeSerializer(many=True, read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    liked_by_me = serializers.BooleanField(read_only=True, default=False)
+    latest_comments = serializers.SerializerMethodField()
 
     class Meta:
         model = Photo
-        # Add 'likes' and 'comments' to the fields list
         fields = [
-            'id', 'uploader', 'public_image', 'original_image',
-            'caption', 'created_at', 'likes', 'comments'
+            'id', 'uploader', 'public_image', 'original_image', 'caption', 'created_at',
+            'like_count', 'comment_count', 'liked_by_me', 'latest_comments'
         ]
-        read_only_fields = ['id', 'created_at', 'public_image', 'likes', 'comments']
+        read_only_fields = ['id', 'created_at', 'public_image', 'like_count', 'comment_count']
         extra_kwargs = {
             'original_image': {'write_only': True, 'required': True}
         }
 
+    @extend_schema_field(CommentSerializer(many=True))
+    def get_latest_comments(self, obj):
+        return CommentSerializer(getattr(obj, 'latest_comments', []), many=True).data
+
+
+class ProfilePhotoSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    A tile in a profile's photo grid: the image and its counts, straight from
+    the photo row. The uploader is the profile's owner.
+    """
+    class Meta:
+        model = Photo
+        fields = ['id', 'public_image', 'caption', 'created_at', 'like_count', 'comment_count']
+        read_only_fields = fields
+
 
-class ConsentRequestSerializer(serializers.ModelSerializer):
+class ConsentRequestSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the ConsentRequest model.
     This version includes the nested photo object.
@@ -69,3 +89,19 @@ class ConsentRequestSerializer(serializers.ModelSerializer):
             'id', 'photo', 'requested_user', 'bounding_box', 
             'created_at', 'updated_at'
         ]
+
+
+class PhotoProcessingRunSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Read-only view of one processing run, for staff."""
+
+    class Meta:
+        model = PhotoProcessingRun
+        fields = [
+            'id', 'photo', 'retry_of', 'duplicate_of', 'outcome', 'error',
+            'model_version', 'image_width', 'image_height',
+            'faces_detected', 'faces_recognized', 'faces_skipped', 'matches', 'consent_requests',
+            'load_seconds', 'image_read_seconds', 'detection_seconds', 'recognition_seconds',
+            'matching_seconds', 'persistence_seconds', 'regeneration_seconds', 'total_seconds',
+            'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
@@ -2,23 +2,71 @@
 
 import cv2
 import numpy as np
-from insightface.app import FaceAnalysis
 from PIL import Image, ImageFilter
+from django.conf import settings
 from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
 import logging
 import time
 import os
+from io import BytesIO
 
+from core.metrics import PHOTOS_IN_PROCESSING, observe_processing_run
+from core.realtime import send_to_user
+from notifications.models import Notification
+from notifications.services import notify
 from users.models import CustomUser
-from users.services import get_face_encodings_dict
-from .models import Photo, ConsentRequest, DetectedFace
+from users.face_engine import get_active_model_version, get_face_engine
+from users.face_index import get_face_index
+from .aggregates import Percentile
+from .models import Photo, ConsentRequest, DetectedFace, PhotoProcessingRun
+from .phash import hamming_distance
 
 logger = logging.getLogger('photos')
 
-# Initialize InsightFace (Global)
-# The reliable, crash-proof setting
-app = FaceAnalysis(name='buffalo_l', providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
-app.prepare(ctx_id=0, det_size=(640, 640))
+def _blur_faces(image, bounding_boxes):
+    """Blur every "left,top,right,bottom" box of a PIL image in place."""
+    for bounding_box_str in bounding_boxes:
+        try:
+            # Parse "left,top,right,bottom"
+            coords = [int(float(c)) for c in bounding_box_str.split(',')]
+            left, top, right, bottom = coords
+
+            # Create box tuple (left, top, right, bottom)
+            box = (left, top, right, bottom)
+
+            # Validate coordinates
+            img_w, img_h = image.size
+            if left < 0 or top < 0 or right > img_w or bottom > img_h:
+                continue
+
+            # Calculate face dimensions
+            face_width = right - left
+            face_height = bottom - top
+
+            # Calculate dynamic radius: roughly 25% of the face size
+            # We enforce a minimum of 30 to ensure even small faces are heavily blurred
+            blur_radius = max(30, min(face_width, face_height) // 4)
+
+            # Crop, Blur, Paste
+            face_crop = image.crop(box)
+            blurred_face = face_crop.filter(ImageFilter.GaussianBlur(radius=blur_radius))
+            image.paste(blurred_face, box)
+
+        except Exception as e:
+            logger.error(f"[Regenerate] Error blurring face {bounding_box_str}: {e}")
+
+
+def _encode_public_image(image):
+    """Encode the public image as JPEG into an in-memory buffer."""
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    buffer.seek(0)
+    return buffer
+
 
 def _regenerate_public_image(photo: Photo):
     """
@@ -76,44 +124,10 @@ def _regenerate_public_image(photo: Photo):
         logger.info(f"[Regenerate] Photo {photo.id}: Total={len(all_detected_faces)}, Unmasked={len(all_detected_faces) - len(faces_to_mask)}, Masked={len(faces_to_mask)}.")
 
         # 5. Apply Gaussian Blur to masked faces
-#        5. Apply Gaussian Blur to masked faces
-        for bounding_box_str in faces_to_mask:
-            try:
-                # Parse "left,top,right,bottom"
-                coords = [int(float(c)) for c in bounding_box_str.split(',')]
-                left, top, right, bottom = coords
-                
-                # Create box tuple (left, top, right, bottom)
-                box = (left, top, right, bottom)
-                
-                # Validate coordinates
-                img_w, img_h = public_image.size
-                if left < 0 or top < 0 or right > img_w or bottom > img_h:
-                    continue
-
-                # --- NEW LOGIC START ---
-                # Calculate face dimensions
-                face_width = right - left
-                face_height = bottom - top
-                
-                # Calculate dynamic radius: roughly 25% of the face size
-                # We enforce a minimum of 30 to ensure even small faces are heavily blurred
-                blur_radius = max(30, min(face_width, face_height) // 4)
-                # --- NEW LOGIC END ---
-
-                # Crop, Blur, Paste
-                face_crop = public_image.crop(box)
-                blurred_face = face_crop.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-                public_image.paste(blurred_face, box)
-                
-            except Exception as e:
-                logger.error(f"[Regenerate] Error blurring face {bounding_box_str}: {e}")       
+        _blur_faces(public_image, faces_to_mask)
 
         # 6. Save result
-        from io import BytesIO
-        temp_thumb = BytesIO()
-        public_image.save(temp_thumb, format='JPEG', quality=90)
-        temp_thumb.seek(0)
+        temp_thumb = _encode_public_image(public_image)
 
         photo.public_image.save(
             f"public_{photo.id}.jpg",
@@ -129,9 +143,149 @@ def _regenerate_public_image(photo: Photo):
         logger.error(f"[Regenerate] FAILED: Error regenerating public_image for {photo.id}: {e}", exc_info=True)
 
 
-def process_photo_for_faces(photo_id: int):
+def _below_recognition_floor(face) -> bool:
+    """
+    True if a detected face is too small or too uncertain for recognition.
+    Such faces can never match reliably, so the recognition model is not run.
+    """
+    min_size = getattr(settings, 'FACE_RECOGNITION_MIN_SIZE', 40)
+    min_score = getattr(settings, 'FACE_RECOGNITION_MIN_SCORE', 0.6)
+
+    left, top, right, bottom = face.bbox[0:4]
+    return min(right - left, bottom - top) < min_size or float(face.det_score) < min_score
+
+
+def _save_detected_face(photo, bounding_box_str, matched_user, det_score, recognition_skipped, found_users_for_consent):
+    """
+    Store one DetectedFace and, if a matched user needs to approve it,
+    their ConsentRequest (at most one per user per photo).
+    """
+    DetectedFace.objects.create(
+        photo=photo,
+        bounding_box=bounding_box_str,
+        matched_user=matched_user,
+        det_score=det_score,
+        recognition_skipped=recognition_skipped
+    )
+
+    # Logic for Consent Requests
+    if matched_user:
+        is_uploader = matched_user.id == photo.uploader_id
+        is_public = matched_user.face_sharing_mode == CustomUser.FaceSharingMode.PUBLIC
+        
+        if not is_uploader and not is_public and matched_user.id not in found_users_for_consent:
+            ConsentRequest.objects.create(
+                photo=photo,
+                requested_user=matched_user,
+                bounding_box=bounding_box_str
+            )
+            found_users_for_consent.add(matched_user.id)
+            push_pending_consent_count(matched_user.id)
+            notify(matched_user.id, Notification.Verb.CONSENT_REQUEST, actor_id=photo.uploader_id, photo_id=photo.id)
+            logger.info(f"[PhotoProcessing] Photo {photo.id}: Created ConsentRequest for {matched_user.username}.")
+
+
+def _find_near_duplicate(photo: Photo):
+    """
+    Find an earlier, already processed photo by the same uploader whose
+    perceptual hash is within PHOTO_DUPLICATE_MAX_DISTANCE bits of this one.
+
+    Only photos with stored faces qualify: a photo without faces may simply have
+    failed processing, and reusing it would publish faces unblurred.
+    """
+    if not photo.perceptual_hash:
+        return None
+
+    candidates = Photo.objects.filter(
+        uploader_id=photo.uploader_id,
+        detected_faces__isnull=False
+    ).exclude(id=photo.id).exclude(perceptual_hash='').distinct()
+
+    # Exact hash hits come straight from the (uploader, perceptual_hash) index
+    exact = candidates.filter(perceptual_hash=photo.perceptual_hash).order_by('-created_at').first()
+    if exact:
+        return exact
+
+    max_distance = getattr(settings, 'PHOTO_DUPLICATE_MAX_DISTANCE', 6)
+    lookback = getattr(settings, 'PHOTO_DUPLICATE_LOOKBACK', 200)
+    recent = candidates.order_by('-created_at').values_list('id', 'perceptual_hash')[:lookback]
+
+    best_id, best_distance = None, max_distance + 1
+    for candidate_id, candidate_hash in recent:
+        distance = hamming_distance(photo.perceptual_hash, candidate_hash)
+        if distance < best_distance:
+            best_id, best_distance = candidate_id, distance
+
+    return Photo.objects.filter(id=best_id).first() if best_id else None
+
+
+def _reuse_duplicate_faces(photo: Photo, source: Photo):
+    """
+    Copy the faces of `source` onto `photo`, scaling the boxes to the new
+    resolution, and recreate the consent requests.
+    
+    Returns:
+        int or None: Number of faces reused, or None if the photos don't line up
+            or the source's original can't be read (the caller detects instead)
+    """
+    try:
+        with Image.open(source.original_image.path) as source_img:
+            source_w, source_h = source_img.size
+    except OSError as e:
+        logger.warning(f"[PhotoProcessing] Photo {photo.id}: Cannot read duplicate source photo {source.id}: {e}")
+        return None
+    with Image.open(photo.original_image.path) as new_img:
+        new_w, new_h = new_img.size
+
+    # A crop with a similar hash would misplace every box
+    if abs(source_w / source_h - new_w / new_h) > 0.02:
+        return None
+
+    scale_x, scale_y = new_w / source_w, new_h / source_h
+    found_users_for_consent = set()
+    source_faces = list(source.detected_faces.select_related('matched_user'))
+
+    for face in source_faces:
+        left, top, right, bottom = [float(c) for c in face.bounding_box.split(',')]
+        bounding_box_str = (
+            f"{int(left * scale_x)},{int(top * scale_y)},"
+            f"{int(right * scale_x)},{int(bottom * scale_y)}"
+        )
+        _save_detected_face(
+            photo,
+            bounding_box_str,
+            face.matched_user,
+            det_score=face.det_score,
+            recognition_skipped=face.recognition_skipped,
+            found_users_for_consent=found_users_for_consent
+        )
+
+    return len(source_faces)
+
+
+def _finish_run(run, start_time, outcome=None, error=''):
+    """Close a PhotoProcessingRun; a run still RUNNING at this point did not finish its work."""
+    if outcome:
+        run.outcome = outcome
+    elif run.outcome == PhotoProcessingRun.Outcome.RUNNING:
+        run.outcome = PhotoProcessingRun.Outcome.FAILED
+    if error:
+        run.error = error
+    run.total_seconds = time.time() - start_time
+    run.finished_at = timezone.now()
+    run.save()
+    observe_processing_run(run)
+
+
+@PHOTOS_IN_PROCESSING.track_inprogress()
+def process_photo_for_faces(photo_id: int, retry_of=None):
     """
     Main entry point for processing a new photo using InsightFace.
+
+    Every call is recorded as a PhotoProcessingRun (stage timings, counts, outcome).
+
+    Returns:
+        PhotoProcessingRun, or None if the photo does not exist
     """
     start_time = time.time()
     logger.info(f"[PhotoProcessing] START: Processing NEW photo_id {photo_id}...")
@@ -141,13 +295,17 @@ def process_photo_for_faces(photo_id: int):
         uploader = photo.uploader
     except Photo.DoesNotExist:
         logger.error(f"[PhotoProcessing] FATAL: Photo with id {photo_id} not found.")
-        return
+        return None
+
+    run = PhotoProcessingRun.objects.create(photo=photo, retry_of=retry_of)
+    Outcome = PhotoProcessingRun.Outcome
 
     try:
         # 1. Initialize public image (copy original)
         if not photo.original_image or not os.path.exists(photo.original_image.path):
             logger.error(f"[PhotoProcessing] Original image file not found: {photo.original_image.path}")
-            return
+            _finish_run(run, start_time, Outcome.FAILED, 'Original image file not found')
+            return run
 
         photo.public_image.save(
             photo.original_image.name,
@@ -155,91 +313,248 @@ def process_photo_for_faces(photo_id: int):
             save=True
         )
 
-        # 2. Load known encodings
+        # 2. Re-uploads of an already processed picture reuse its faces and matches
+        duplicate = _find_near_duplicate(photo)
+        if duplicate:
+            reused = _reuse_duplicate_faces(photo, duplicate)
+            if reused is not None:
+                logger.info(f"[PhotoProcessing] Photo {photo.id}: Near-duplicate of photo {duplicate.id}, reused {reused} faces without detection.")
+                run.duplicate_of = duplicate
+                run.faces_detected = reused
+                regeneration_start = time.time()
+                _regenerate_public_image(photo)
+                run.regeneration_seconds = time.time() - regeneration_start
+                _finish_run(run, start_time, Outcome.DUPLICATE)
+                logger.info(f"[PhotoProcessing] SUCCESS: Finished NEW photo {photo.id} in {run.total_seconds:.3f}s (duplicate of {duplicate.id}).")
+                return run
+
+        # 3. Load known encodings
+        # The version is resolved once, so the whole run uses one model and one matrix
         encoding_load_start = time.time()
-        known_encodings_array, known_users = get_face_encodings_dict()
-        encoding_load_time = time.time() - encoding_load_start
-        logger.info(f"[PhotoProcessing] Photo {photo.id}: Loaded {len(known_users)} encodings in {encoding_load_time:.3f}s.")
+        model_version = get_active_model_version()
+        engine = get_face_engine(model_version)
+        face_index = get_face_index(model_version)
+        run.model_version = model_version
+        run.load_seconds = encoding_load_time = time.time() - encoding_load_start
+        logger.info(f"[PhotoProcessing] Photo {photo.id}: Loaded {len(face_index)} '{model_version}' encodings in {encoding_load_time:.3f}s.")
         
-        # 3. Detect faces using InsightFace (Fast!)
-        detection_start = time.time()
+        # 4. Detect faces using InsightFace (Fast!)
+        image_read_start = time.time()
         img_path = photo.original_image.path
         img = cv2.imread(img_path)
+        run.image_read_seconds = time.time() - image_read_start
         
         if img is None:
             logger.error(f"[PhotoProcessing] Error reading image file: {img_path}")
-            return
+            _finish_run(run, start_time, Outcome.FAILED, f'Could not read image file {img_path}')
+            return run
+
+        run.image_height, run.image_width = img.shape[:2]
 
-        faces = app.get(img)
-        detection_time = time.time() - detection_start
+        detection_start = time.time()
+        faces = engine.detect(img)
+        run.detection_seconds = detection_time = time.time() - detection_start
+        run.faces_detected = len(faces)
         logger.info(f"[PhotoProcessing] Photo {photo.id}: Detected {len(faces)} faces in {detection_time:.3f}s.")
 
         if len(faces) == 0:
             logger.info(f"[PhotoProcessing] Photo {photo.id}: No faces detected.")
-            return
+            _finish_run(run, start_time, Outcome.NO_FACES)
+            return run
+
+        # 5. Compute embeddings, except for faces too small or too uncertain to ever
+        #    match reliably. Those are still stored (and therefore always masked).
+        recognition_start = time.time()
+        recognizable = []
+        for face in faces:
+            face.recognition_skipped = _below_recognition_floor(face)
+            if not face.recognition_skipped:
+                engine.embed(img, face)
+                recognizable.append(face)
+        skipped_count = len(faces) - len(recognizable)
+        run.recognition_seconds = recognition_time = time.time() - recognition_start
+        run.faces_recognized = len(recognizable)
+        run.faces_skipped = skipped_count
+        logger.info(
+            f"[PhotoProcessing] Photo {photo.id}: Recognized {len(recognizable)} faces in {recognition_time:.3f}s, "
+            f"skipped recognition for {skipped_count} below the size/score floor."
+        )
 
-        # 4. Match faces and create DB records
+        # 6. Match faces and create DB records
         matching_start = time.time()
+
+        # Match everything first, then load all matched users in one query
+        matches = face_index.match_many([face.embedding for face in recognizable], engine.model_version)
+        user_id_by_face = {id(face): user_id for face, (user_id, _) in zip(recognizable, matches)}
+        face_matches = [(face, user_id_by_face.get(id(face))) for face in faces]
+        run.matching_seconds = time.time() - matching_start
+
+        persistence_start = time.time()
         logger.info(f"[PhotoProcessing] Photo {photo.id}: Saving all {len(faces)} detected faces to database...")
-        
-        found_users_for_consent = set()
 
-        for face in faces:
+        # A retried photo may already have requests; never ask the same user twice
+        found_users_for_consent = set(
+            photo.consent_requests.values_list('requested_user_id', flat=True)
+        ) if retry_of else set()
+        existing_requests = len(found_users_for_consent)
+
+        matched_users = CustomUser.objects.in_bulk(
+            {user_id for _, user_id in face_matches if user_id is not None}
+        )
+        run.matches = sum(1 for _, user_id in face_matches if user_id in matched_users)
+
+        for face, matched_user_id in face_matches:
             # InsightFace bbox is [x1, y1, x2, y2] which translates to [left, top, right, bottom]
             box = face.bbox.astype(int)
             # Store as "left,top,right,bottom"
             bounding_box_str = f"{box[0]},{box[1]},{box[2]},{box[3]}"
-            
-            matched_user = None
-            
-            # Fast Matching using Dot Product
-            if len(known_users) > 0:
-                source_embedding = face.embedding
-                # Cosine similarity (dot product of normalized vectors)
-                source_norm = source_embedding / np.linalg.norm(source_embedding)
-                known_norms = known_encodings_array / np.linalg.norm(known_encodings_array, axis=1, keepdims=True)
-                
-                scores = np.dot(known_norms, source_norm)
-                best_score_index = np.argmax(scores)
-                best_score = scores[best_score_index]
-                
-                # Threshold for InsightFace (usually 0.5 - 0.6)
-                if best_score > 0.5:
-                    matched_user = known_users[best_score_index]
-
-            # Save DetectedFace
-            DetectedFace.objects.create(
-                photo=photo,
-                bounding_box=bounding_box_str,
-                matched_user=matched_user
+            _save_detected_face(
+                photo,
+                bounding_box_str,
+                matched_users.get(matched_user_id),
+                det_score=float(face.det_score),
+                recognition_skipped=face.recognition_skipped,
+                found_users_for_consent=found_users_for_consent
             )
 
-            # Logic for Consent Requests
-            if matched_user:
-                is_uploader = matched_user.id == uploader.id
-                is_public = matched_user.face_sharing_mode == CustomUser.FaceSharingMode.PUBLIC
-                
-                if not is_uploader and not is_public and matched_user.id not in found_users_for_consent:
-                    ConsentRequest.objects.create(
-                        photo=photo,
-                        requested_user=matched_user,
-                        bounding_box=bounding_box_str
-                    )
-                    found_users_for_consent.add(matched_user.id)
-                    logger.info(f"[PhotoProcessing] Photo {photo.id}: Created ConsentRequest for {matched_user.username}.")
-
-        matching_time = time.time() - matching_start 
-        logger.info(f"[PhotoProcessing] Photo {photo.id}: DB save complete in {matching_time:.3f}s. Created {len(found_users_for_consent)} requests.")
-
-        # 5. Apply masking
+        run.persistence_seconds = persistence_time = time.time() - persistence_start
+        run.consent_requests = len(found_users_for_consent) - existing_requests
+        logger.info(f"[PhotoProcessing] Photo {photo.id}: DB save complete in {persistence_time:.3f}s. Created {run.consent_requests} requests.")
+
+        # 7. Apply masking
         logger.info(f"[PhotoProcessing] Photo {photo.id}: Calling _regenerate_public_image to create initial masked version.")
+        regeneration_start = time.time()
         _regenerate_public_image(photo)
+        run.regeneration_seconds = time.time() - regeneration_start
 
-        total_time = time.time() - start_time
-        logger.info(f"[PhotoProcessing] SUCCESS: Finished NEW photo {photo.id} in {total_time:.3f}s.")
+        _finish_run(run, start_time, Outcome.SUCCESS)
+        logger.info(
+            f"[PhotoProcessing] SUCCESS: Finished NEW photo {photo.id} in {run.total_seconds:.3f}s "
+            f"(faces={len(faces)}, recognized={len(recognizable)}, skipped_recognition={skipped_count})."
+        )
 
     except Exception as e:
         logger.error(f"[PhotoProcessing] FAILED: Error processing NEW photo {photo.id}: {e}", exc_info=True)
+        _finish_run(run, start_time, Outcome.FAILED, f'{type(e).__name__}: {e}')
+
+    return run
+
+
+def retry_processing_run(run):
+    """
+    Process a photo again after a failed run. Faces the failed run stored are
+    discarded; consent requests are kept so nobody is asked twice.
+
+    Returns:
+        PhotoProcessingRun: the new run
+
+    Raises:
+        ValueError: if the run did not fail or the photo has been processed since
+    """
+    if run.outcome != PhotoProcessingRun.Outcome.FAILED:
+        raise ValueError(f"Only failed runs can be retried (run {run.id} is {run.outcome})")
+
+    latest = run.photo.processing_runs.order_by('-started_at', '-id').first()
+    if latest.id != run.id:
+        raise ValueError(f"Photo {run.photo_id} has been processed again since run {run.id}")
+
+    logger.info(f"[PhotoProcessing] Retrying failed run {run.id} of photo {run.photo_id}.")
+    run.photo.detected_faces.all().delete()
+    return process_photo_for_faces(run.photo_id, retry_of=run)
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def _aggregate_stats(queryset):
+    """Run counts and stage percentiles per bucket, computed by PostgreSQL (percentile_cont)."""
+    aggregates = {'runs': Count('id'), 'failed': Count('id', filter=Q(outcome=PhotoProcessingRun.Outcome.FAILED))}
+    for stage in PhotoProcessingRun.STAGES:
+        for percentile in PERCENTILES:
+            aggregates[f'{stage}_p{percentile}'] = Percentile(f'{stage}_seconds', percentile / 100)
+
+    return list(queryset.values('bucket').annotate(**aggregates).order_by('bucket'))
+
+
+def _aggregate_stats_in_python(queryset):
+    """
+    The same rows as _aggregate_stats for databases without percentile_cont
+    (SQLite in tests and local development). Fetches every run's timings, so
+    it is only meant for small ledgers.
+    """
+    fields = [f'{stage}_seconds' for stage in PhotoProcessingRun.STAGES]
+    buckets = {}
+    for bucket, outcome, *timings in queryset.values_list('bucket', 'outcome', *fields).order_by('bucket'):
+        buckets.setdefault(bucket, []).append((outcome, timings))
+
+    rows = []
+    for bucket, runs in buckets.items():
+        row = {
+            'bucket': bucket,
+            'runs': len(runs),
+            'failed': sum(1 for outcome, _ in runs if outcome == PhotoProcessingRun.Outcome.FAILED),
+        }
+        for i, stage in enumerate(PhotoProcessingRun.STAGES):
+            # Like percentile_cont: nulls are skipped, values interpolated linearly
+            values = [timings[i] for _, timings in runs if timings[i] is not None]
+            for percentile in PERCENTILES:
+                row[f'{stage}_p{percentile}'] = float(np.percentile(values, percentile)) if values else None
+        rows.append(row)
+    return rows
+
+
+def get_processing_stats(queryset, bucket='day'):
+    """
+    p50/p95/p99 of every stage per time bucket ('hour' or 'day').
+
+    Percentiles are computed in PostgreSQL; other databases fall back to
+    computing them in Python.
+
+    Returns:
+        list: one dict per bucket, oldest first
+    """
+    trunc = {'hour': TruncHour, 'day': TruncDay}[bucket]
+    queryset = queryset.annotate(bucket=trunc('started_at'))
+
+    if connection.vendor == 'postgresql':
+        rows = _aggregate_stats(queryset)
+    else:
+        rows = _aggregate_stats_in_python(queryset)
+
+    stats = []
+    for row in rows:
+        stats.append({
+            'bucket': row['bucket'],
+            'runs': row['runs'],
+            'failed': row['failed'],
+            'stages': {
+                stage: {
+                    f'p{percentile}': row[f'{stage}_p{percentile}']
+                    for percentile in PERCENTILES
+                }
+                for stage in PhotoProcessingRun.STAGES
+            },
+        })
+    return stats
+
+
+def pending_consent_count(user_id):
+    """Served by the (requested_user, status) index."""
+    return ConsentRequest.objects.filter(
+        requested_user_id=user_id,
+        status=ConsentRequest.StatusChoices.PENDING
+    ).count()
+
+
+def push_pending_consent_count(user_id):
+    """
+    Send the user's pending-request count to their open sockets
+    ({"type": "consent_count", "pending": 3}). Counted once the current
+    transaction commits, so the number includes this change and any other.
+    """
+    transaction.on_commit(
+        lambda: send_to_user(user_id, 'consent_count', pending=pending_consent_count(user_id))
+    )
 
 
 def unmask_approved_face(consent_request_id: int):
@@ -261,4 +576,22 @@ def unmask_approved_face(consent_request_id: int):
     except Photo.DoesNotExist:
         logger.error(f"[Unmasking] FAILED: Photo not found for request {consent_request_id}.")
     except Exception as e:
-        logger.error(f"[Unmasking] FAILED: An unexpected error occurred for request {consent_request_id}. Error: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"[Unmasking] FAILED: An unexpected error occurred for request {consent_request_id}. Error: {e}", exc_info=True)
+
+def remask_withdrawn_face(consent_request_id: int):
+    """
+    Called when a user withdraws an approval. Regeneration masks their face again.
+    """
+    logger.info(f"[Masking] START: Received withdrawal for consent_request_id {consent_request_id}...")
+    try:
+        req = ConsentRequest.objects.select_related('photo', 'requested_user').get(id=consent_request_id)
+        if req.status != 'APPROVED':
+            _regenerate_public_image(req.photo)
+            logger.info(f"[Masking] SUCCESS: Photo {req.photo.id} masked again for {req.requested_user.username}.")
+        else:
+            logger.warning(f"[Masking] SKIPPED: Request {consent_request_id} is still 'APPROVED'.")
+
+    except ConsentRequest.DoesNotExist:
+        logger.error(f"[Masking] FAILED: ConsentRequest {consent_request_id} not found.")
+    except Exception as e:
+        logger.error(f"[Masking] FAILED: An unexpected error occurred for request {consent_request_id}. Error: {e}", exc_info=True)
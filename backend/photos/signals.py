@@ -0,0 +1,70 @@
+# backend/photos/signals.py
+"""
+Invalidates cached feed, timeline and profile pages (photos/cache.py) when
+what they show changes. Connected in PhotosConfig.ready().
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from interactions.models import Comment, Like
+from interactions.signals import interaction_deleted
+from users.models import CustomUser, Follow
+from . import cache
+from .models import Photo
+from .timeline import timeline_updated
+
+
+@receiver(post_save, sender=Photo)
+def photo_saved(sender, instance, created, **kwargs):
+    # Later saves are processing results: a new public (masked/unmasked) image
+    tokens = [cache.photo_token(instance.pk)]
+    if created:
+        tokens += [cache.author_token(instance.uploader_id), cache.ALL_PHOTOS_TOKEN]
+    cache.bump(tokens)
+
+
+@receiver(post_delete, sender=Photo)
+def photo_deleted(sender, instance, **kwargs):
+    cache.bump([cache.photo_token(instance.pk), cache.author_token(instance.uploader_id), cache.ALL_PHOTOS_TOKEN])
+
+
+# Deletes come through interaction_deleted and timeline_updated, not post_delete:
+# a post_delete receiver would stop Django fast-deleting likes, comments and
+# follows when a photo or user is deleted.
+
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Comment)
+def engagement_added(sender, instance, **kwargs):
+    cache.bump([cache.photo_token(instance.photo_id)])
+
+
+@receiver(interaction_deleted)
+def engagement_removed(sender, photo_id, **kwargs):
+    cache.bump([cache.photo_token(photo_id)])
+
+
+@receiver(post_save, sender=Follow)
+def follow_added(sender, instance, **kwargs):
+    cache.bump([
+        cache.timeline_token(instance.follower_id),
+        cache.follows_token(instance.follower_id),
+        cache.follows_token(instance.following_id),
+    ])
+
+
+@receiver(timeline_updated)
+def timelines_updated(sender, owner_ids, **kwargs):
+    cache.bump([cache.timeline_token(owner_id) for owner_id in owner_ids])
+
+
+# What profile pages show of the user (users/serializers.py ProfileSerializer);
+# follower and following counts change through follows_token instead
+PROFILE_FIELDS = {'username', 'email', 'first_name', 'last_name', 'bio', 'profile_pic', 'face_sharing_mode'}
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Logins and face processing save other fields and leave profiles as they were
+    if not created and (update_fields is None or PROFILE_FIELDS & set(update_fields)):
+        cache.bump([cache.author_token(instance.pk)])
@@ -1,3 +1,807 @@
-from django.test import TestCase
+# backend/photos/tests.py
+"""
+Query budgets for the photo endpoints. Every budget is checked twice, before
+and after adding more rows, so a new N+1 fails here instead of in production.
 
-# Create your tests here.
+Face processing runs against stub engines and indexes, on real image files in
+a temporary MEDIA_ROOT.
+"""
+
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+from prometheus_client import REGISTRY
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+import numpy as np
+
+from core.counters import reconcile
+from core.testing import seed_photos, seed_users
+from core.realtime import user_group
+from interactions.models import Comment, Like
+from users.models import CustomUser, Follow
+from users.face_engine import get_active_model_version
+from . import cache as feed_cache, services, timeline
+from .models import ConsentRequest, DetectedFace, Photo, PhotoProcessingRun, TimelineEntry
+
+
+# Budgets measure the uncached work; FeedCacheTests covers the cache
+@override_settings(FEED_CACHE_ENABLED=False)
+class QueryBudgetTestCase(APITestCase):
+    def assertQueryBudget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+class FeedQueryCountTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(10)
+        cls.viewer = cls.users[0]
+        seed_photos(cls.users[1], cls.users, 20)
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+
+    def test_feed_query_budget_does_not_grow(self):
+        url = reverse('photo-list') + '?page_size=100'
+        # Photos + uploaders + engagement counts, latest comments + users
+        response = self.assertQueryBudget(url, 2)
+        self.assertEqual(len(response.data['results']), 20)
+
+        seed_photos(self.users[2], self.users, 15, likes_per_photo=9, comments_per_photo=6)
+        response = self.assertQueryBudget(url, 2)
+        self.assertEqual(len(response.data['results']), 35)
+
+    def test_likes_and_comments_query_budget_does_not_grow(self):
+        photo = Photo.objects.first()
+        for name in ('photo-likes', 'photo-comments'):
+            # Photo, count, page with users
+            self.assertQueryBudget(reverse(name, kwargs={'pk': photo.pk}), 3)
+
+
+@override_settings(FEED_CACHE_ENABLED=False)
+class EngagementSummaryTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(6)
+        cls.viewer = cls.users[0]
+        cls.liked, cls.quiet = seed_photos(cls.users[1], cls.users[1:], 2, likes_per_photo=0, comments_per_photo=0)
+        Like.objects.bulk_create([Like(photo=cls.liked, user=user) for user in cls.users[:4]])
+        cls.comments = [
+            Comment.objects.create(photo=cls.liked, user=cls.users[i % 6], text=f'Comment {i}')
+            for i in range(25)
+        ]
+        # Inserted around the write paths, so bring the counters in line
+        list(reconcile())
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+
+    def _feed_entry(self, photo):
+        results = self.client.get(reverse('photo-list')).data['results']
+        return next(entry for entry in results if entry['id'] == photo.id)
+
+    def test_feed_carries_a_summary_not_the_lists(self):
+        entry = self._feed_entry(self.liked)
+        self.assertEqual(entry['like_count'], 4)
+        self.assertEqual(entry['comment_count'], 25)
+        self.assertTrue(entry['liked_by_me'])
+        self.assertEqual([c['id'] for c in entry['latest_comments']], [c.id for c in self.comments[-2:]])
+        self.assertNotIn('likes', entry)
+        self.assertNotIn('email', entry['latest_comments'][0]['user'])
+
+        entry = self._feed_entry(self.quiet)
+        self.assertEqual((entry['like_count'], entry['comment_count'], entry['liked_by_me']), (0, 0, False))
+        self.assertEqual(entry['latest_comments'], [])
+
+    def test_comments_are_paginated_oldest_first(self):
+        url = reverse('photo-comments', kwargs={'pk': self.liked.pk})
+        first = self.client.get(url).data
+        second = self.client.get(first['next']).data
+        self.assertEqual(first['count'], 25)
+        self.assertEqual(
+            [c['id'] for c in first['results'] + second['results']],
+            [c.id for c in self.comments]
+        )
+
+    def test_like_and_unlike(self):
+        url = reverse('photo-like', kwargs={'pk': self.quiet.pk})
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'liked': True, 'like_count': 1})
+        # Liking twice is a no-op
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertTrue(self._feed_entry(self.quiet)['liked_by_me'])
+
+        response = self.client.delete(url)
+        self.assertEqual(response.data, {'liked': False, 'like_count': 0})
+        self.assertFalse(self._feed_entry(self.quiet)['liked_by_me'])
+
+
+@override_settings(FEED_CACHE_ENABLED=False)
+class FeedPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(3)
+        cls.photos = seed_photos(cls.users[1], cls.users, 25, likes_per_photo=0, comments_per_photo=0)
+        # Ten photos posted in the same instant; only the id can order them
+        same_instant = timezone.now() - timedelta(days=1)
+        Photo.objects.filter(id__in=[p.id for p in cls.photos[5:15]]).update(created_at=same_instant)
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    def _walk(self, url):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids.extend(photo['id'] for photo in response.data['results'])
+            url = response.data['next']
+        return ids, pages
+
+    def _newest_first(self):
+        return list(Photo.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_walks_every_photo_once_in_order(self):
+        ids, pages = self._walk(reverse('photo-list') + '?page_size=7')
+        self.assertEqual(ids, self._newest_first())
+        self.assertEqual([len(page['results']) for page in pages], [7, 7, 7, 4])
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_new_photos_do_not_shift_later_pages(self):
+        expected = self._newest_first()
+        first = self.client.get(reverse('photo-list') + '?page_size=10').data
+        seed_photos(self.users[2], self.users, 5, likes_per_photo=0, comments_per_photo=0)
+
+        ids, _ = self._walk(first['next'])
+        self.assertEqual([photo['id'] for photo in first['results']] + ids, expected)
+
+    def test_previous_returns_the_page_before(self):
+        first = self.client.get(reverse('photo-list') + '?page_size=10').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(
+            [photo['id'] for photo in back['results']],
+            [photo['id'] for photo in first['results']]
+        )
+        self.assertIsNone(back['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('photo-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class ConsentRequestQueryCountTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(6)
+        cls.requested = cls.users[0]
+
+    def setUp(self):
+        self.client.force_authenticate(self.requested)
+
+    def _seed_requests(self, uploaders):
+        for uploader in uploaders:
+            for photo in seed_photos(uploader, self.users, 3, likes_per_photo=0, comments_per_photo=0):
+                ConsentRequest.objects.create(photo=photo, requested_user=self.requested, bounding_box='0,0,10,10')
+
+    def test_consent_requests_query_budget_does_not_grow(self):
+        # ETag version, requests + photos + uploaders
+        self._seed_requests(self.users[1:3])
+        response = self.assertQueryBudget(reverse('consentrequest-list'), 2)
+        self.assertEqual(len(response.data), 6)
+
+        self._seed_requests(self.users[3:6])
+        response = self.assertQueryBudget(reverse('consentrequest-list'), 2)
+        self.assertEqual(len(response.data), 15)
+
+
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.requested, cls.uploader, cls.other = seed_users(3)
+        cls.photo = seed_photos(cls.uploader, [cls.other], 1)[0]
+        cls.request = ConsentRequest.objects.create(
+            photo=cls.photo, requested_user=cls.requested, bounding_box='0,0,10,10'
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.requested)
+        self.url = reverse('consentrequest-list')
+
+    def assertNotModified(self, url, etag):
+        # Only the version query; nothing is fetched or serialized
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_polling_unchanged_consent_requests_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('Authorization', response['Vary'])
+        self.assertNotModified(self.url, response['ETag'])
+
+    def test_consent_request_changes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.client.patch(reverse('consentrequest-detail', kwargs={'pk': self.request.pk}), {'status': 'DENIED'})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data[0]['status'], 'DENIED')
+
+        self.photo.public_image = 'photos/public/regenerated.jpg'
+        self.photo.save(update_fields=['public_image', 'updated_at'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_etags_are_per_viewer(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_likes_and_comments_change_the_photo_etag(self):
+        url = reverse('photo-detail', kwargs={'pk': self.photo.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+
+        self.client.post(reverse('photo-like', kwargs={'pk': self.photo.pk}))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertTrue(response.data['liked_by_me'])
+
+        comment = Comment.objects.filter(photo=self.photo).first()
+        self.client.force_authenticate(comment.user)
+        self.client.patch(reverse('comment-detail', kwargs={'pk': comment.pk}), {'text': 'Edited'})
+        self.client.force_authenticate(self.requested)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class PendingConsentCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.requested, cls.uploader = seed_users(2)
+        photos = seed_photos(cls.uploader, [], 3, likes_per_photo=0, comments_per_photo=0)
+        cls.requests = [
+            ConsentRequest.objects.create(photo=photo, requested_user=cls.requested, bounding_box='0,0,10,10')
+            for photo in photos
+        ]
+        cls.requests[0].status = ConsentRequest.StatusChoices.APPROVED
+        cls.requests[0].save()
+
+    def setUp(self):
+        self.client.force_authenticate(self.requested)
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(user_group(self.requested.pk), self.channel)
+
+    def test_count_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('consentrequest-pending-count'))
+        self.assertEqual(response.data, {'pending': 2})
+
+    def test_actioning_a_request_pushes_the_new_count(self):
+        url = reverse('consentrequest-detail', kwargs={'pk': self.requests[1].pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {'status': 'DENIED'})
+
+        message = async_to_sync(self.layer.receive)(self.channel)
+        self.assertEqual(message['event'], {'type': 'consent_count', 'pending': 1})
+
+    def test_deleting_a_photo_pushes_the_new_count(self):
+        self.client.force_authenticate(self.uploader)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('photo-detail', kwargs={'pk': self.requests[2].photo_id}))
+
+        message = async_to_sync(self.layer.receive)(self.channel)
+        self.assertEqual(message['event'], {'type': 'consent_count', 'pending': 1})
+
+
+class CounterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(3)
+        cls.photo = seed_photos(cls.users[1], cls.users, 1, likes_per_photo=0, comments_per_photo=0)[0]
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    def _counts(self):
+        self.photo.refresh_from_db()
+        return self.photo.like_count, self.photo.comment_count
+
+    def test_write_paths_keep_counters_in_step(self):
+        self.client.post(reverse('photo-like', kwargs={'pk': self.photo.pk}))
+        self.client.post(reverse('photo-like', kwargs={'pk': self.photo.pk}))
+        response = self.client.post(reverse('comment-list'), {'photo': self.photo.pk, 'text': 'Nice'})
+        self.assertEqual(self._counts(), (1, 1))
+
+        self.client.delete(reverse('comment-detail', kwargs={'pk': response.data['id']}))
+        self.client.delete(reverse('photo-like', kwargs={'pk': self.photo.pk}))
+        self.client.delete(reverse('photo-like', kwargs={'pk': self.photo.pk}))
+        self.assertEqual(self._counts(), (0, 0))
+
+    def test_reconcile_fixes_drift(self):
+        Like.objects.bulk_create([Like(photo=self.photo, user=user) for user in self.users])
+        Photo.objects.filter(pk=self.photo.pk).update(comment_count=7)
+
+        fixed = sum(fixed for _, _, fixed in reconcile(batch_size=1))
+        self.assertEqual(fixed, 2)
+        self.assertEqual(self._counts(), (3, 0))
+        self.assertEqual(sum(fixed for _, _, fixed in reconcile()), 0)
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=3)
+class HomeTimelineTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(8)
+        cls.viewer, cls.friend, cls.celebrity, cls.stranger = cls.users[:4]
+        Follow.objects.bulk_create(
+            [Follow(follower=cls.viewer, following=cls.friend)]
+            + [Follow(follower=user, following=cls.celebrity) for user in cls.users[:2] + cls.users[4:]]
+        )
+        list(reconcile())
+
+        cls.photos = {}
+        for user in (cls.viewer, cls.friend, cls.celebrity, cls.stranger):
+            user.refresh_from_db()
+            cls.photos[user.pk] = seed_photos(user, cls.users, 4, likes_per_photo=2, comments_per_photo=2)
+            for photo in cls.photos[user.pk]:
+                timeline.fan_out_photo(photo)
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+
+    def _home_ids(self, page_size=5):
+        ids, url = [], reverse('photo-home') + f'?page_size={page_size}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(photo['id'] for photo in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def _expected(self, *users):
+        return list(
+            Photo.objects.filter(uploader__in=users).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def test_home_merges_fanned_out_and_celebrity_photos(self):
+        # The celebrity's photos were only written to their own timeline
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.viewer, photo__uploader=self.celebrity).exists())
+        self.assertEqual(self._home_ids(), self._expected(self.viewer, self.friend, self.celebrity))
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        url = reverse('user-follow', kwargs={'pk': self.stranger.pk})
+        self.client.post(url)
+        self.assertEqual(self._home_ids(), self._expected(self.viewer, self.friend, self.celebrity, self.stranger))
+
+        self.client.delete(url)
+        self.assertEqual(self._home_ids(), self._expected(self.viewer, self.friend, self.celebrity))
+
+    def test_home_query_budget_does_not_grow(self):
+        url = reverse('photo-home') + '?page_size=100'
+        # Celebrities followed, timeline entries, celebrity photos, photos + uploaders, latest comments
+        self.assertQueryBudget(url, 5)
+
+        for photo in seed_photos(self.friend, self.users, 10, likes_per_photo=5, comments_per_photo=4):
+            timeline.fan_out_photo(photo)
+        response = self.assertQueryBudget(url, 5)
+        self.assertEqual(len(response.data['results']), 22)
+
+
+class FeedCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(4)
+        cls.viewer, cls.friend, cls.other, cls.stranger = cls.users
+        Follow.objects.create(follower=cls.viewer, following=cls.friend)
+        cls.photo = seed_photos(cls.friend, cls.users, 1, likes_per_photo=0, comments_per_photo=0)[0]
+        cls.strangers_photo = seed_photos(cls.stranger, cls.users, 1, likes_per_photo=0, comments_per_photo=0)[0]
+        timeline.fan_out_photo(cls.photo)
+
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        self.client.force_authenticate(self.viewer)
+        self.home = reverse('photo-home')
+        self.strangers_profile = reverse('user-profile', kwargs={'username': self.stranger.username})
+
+    def _lookups(self, result):
+        return REGISTRY.get_sample_value('unmask_feed_cache_lookups_total', {'view': 'home', 'result': result}) or 0
+
+    def test_repeat_reads_are_served_from_the_cache(self):
+        hits = self._lookups('hit')
+        # Profiles still run their ETag version query
+        for url, queries in ((self.home, 0), (reverse('photo-list'), 0), (self.strangers_profile, 1)):
+            first = self.client.get(url).data
+            with self.assertNumQueries(queries):
+                self.assertEqual(self.client.get(url).data, first)
+        self.assertEqual(self._lookups('hit'), hits + 1)
+
+    def test_a_like_invalidates_exactly_the_pages_showing_the_photo(self):
+        self.client.get(self.home)
+        self.client.get(self.strangers_profile)
+
+        self.client.force_authenticate(self.other)
+        self.client.post(reverse('photo-like', kwargs={'pk': self.photo.pk}))
+        self.client.force_authenticate(self.viewer)
+
+        stale = self._lookups('stale')
+        self.assertEqual(self.client.get(self.home).data['results'][0]['like_count'], 1)
+        self.assertEqual(self._lookups('stale'), stale + 1)
+        with self.assertNumQueries(1):
+            self.client.get(self.strangers_profile)
+
+    def test_timeline_changes_invalidate_home(self):
+        self.assertEqual([p['id'] for p in self.client.get(self.home).data['results']], [self.photo.id])
+
+        self.client.post(reverse('user-follow', kwargs={'pk': self.stranger.pk}))
+        ids = [p['id'] for p in self.client.get(self.home).data['results']]
+        self.assertEqual(sorted(ids), sorted([self.photo.id, self.strangers_photo.id]))
+
+        new_photo = seed_photos(self.friend, self.users, 1, likes_per_photo=0, comments_per_photo=0)[0]
+        timeline.fan_out_photo(new_photo)
+        self.assertIn(new_photo.id, [p['id'] for p in self.client.get(self.home).data['results']])
+
+    def test_pages_changed_while_being_built_are_not_cached(self):
+        token = feed_cache.photo_token(self.photo.pk)
+        request = mock.Mock(user=self.viewer, build_absolute_uri=lambda: 'http://testserver/api/photos/')
+        builds = []
+
+        def build(liked_meanwhile):
+            builds.append(liked_meanwhile)
+            if liked_meanwhile:
+                feed_cache.bump([token])
+            return {'results': []}, [token]
+
+        for _ in range(2):
+            feed_cache.cached_page('photos', request, lambda: build(liked_meanwhile=True))
+        self.assertEqual(len(builds), 2)
+
+        # Once nothing changes during the build, the page is cached
+        for _ in range(2):
+            feed_cache.cached_page('photos', request, lambda: build(liked_meanwhile=False))
+        self.assertEqual(len(builds), 3)
+
+    def test_only_profile_changes_invalidate_profiles(self):
+        self.client.get(self.strangers_profile)
+        self.stranger.last_login = timezone.now()
+        self.stranger.save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            self.client.get(self.strangers_profile)
+
+        self.stranger.bio = 'Back from the mountains'
+        self.stranger.save(update_fields=['bio'])
+        self.assertEqual(self.client.get(self.strangers_profile).data['user']['bio'], 'Back from the mountains')
+
+    def test_new_public_image_invalidates_pages(self):
+        self.client.get(self.home)
+        self.photo.public_image = 'photos/public/regenerated.jpg'
+        self.photo.save(update_fields=['public_image'])
+        self.assertTrue(self.client.get(self.home).data['results'][0]['public_image'].endswith('regenerated.jpg'))
+
+
+def stub_face(box, score):
+    return SimpleNamespace(bbox=np.array(box, dtype=np.float32), det_score=np.float32(score))
+
+
+class StubFaceEngine:
+    """Detects the given faces in every image and records which ones it embedded."""
+    def __init__(self, faces):
+        self.faces = faces
+        self.model_version = get_active_model_version()
+        self.embedded = []
+
+    def detect(self, img):
+        return self.faces
+
+    def embed(self, img, face):
+        self.embedded.append(face)
+        face.embedding = np.ones(4, dtype=np.float32)
+
+
+class StubFaceIndex:
+    """Matches every embedding to `user_id`."""
+    def __init__(self, user_id=None):
+        self.user_id = user_id
+
+    def __len__(self):
+        return 1
+
+    def match_many(self, embeddings, model_version):
+        return [(self.user_id, 0.9)] * len(embeddings)
+
+
+def noise_image(width, height, seed=0, scale=1):
+    """
+    PNG bytes of random noise, so a blurred region stands out from the original.
+    `scale` enlarges the same picture, as a re-upload at a higher resolution.
+    """
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels).resize((width * scale, height * scale), Image.Resampling.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class FaceProcessingTestCase(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def upload(self, uploader, content, name='upload.png'):
+        return Photo.objects.create(uploader=uploader, original_image=SimpleUploadedFile(name, content))
+
+    def process(self, photo, engine, face_index=None):
+        with mock.patch.object(services, 'get_face_engine', return_value=engine), \
+                mock.patch.object(services, 'get_face_index', return_value=face_index or StubFaceIndex()):
+            return services.process_photo_for_faces(photo.id)
+
+    def blur_level(self, photo, box):
+        """Mean absolute difference between the original and the public image inside `box`."""
+        with Image.open(photo.original_image.path) as original, Image.open(photo.public_image.path) as public:
+            before = np.asarray(original.convert('RGB').crop(box), dtype=np.int16)
+            after = np.asarray(public.convert('RGB').crop(box), dtype=np.int16)
+        return np.abs(before - after).mean()
+
+
+class RecognitionFloorTests(FaceProcessingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.uploader = seed_users(1)[0]
+
+    def test_floor_on_size_and_score(self):
+        self.assertFalse(services._below_recognition_floor(stub_face([0, 0, 40, 40], 0.6)))
+        self.assertTrue(services._below_recognition_floor(stub_face([0, 0, 39, 200], 0.9)))
+        self.assertTrue(services._below_recognition_floor(stub_face([0, 0, 200, 200], 0.59)))
+        with self.settings(FACE_RECOGNITION_MIN_SIZE=10, FACE_RECOGNITION_MIN_SCORE=0.3):
+            self.assertFalse(services._below_recognition_floor(stub_face([0, 0, 20, 20], 0.4)))
+
+    def test_skipped_faces_are_stored_unmatched_and_masked(self):
+        photo = self.upload(self.uploader, noise_image(400, 300))
+        recognizable = stub_face([20, 20, 140, 140], 0.9)
+        tiny = stub_face([300, 40, 320, 60], 0.9)
+        uncertain = stub_face([200, 150, 360, 290], 0.3)
+        engine = StubFaceEngine([recognizable, tiny, uncertain])
+
+        # Every recognized face matches the uploader, whose face stays visible
+        run = self.process(photo, engine, StubFaceIndex(self.uploader.id))
+
+        self.assertEqual(run.outcome, PhotoProcessingRun.Outcome.SUCCESS)
+        self.assertEqual((run.faces_detected, run.faces_recognized, run.faces_skipped), (3, 1, 2))
+        self.assertEqual(engine.embedded, [recognizable])
+
+        faces = {face.bounding_box: face for face in photo.detected_faces.all()}
+        self.assertEqual(faces['20,20,140,140'].matched_user, self.uploader)
+        for box in ('300,40,320,60', '200,150,360,290'):
+            self.assertTrue(faces[box].recognition_skipped)
+            self.assertIsNone(faces[box].matched_user)
+
+        photo.refresh_from_db()
+        self.assertLess(self.blur_level(photo, (20, 20, 140, 140)), 15)
+        self.assertGreater(self.blur_level(photo, (300, 40, 320, 60)), 30)
+        self.assertGreater(self.blur_level(photo, (200, 150, 360, 290)), 30)
+
+
+class DuplicateReuseTests(FaceProcessingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.uploader, cls.friend = seed_users(2)
+
+    def setUp(self):
+        self.source = self.upload(self.uploader, noise_image(400, 300))
+        self.process(self.source, StubFaceEngine([stub_face([20, 20, 140, 140], 0.9)]), StubFaceIndex(self.friend.id))
+
+    def test_near_duplicates_by_perceptual_hash(self):
+        larger = self.upload(self.uploader, noise_image(400, 300, scale=2))
+        self.assertEqual(services._find_near_duplicate(larger), self.source)
+
+        different = self.upload(self.uploader, noise_image(400, 300, seed=1))
+        self.assertIsNone(services._find_near_duplicate(different))
+
+        # Only the uploader's own photos count
+        strangers = self.upload(self.friend, noise_image(400, 300, scale=2))
+        self.assertIsNone(services._find_near_duplicate(strangers))
+
+    def test_duplicate_reuses_faces_with_scaled_boxes(self):
+        photo = self.upload(self.uploader, noise_image(400, 300, scale=2))
+        engine = StubFaceEngine([])
+        engine.detect = mock.Mock(side_effect=AssertionError('detection must be skipped'))
+
+        run = self.process(photo, engine)
+
+        self.assertEqual(run.outcome, PhotoProcessingRun.Outcome.DUPLICATE)
+        self.assertEqual(run.duplicate_of, self.source)
+        face = photo.detected_faces.get()
+        self.assertEqual((face.bounding_box, face.matched_user), ('40,40,280,280', self.friend))
+        self.assertEqual(ConsentRequest.objects.get(photo=photo).requested_user, self.friend)
+
+        photo.refresh_from_db()
+        self.assertGreater(self.blur_level(photo, (40, 40, 280, 280)), 30)
+
+    def test_missing_source_file_falls_back_to_detection(self):
+        photo = self.upload(self.uploader, noise_image(400, 300, scale=2))
+        self.source.original_image.storage.delete(self.source.original_image.name)
+        engine = StubFaceEngine([stub_face([40, 40, 280, 280], 0.9)])
+
+        run = self.process(photo, engine, StubFaceIndex(self.friend.id))
+
+        self.assertEqual(run.outcome, PhotoProcessingRun.Outcome.SUCCESS)
+        self.assertIsNone(run.duplicate_of)
+        self.assertEqual(len(engine.embedded), 1)
+        photo.refresh_from_db()
+        self.assertGreater(self.blur_level(photo, (40, 40, 280, 280)), 30)
+
+
+class ProcessingRunTests(FaceProcessingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.uploader, cls.friend, cls.staff = seed_users(3)
+        cls.staff.is_staff = True
+        cls.staff.save(update_fields=['is_staff'])
+
+    def setUp(self):
+        self.photo = self.upload(self.uploader, noise_image(400, 300))
+
+    def failing_engine(self):
+        engine = StubFaceEngine([])
+        engine.detect = mock.Mock(side_effect=RuntimeError('out of memory'))
+        return engine
+
+    def test_successful_run_records_every_stage(self):
+        run = self.process(self.photo, StubFaceEngine([stub_face([20, 20, 140, 140], 0.9)]), StubFaceIndex(self.friend.id))
+
+        run.refresh_from_db()
+        self.assertEqual(run.outcome, PhotoProcessingRun.Outcome.SUCCESS)
+        self.assertEqual(run.model_version, get_active_model_version())
+        self.assertEqual((run.image_width, run.image_height), (400, 300))
+        self.assertEqual((run.faces_detected, run.matches, run.consent_requests), (1, 1, 1))
+        for stage in PhotoProcessingRun.STAGES:
+            self.assertIsNotNone(getattr(run, f'{stage}_seconds'), stage)
+        self.assertIsNotNone(run.finished_at)
+
+    def test_no_faces_and_failed_runs(self):
+        run = self.process(self.photo, StubFaceEngine([]))
+        self.assertEqual((run.outcome, run.faces_detected), (PhotoProcessingRun.Outcome.NO_FACES, 0))
+        self.assertIsNone(run.matching_seconds)
+
+        run = self.process(self.photo, self.failing_engine())
+        run.refresh_from_db()
+        self.assertEqual(run.outcome, PhotoProcessingRun.Outcome.FAILED)
+        self.assertEqual(run.error, 'RuntimeError: out of memory')
+        # The stage that raised has no timing; the run itself is closed
+        self.assertIsNone(run.detection_seconds)
+        self.assertIsNotNone(run.finished_at)
+        self.assertIsNotNone(run.total_seconds)
+
+    def test_missing_original_fails_the_run(self):
+        self.photo.original_image.storage.delete(self.photo.original_image.name)
+        run = self.process(self.photo, StubFaceEngine([]))
+        self.assertEqual((run.outcome, run.error), (PhotoProcessingRun.Outcome.FAILED, 'Original image file not found'))
+
+    def test_retry_replaces_faces_and_keeps_consent_requests(self):
+        face = stub_face([20, 20, 140, 140], 0.9)
+        # Fails after the faces and the consent request were written
+        with mock.patch.object(services, '_regenerate_public_image', side_effect=RuntimeError('disk full')):
+            failed = self.process(self.photo, StubFaceEngine([face]), StubFaceIndex(self.friend.id))
+        self.assertEqual(failed.outcome, PhotoProcessingRun.Outcome.FAILED)
+
+        with mock.patch.object(services, 'get_face_engine', return_value=StubFaceEngine([face])), \
+                mock.patch.object(services, 'get_face_index', return_value=StubFaceIndex(self.friend.id)):
+            retry = services.retry_processing_run(failed)
+
+        self.assertEqual((retry.outcome, retry.retry_of), (PhotoProcessingRun.Outcome.SUCCESS, failed))
+        self.assertEqual(self.photo.detected_faces.count(), 1)
+        self.assertEqual(self.photo.consent_requests.count(), 1)
+        self.assertEqual(retry.consent_requests, 0)
+
+        # Only the latest failed run can be retried
+        for run in (failed, retry):
+            with self.assertRaises(ValueError):
+                services.retry_processing_run(run)
+
+    def test_retry_endpoint(self):
+        failed = self.process(self.photo, self.failing_engine())
+        url = reverse('processingrun-retry', kwargs={'pk': failed.pk})
+
+        self.client.force_authenticate(self.uploader)
+        self.assertEqual(self.client.post(url).status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        with mock.patch.object(services, 'get_face_engine', return_value=StubFaceEngine([])), \
+                mock.patch.object(services, 'get_face_index', return_value=StubFaceIndex()):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['retry_of'], response.data['outcome']), (failed.pk, 'NO_FACES'))
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('processed again', response.data['error'])
+
+    def test_stats_endpoint(self):
+        self.process(self.photo, StubFaceEngine([]))
+        self.process(self.photo, self.failing_engine())
+        PhotoProcessingRun.objects.create(photo=self.photo)  # Still running: left out
+        url = reverse('processingrun-stats')
+
+        self.client.force_authenticate(self.uploader)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get(url, {'bucket': 'week'}).status_code, 400)
+
+        response = self.client.get(url, {'bucket': 'hour'})
+        self.assertEqual(response.status_code, 200)
+        [bucket] = response.data['results']
+        self.assertEqual((bucket['runs'], bucket['failed']), (2, 1))
+        # Neither run got as far as matching
+        self.assertIsNone(bucket['stages']['matching']['p50'])
+        self.assertGreater(bucket['stages']['total']['p99'], 0)
+        self.assertLessEqual(bucket['stages']['total']['p50'], bucket['stages']['total']['p99'])
+
+    def test_stats_percentiles_interpolate_like_percentile_cont(self):
+        started_at = timezone.now()
+        for total in (1.0, 2.0, 3.0, 4.0, None):
+            PhotoProcessingRun.objects.create(
+                photo=self.photo, outcome=PhotoProcessingRun.Outcome.SUCCESS, total_seconds=total
+            )
+        PhotoProcessingRun.objects.update(started_at=started_at)
+
+        [bucket] = services.get_processing_stats(PhotoProcessingRun.objects.all(), 'day')
+        self.assertEqual(bucket['runs'], 5)
+        for percentile, expected in (('p50', 2.5), ('p95', 3.85), ('p99', 3.97)):
+            self.assertAlmostEqual(bucket['stages']['total'][percentile], expected)
+
+
+class ConsentMaskingTests(FaceProcessingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.uploader, cls.friend = seed_users(2)
+
+    def setUp(self):
+        self.photo = self.upload(self.uploader, noise_image(400, 300))
+        self.process(self.photo, StubFaceEngine([stub_face([20, 20, 140, 140], 0.9)]), StubFaceIndex(self.friend.id))
+        self.url = reverse('consentrequest-detail', kwargs={'pk': ConsentRequest.objects.get(photo=self.photo).pk})
+        self.client.force_authenticate(self.friend)
+
+    def decide(self, status):
+        self.assertEqual(self.client.patch(self.url, {'status': status}).status_code, 200)
+        self.photo.refresh_from_db()
+        return self.blur_level(self.photo, (20, 20, 140, 140))
+
+    def test_withdrawn_approval_masks_the_face_again(self):
+        self.photo.refresh_from_db()
+        self.assertGreater(self.blur_level(self.photo, (20, 20, 140, 140)), 30)
+        for withdrawn in ('PENDING', 'DENIED'):
+            self.assertLess(self.decide('APPROVED'), 15)
+            self.assertGreater(self.decide(withdrawn), 30)
+
+    def test_masking_errors_are_logged_not_raised(self):
+        self.decide('APPROVED')
+        with mock.patch.object(services, '_regenerate_public_image', side_effect=OSError('disk full')), \
+                self.assertLogs('photos', 'ERROR') as logs:
+            self.assertEqual(self.client.patch(self.url, {'status': 'PENDING'}).status_code, 200)
+        self.assertIn('disk full', logs.output[0])
@@ -0,0 +1,144 @@
+# backend/photos/timeline.py
+"""
+Home timelines: the photos of the people you follow, newest first.
+
+Posting a photo writes one TimelineEntry per follower (fan-out-on-write), so
+reading a timeline is a range scan over the reader's own entries. Accounts
+with TIMELINE_FANOUT_LIMIT or more followers are skipped at write time, since
+one post would mean that many inserts. Their recent photos are merged in when
+a timeline is read (fan-out-on-read).
+
+Following someone backfills their recent photos; unfollowing removes them.
+"""
+
+import logging
+
+from django.conf import settings
+from django.dispatch import Signal
+
+from users.models import CustomUser, Follow
+from .models import Photo, TimelineEntry
+
+logger = logging.getLogger('photos')
+
+BATCH_SIZE = 1000
+
+# Sent with owner_ids whenever entries are added to or removed from those timelines
+timeline_updated = Signal()
+
+
+def get_fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 10000)
+
+
+def is_fanned_out_on_read(user):
+    return user.follower_count >= get_fanout_limit()
+
+
+def _insert(owner_ids, photo):
+    entries = [TimelineEntry(owner_id=owner_id, photo=photo, created_at=photo.created_at) for owner_id in owner_ids]
+    TimelineEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    timeline_updated.send(sender=TimelineEntry, owner_ids=owner_ids)
+
+
+def fan_out_photo(photo):
+    """
+    Put a newly posted photo in its uploader's timeline and, unless the
+    uploader is fanned out on read, in every follower's.
+
+    Returns:
+        int: Number of timelines written
+    """
+    uploader = photo.uploader
+    if is_fanned_out_on_read(uploader):
+        _insert([uploader.pk], photo)
+        return 1
+
+    follower_ids = Follow.objects.filter(following=uploader).values_list('follower_id', flat=True)
+    written = 1
+    _insert([uploader.pk], photo)
+
+    batch = []
+    for follower_id in follower_ids.iterator(chunk_size=BATCH_SIZE):
+        batch.append(follower_id)
+        if len(batch) == BATCH_SIZE:
+            _insert(batch, photo)
+            written += len(batch)
+            batch = []
+    if batch:
+        _insert(batch, photo)
+        written += len(batch)
+
+    logger.info(f"[Timeline] Photo {photo.id} fanned out to {written} timelines")
+    return written
+
+
+def backfill_follow(follower, following):
+    """A new follow: copy the followed account's recent photos into the follower's timeline."""
+    if is_fanned_out_on_read(following):
+        return 0
+
+    recent = Photo.objects.filter(uploader=following).order_by('-created_at', '-id').values_list(
+        'id', 'created_at'
+    )[:getattr(settings, 'TIMELINE_BACKFILL_SIZE', 50)]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(owner=follower, photo_id=photo_id, created_at=created_at) for photo_id, created_at in recent],
+        ignore_conflicts=True
+    )
+    timeline_updated.send(sender=TimelineEntry, owner_ids=[follower.pk])
+    return len(recent)
+
+
+def remove_follow(follower, following):
+    """An unfollow: drop the unfollowed account's photos from the follower's timeline."""
+    deleted, _ = TimelineEntry.objects.filter(owner=follower, photo__uploader=following).delete()
+    timeline_updated.send(sender=TimelineEntry, owner_ids=[follower.pk])
+    return deleted
+
+
+def rebuild_timeline(user):
+    """
+    Rewrite a timeline from scratch: the user's own recent photos and those of
+    everyone they follow who isn't fanned out on read. For timelines written
+    around the usual paths (bulk imports, seeding) or lost.
+    """
+    TimelineEntry.objects.filter(owner=user).delete()
+    backfill_size = getattr(settings, 'TIMELINE_BACKFILL_SIZE', 50)
+    sources = [user] + list(
+        CustomUser.objects.filter(
+            follower_set__follower=user,
+            follower_count__lt=get_fanout_limit()
+        )
+    )
+    for source in sources:
+        recent = Photo.objects.filter(uploader=source).order_by('-created_at', '-id').values_list(
+            'id', 'created_at'
+        )[:backfill_size]
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(owner=user, photo_id=photo_id, created_at=created_at) for photo_id, created_at in recent],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+    timeline_updated.send(sender=TimelineEntry, owner_ids=[user.pk])
+
+
+def followed_on_read(user):
+    """Ids of the accounts `user` follows whose photos are merged in on read."""
+    return list(
+        Follow.objects.filter(
+            follower=user,
+            following__follower_count__gte=get_fanout_limit()
+        ).values_list('following_id', flat=True)
+    )
+
+
+def home_timeline_sources(user, celebrity_ids):
+    """
+    What a timeline read merges, as (queryset of (created_at, photo id), id field)
+    pairs for KeysetPagination.paginate_merged: the user's own entries and the
+    photos of `celebrity_ids` (see followed_on_read).
+    """
+    sources = [(TimelineEntry.objects.filter(owner=user).values_list('created_at', 'photo_id'), 'photo_id')]
+    if celebrity_ids:
+        sources.append((Photo.objects.filter(uploader_id__in=celebrity_ids).values_list('created_at', 'id'), 'id'))
+    return sources
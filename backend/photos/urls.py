@@ -1,12 +1,13 @@
 # photos/urls.py
 
 from rest_framework.routers import DefaultRouter
-from .views import PhotoViewSet, ConsentRequestViewSet
+from .views import PhotoViewSet, ConsentRequestViewSet, PhotoProcessingRunViewSet
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
 router.register(r'photos', PhotoViewSet, basename='photo')
 router.register(r'consent-requests', ConsentRequestViewSet, basename='consentrequest')
+router.register(r'processing-runs', PhotoProcessingRunViewSet, basename='processingrun')
 
 # The API URLs are now determined automatically by the router.
 urlpatterns = router.urls
\ No newline at end of file
@@ -1,14 +1,39 @@
 # backend/photos/views.py
+from datetime import timedelta
+from django.db.models import Count, Max
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
-from .models import Photo, ConsentRequest
-from .serializers import PhotoSerializer, ConsentRequestSerializer
-from . import services
+from core.etags import conditional
+from .models import Photo, ConsentRequest, PhotoProcessingRun
+from interactions.models import Comment, Like
+from interactions.serializers import CommentSerializer, LikeSerializer
+from interactions import services as interaction_services
+from .pagination import InteractionPagination, KeysetPagination
+from .querysets import with_feed_relations
+from .serializers import PhotoSerializer, ConsentRequestSerializer, PhotoProcessingRunSerializer
+from . import cache as feed_cache, services, timeline
 import logging
 
 logger = logging.getLogger('photos')
 
 
+def photo_version(request, pk=None):
+    return tuple(Photo.objects.filter(pk=pk).values_list('updated_at', flat=True)) or None
+
+
+def consent_requests_version(request):
+    # The nested photo changes too, e.g. when its public image is regenerated
+    return tuple(ConsentRequest.objects.filter(requested_user=request.user).aggregate(
+        count=Count('id'),
+        updated=Max('updated_at'),
+        photo_updated=Max('photo__updated_at'),
+    ).values())
+
+
 class PhotoViewSet(viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
@@ -16,15 +41,27 @@ class PhotoViewSet(viewsets.ModelViewSet):
     """
     serializer_class = PhotoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Newest first, a page at a time: ?cursor=<from next/previous>&page_size=20
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """
         Return photos ordered by newest first, with optimized queries
         """
-        return Photo.objects.select_related('uploader').prefetch_related(
-            'likes__user',
-            'comments__user'
-        ).order_by('-created_at')  # Newest first!
+        return with_feed_relations(Photo.objects.all(), self.request.user).order_by('-created_at', '-id')  # Newest first!
+
+    def list(self, request, *args, **kwargs):
+        """All photos, newest first; pages are cached per viewer (photos/cache.py)."""
+        def build():
+            data = super(PhotoViewSet, self).list(request, *args, **kwargs).data
+            return data, [feed_cache.ALL_PHOTOS_TOKEN] + feed_cache.photo_tokens(data['results'])
+
+        return Response(feed_cache.cached_page('photos', request, build))
+
+    @conditional(photo_version)
+    def retrieve(self, request, *args, **kwargs):
+        """One photo; answers If-None-Match with a 304 while it hasn't changed."""
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         """
@@ -43,6 +80,78 @@ class PhotoViewSet(viewsets.ModelViewSet):
         # Now, call our service function with the new photo's ID
         services.process_photo_for_faces(photo_id=photo_instance.id)
 
+        # Deliver it to the uploader's and their followers' home timelines
+        timeline.fan_out_photo(photo_instance)
+
+    @action(detail=False, methods=['get'])
+    def home(self, request):
+        """
+        The current user's home timeline: their own photos and those of the
+        people they follow, newest first. Paginated like the list.
+        GET /api/photos/home/?cursor=<from next/previous>
+        """
+        def build():
+            celebrity_ids = timeline.followed_on_read(request.user)
+            sources = timeline.home_timeline_sources(request.user, celebrity_ids)
+            keys = self.paginator.paginate_merged(sources, request)
+            ids = [pk for _, pk in keys]
+            photos = with_feed_relations(Photo.objects.filter(id__in=ids), request.user).in_bulk()
+            # Photos deleted since the page was read are skipped
+            page = [photos[pk] for pk in ids if pk in photos]
+            data = self.paginator.get_paginated_response(self.get_serializer(page, many=True).data).data
+            tokens = [feed_cache.timeline_token(request.user.pk)]
+            tokens += [feed_cache.author_token(user_id) for user_id in celebrity_ids]
+            return data, tokens + feed_cache.photo_tokens(data['results'])
+
+        return Response(feed_cache.cached_page('home', request, build))
+
+    def _paginated(self, queryset, serializer_class):
+        paginator = InteractionPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        return paginator.get_paginated_response(serializer_class(page, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def likes(self, request, pk=None):
+        """
+        Who liked the photo, newest first.
+        GET /api/photos/{id}/likes/?page=2
+        """
+        photo = get_object_or_404(Photo, pk=pk)
+        queryset = Like.objects.filter(photo=photo).select_related('user').order_by('-created_at', '-id')
+        return self._paginated(queryset, LikeSerializer)
+
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        """
+        All comments on the photo, oldest first.
+        GET /api/photos/{id}/comments/?page=2
+        """
+        photo = get_object_or_404(Photo, pk=pk)
+        queryset = Comment.objects.filter(photo=photo).select_related('user').order_by('created_at', 'id')
+        return self._paginated(queryset, CommentSerializer)
+
+    @action(detail=True, methods=['post', 'delete'])
+    def like(self, request, pk=None):
+        """
+        Like (POST) or unlike (DELETE) the photo as the current user.
+        Both are idempotent and return the new state:
+        { "liked": true, "like_count": 12 }
+        """
+        photo = get_object_or_404(Photo, pk=pk)
+
+        if request.method == 'POST':
+            created = interaction_services.like_photo(request.user, photo)
+            response_status = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        else:
+            interaction_services.unlike_photo(request.user, photo)
+            response_status = status.HTTP_200_OK
+
+        photo.refresh_from_db(fields=['like_count'])
+        return Response({
+            'liked': request.method == 'POST',
+            'like_count': photo.like_count,
+        }, status=response_status)
+
     def destroy(self, request, *args, **kwargs):
         """
         Delete a photo (only by owner).
@@ -78,12 +187,19 @@ class PhotoViewSet(viewsets.ModelViewSet):
             except Exception as e:
                 logger.error(f"Failed to delete public_image for photo {photo.id}: {e}")
         
+        # Their badges drop when the photo's pending requests go with it
+        pending_user_ids = list(photo.consent_requests.filter(
+            status=ConsentRequest.StatusChoices.PENDING
+        ).values_list('requested_user_id', flat=True))
+
         # Delete from database (this will cascade to:
         # - ConsentRequest objects
         # - DetectedFace objects
         # - Like objects
         # - Comment objects
         photo.delete()
+        for user_id in pending_user_ids:
+            services.push_pending_consent_count(user_id)
         
         logger.info(f"Successfully deleted photo {photo.id}")
         
@@ -108,17 +224,123 @@ class ConsentRequestViewSet(viewsets.ModelViewSet):
         behavior of showing all objects.
         """
         user = self.request.user
-        return ConsentRequest.objects.filter(requested_user=user).order_by('-created_at')
+        queryset = ConsentRequest.objects.filter(
+            requested_user=user
+        ).select_related('photo__uploader').order_by('-created_at')
+
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        return queryset
+
+    @conditional(consent_requests_version)
+    def list(self, request, *args, **kwargs):
+        """A 304 while nothing has changed. ?status=PENDING for one status only."""
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'], url_path='pending-count')
+    def pending_count(self, request):
+        """
+        How many requests await the current user's decision, for badges.
+        GET /api/consent-requests/pending-count/ -> { "pending": 3 }
+        Changes are also pushed over the WebSocket as "consent_count" events.
+        """
+        return Response({'pending': services.pending_consent_count(request.user.pk)})
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        services.push_pending_consent_count(instance.requested_user_id)
 
     def perform_update(self, serializer):
         """
         This is a new method added to trigger the unmasking service.
         This hook runs when a consent request is updated (e.g., PATCH request).
         """
+        previous_status = serializer.instance.status
         # First, save the instance to ensure the status is updated in the database.
         instance = serializer.save()
+        services.push_pending_consent_count(instance.requested_user_id)
 
         # After saving, check if the new status is 'APPROVED'.
         if instance.status == 'APPROVED':
             # If it is, call our new service to perform the unmasking.
-            services.unmask_approved_face(consent_request_id=instance.id)
\ No newline at end of file
+            services.unmask_approved_face(consent_request_id=instance.id)
+        elif previous_status == 'APPROVED':
+            # A withdrawn approval (back to PENDING or DENIED) masks the face again
+            services.remask_withdrawn_face(consent_request_id=instance.id)
+
+
+class ProcessingRunPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class PhotoProcessingRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Staff-only ledger of photo processing runs.
+
+    Filters: ?outcome=FAILED, ?model_version=buffalo_l, ?photo=<id>
+    """
+    serializer_class = PhotoProcessingRunSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = ProcessingRunPagination
+
+    def get_queryset(self):
+        queryset = PhotoProcessingRun.objects.order_by('-started_at', '-id')
+        params = self.request.query_params
+
+        if params.get('outcome'):
+            queryset = queryset.filter(outcome=params['outcome'])
+        if params.get('model_version'):
+            queryset = queryset.filter(model_version=params['model_version'])
+        if params.get('photo'):
+            queryset = queryset.filter(photo_id=params['photo'])
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        p50/p95/p99 of every stage per time bucket.
+        GET /api/processing-runs/stats/?days=7&bucket=day|hour
+        """
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in ('day', 'hour'):
+            return Response(
+                {'error': "bucket must be 'day' or 'hour'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response({'error': 'days must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Runs still in progress have no totals yet
+        queryset = self.get_queryset().exclude(
+            outcome=PhotoProcessingRun.Outcome.RUNNING
+        ).filter(started_at__gte=timezone.now() - timedelta(days=days))
+
+        return Response({
+            'bucket': bucket,
+            'days': days,
+            'stages': PhotoProcessingRun.STAGES,
+            'results': services.get_processing_stats(queryset, bucket),
+        })
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        """
+        Process the photo of a failed run again.
+        POST /api/processing-runs/{id}/retry/
+        """
+        run = self.get_object()
+        try:
+            new_run = services.retry_processing_run(run)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            self.get_serializer(new_run).data,
+            status=status.HTTP_201_CREATED
+        )
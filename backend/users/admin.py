@@ -3,7 +3,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
-from .models import CustomUser, Follow
+from .models import CustomUser, Follow, FollowSuggestion, FaceModelVersion, FaceEmbedding, FaceReference
 from .services import extract_face_encoding
 
 
@@ -91,4 +91,58 @@ class FollowAdmin(admin.ModelAdmin):
         return request.user.is_superuser
 
 
+@admin.register(FollowSuggestion)
+class FollowSuggestionAdmin(admin.ModelAdmin):
+    """Computed by `manage.py compute_follow_suggestions`; read-only here."""
+    list_display = ['user', 'rank', 'suggested', 'mutual_count', 'computed_at']
+    search_fields = ['user__username']
+    raw_id_fields = ['user', 'suggested']
+    readonly_fields = ['user', 'suggested', 'rank', 'mutual_count', 'computed_at']
+
+
+@admin.register(FaceModelVersion)
+class FaceModelVersionAdmin(admin.ModelAdmin):
+    """
+    Read-only view of recognition model versions.
+    Versions are created, activated and retired through `manage.py reembed_faces`,
+    so a name is only ever a model pack that was loaded and coverage is checked.
+    """
+    list_display = ['name', 'is_active', 'embedding_count', 'created_at', 'activated_at', 'retired_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def embedding_count(self, obj):
+        return FaceEmbedding.objects.filter(model_version=obj.name).count()
+    embedding_count.short_description = 'Embeddings'
+
+
+@admin.register(FaceEmbedding)
+class FaceEmbeddingAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'model_version', 'updated_at']
+    list_filter = ['model_version']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
+    exclude = ['encoding']
+
+
+@admin.register(FaceReference)
+class FaceReferenceAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'is_profile_pic', 'embedded_versions', 'created_at']
+    list_filter = ['is_profile_pic']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
+
+    def get_queryset(self, request):
+        """Optimize queries."""
+        return super().get_queryset(request).select_related('user').prefetch_related('embeddings')
+
+    def embedded_versions(self, obj):
+        return ", ".join(e.model_version for e in obj.embeddings.all()) or '-'
+    embedded_versions.short_description = 'Embedded with'
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
\ No newline at end of file
@@ -0,0 +1,319 @@
+# backend/users/face_engine.py
+"""
+Shared InsightFace engine.
+
+Both users.services (profile pictures) and photos.services (uploaded photos)
+used to build their own FaceAnalysis at import time. The engine loads one model
+pack per model version, lazily, and every caller in the process shares it.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger('users')
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+# Warm-up progress of this process, reported by /readyz
+_warmup_state = {
+    'model_version': None,
+    'loaded': False,
+    'warm': False,
+    'error': None,
+    'seconds': None,
+}
+
+
+def get_default_model_version():
+    """Model pack used when no FaceModelVersion has been activated yet."""
+    return getattr(settings, 'FACE_MODEL_NAME', 'buffalo_l')
+
+
+def get_active_model_version():
+    """
+    Return the name of the model version photo processing should use.
+    Read from the database on every call so a flip is visible immediately.
+    """
+    from users.models import FaceModelVersion
+
+    active = FaceModelVersion.objects.filter(is_active=True).values_list('name', flat=True).first()
+    return active or get_default_model_version()
+
+
+def get_maintained_model_versions():
+    """
+    Return every model version new embeddings must be computed for:
+    the active one plus any version that is being backfilled.
+    """
+    from users.models import FaceModelVersion
+
+    versions = [get_active_model_version()]
+    backfilling = FaceModelVersion.objects.filter(is_active=False, retired_at__isnull=True)
+    for name in backfilling.values_list('name', flat=True):
+        if name not in versions:
+            versions.append(name)
+    return versions
+
+
+# Smallest face (px at detector input) the detector finds reliably
+DETECTOR_MIN_FACE = 16
+# Overlapping tile detections with IoU above this are the same face
+TILE_NMS_IOU = 0.4
+
+
+class FaceEngine:
+    """
+    Wraps a prepared FaceAnalysis for one model version.
+    Every embedding it returns belongs to `model_version`.
+
+    Only the detection and recognition models are loaded; the other models of
+    the pack (landmarks, gender/age) are never used by this app.
+    """
+
+    def __init__(self, model_version):
+        from insightface.app import FaceAnalysis
+
+        self.model_version = model_version
+        self.det_size = tuple(getattr(settings, 'FACE_DET_SIZE', (640, 640)))
+        providers = getattr(
+            settings,
+            'FACE_EXECUTION_PROVIDERS',
+            ['CUDAExecutionProvider', 'CPUExecutionProvider']
+        )
+
+        self.app = FaceAnalysis(
+            name=model_version,
+            providers=providers,
+            allowed_modules=['detection', 'recognition']
+        )
+        self.app.prepare(ctx_id=0, det_size=self.det_size)
+        self.det_model = self.app.det_model
+        self.rec_model = self.app.models.get('recognition')
+
+    def get(self, img):
+        """Detect faces in a BGR image and compute their embeddings."""
+        faces = self.detect(img)
+        for face in faces:
+            self.embed(img, face)
+        return faces
+
+    def warmup(self, sizes):
+        """
+        Run dummy inferences so ONNX sessions are initialised and kernels are
+        selected for every detector input size before real uploads arrive.
+        """
+        for width, height in sizes:
+            dummy = np.zeros((height, width, 3), dtype=np.uint8)
+            self.det_model.detect(dummy, input_size=(width, height))
+        # A blank image has no faces, so feed the recognition model an aligned crop directly
+        self.rec_model.get_feat(np.zeros((112, 112, 3), dtype=np.uint8))
+
+    def embed(self, img, face):
+        """Compute `face.embedding` (aligned from the face's keypoints)."""
+        self.rec_model.get(img, face)
+        return face.embedding
+
+    def detect(self, img):
+        """
+        Find faces without computing embeddings.
+
+        With FACE_DETECTION_MODE = 'adaptive' the detector input size follows the
+        image resolution, and images too large for one pass to see faces of
+        FACE_MIN_FACE_SIZE px are additionally scanned in overlapping tiles whose
+        detections are merged with cross-tile NMS. Tiles stop once
+        FACE_DETECTION_TIME_BUDGET seconds have been spent.
+        """
+        from insightface.app.common import Face
+
+        if getattr(settings, 'FACE_DETECTION_MODE', 'adaptive') != 'adaptive':
+            bboxes, kpss = self.det_model.detect(img, input_size=self.det_size)
+            return [_make_face(Face, bboxes[i], kpss, i) for i in range(bboxes.shape[0])]
+
+        start_time = time.time()
+        img_h, img_w = img.shape[:2]
+        max_side = max(img_h, img_w)
+        max_det = getattr(settings, 'FACE_ADAPTIVE_MAX_DET_SIZE', 1280)
+        min_face = getattr(settings, 'FACE_MIN_FACE_SIZE', 24)
+        budget = getattr(settings, 'FACE_DETECTION_TIME_BUDGET', 8.0)
+
+        # 1. Whole-image pass, sized to the image instead of a fixed 640
+        det_side = int(min(max_det, max(320, _round_up(max_side, 32))))
+        bboxes, kpss = self.det_model.detect(img, input_size=(det_side, det_side))
+        detections = [(bboxes[i], None if kpss is None else kpss[i]) for i in range(bboxes.shape[0])]
+
+        # Smallest face (original px) the whole-image pass can see
+        full_pass_min_face = DETECTOR_MIN_FACE * max_side / det_side
+
+        # 2. Tiles, only if small faces could have been missed
+        tiles_done = tiles_total = 0
+        if full_pass_min_face > min_face:
+            tile_det = self.det_size[0]
+            tile_size = int(tile_det * min_face / DETECTOR_MIN_FACE)
+            # A face the whole-image pass could miss always fits inside one tile
+            overlap = int(min(tile_size // 2, full_pass_min_face * 1.5))
+            tiles = _tile_origins(img_w, img_h, tile_size, overlap)
+            tiles_total = len(tiles)
+
+            for x0, y0 in tiles:
+                if time.time() - start_time > budget:
+                    logger.warning(
+                        f"[FaceEngine] Detection budget of {budget:.1f}s spent after "
+                        f"{tiles_done}/{tiles_total} tiles ({img_w}x{img_h})."
+                    )
+                    break
+
+                x1, y1 = min(x0 + tile_size, img_w), min(y0 + tile_size, img_h)
+                tile_bboxes, tile_kpss = self.det_model.detect(
+                    img[y0:y1, x0:x1], input_size=(tile_det, tile_det)
+                )
+                for i in range(tile_bboxes.shape[0]):
+                    bbox = tile_bboxes[i].copy()
+                    # Cut-off faces on an inner tile edge are whole in a neighbour tile
+                    if _touches_inner_edge(bbox, x0, y0, x1, y1, img_w, img_h):
+                        continue
+                    bbox[[0, 2]] += x0
+                    bbox[[1, 3]] += y0
+                    kps = None
+                    if tile_kpss is not None:
+                        kps = tile_kpss[i] + np.array([x0, y0], dtype=tile_kpss.dtype)
+                    detections.append((bbox, kps))
+                tiles_done += 1
+
+            detections = _nms(detections, TILE_NMS_IOU)
+
+        faces = [
+            Face(bbox=bbox[0:4], kps=kps, det_score=bbox[4])
+            for bbox, kps in detections
+        ]
+        logger.debug(
+            f"[FaceEngine] Adaptive detection on {img_w}x{img_h}: det_size={det_side}, "
+            f"tiles={tiles_done}/{tiles_total}, faces={len(faces)}, {time.time() - start_time:.3f}s."
+        )
+        return faces
+
+
+def _make_face(face_class, bbox, kpss, i):
+    return face_class(bbox=bbox[0:4], kps=None if kpss is None else kpss[i], det_score=bbox[4])
+
+
+def _round_up(value, multiple):
+    return ((int(value) + multiple - 1) // multiple) * multiple
+
+
+def _tile_origins(img_w, img_h, tile_size, overlap):
+    """Top-left corners of overlapping tiles covering the whole image."""
+    step = max(1, tile_size - overlap)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    return [(x, y) for y in starts(img_h) for x in starts(img_w)]
+
+
+def _touches_inner_edge(bbox, x0, y0, x1, y1, img_w, img_h, margin=2):
+    left, top, right, bottom = bbox[0:4]
+    return (
+        (x0 > 0 and left <= margin)
+        or (y0 > 0 and top <= margin)
+        or (x1 < img_w and right >= (x1 - x0) - margin)
+        or (y1 < img_h and bottom >= (y1 - y0) - margin)
+    )
+
+
+def _nms(detections, iou_threshold):
+    """Greedy non-maximum suppression over (bbox[x1, y1, x2, y2, score], kps) pairs."""
+    if not detections:
+        return []
+
+    boxes = np.array([bbox[0:4] for bbox, _ in detections], dtype=np.float32)
+    scores = np.array([bbox[4] for bbox, _ in detections], dtype=np.float32)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(boxes[i, 0], boxes[order[1:], 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[order[1:], 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[order[1:], 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[order[1:], 3])
+        inter = np.maximum(0.0, xx2 - xx1) * np.maximum(0.0, yy2 - yy1)
+        iou = inter / (areas[i] + areas[order[1:]] - inter)
+        order = order[1:][iou <= iou_threshold]
+
+    return [detections[i] for i in keep]
+
+
+def get_face_engine(model_version=None):
+    """
+    Return the process-wide engine for `model_version` (default: the active one),
+    loading the model pack on first use.
+    """
+    model_version = model_version or get_active_model_version()
+
+    engine = _engines.get(model_version)
+    if engine is not None:
+        return engine
+
+    with _engines_lock:
+        engine = _engines.get(model_version)
+        if engine is None:
+            logger.info(f"[FaceEngine] Loading model pack '{model_version}'...")
+            engine = FaceEngine(model_version)
+            _engines[model_version] = engine
+            logger.info(f"[FaceEngine] Model pack '{model_version}' ready.")
+    return engine
+
+
+def warmup_face_engine():
+    """
+    Load the active model version and warm it up. Blocks until done.
+    
+    Returns:
+        bool: True if the engine is warm
+    """
+    from django.db import connection
+
+    start_time = time.time()
+    sizes = getattr(settings, 'FACE_WARMUP_SIZES', [(640, 640)])
+    try:
+        model_version = get_active_model_version()
+        _warmup_state['model_version'] = model_version
+
+        engine = get_face_engine(model_version)
+        _warmup_state['loaded'] = True
+
+        engine.warmup(sizes)
+        _warmup_state['warm'] = True
+        _warmup_state['seconds'] = round(time.time() - start_time, 3)
+        logger.info(f"[FaceEngine] '{model_version}' warm after {_warmup_state['seconds']}s ({len(sizes)} sizes).")
+        return True
+    except Exception as e:
+        _warmup_state['error'] = str(e)
+        logger.error(f"[FaceEngine] Warm-up failed: {e}", exc_info=True)
+        return False
+    finally:
+        # Runs in its own thread at startup; don't leak its DB connection
+        connection.close()
+
+
+def start_warmup():
+    """Warm the engine in a background thread so the server can start accepting health checks."""
+    thread = threading.Thread(target=warmup_face_engine, name='face-engine-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def get_warmup_state():
+    """Snapshot of this process's model loading / warm-up progress."""
+    return dict(_warmup_state)
@@ -0,0 +1,443 @@
+# backend/users/face_index.py
+"""
+Matching index over stored face embeddings.
+
+One index exists per model version. A query embedding can only be matched
+against the index of the model that produced it, so mixing vector spaces
+is impossible by construction.
+
+The bulk of the index is a snapshot file written to FACE_INDEX_DIR and opened
+read-only with np.memmap, so every worker process shares one copy through the
+OS page cache instead of building its own matrix. Embeddings saved after the
+snapshot are read from the database as a small delta on every lookup.
+
+Lookups never write snapshots: that would rewrite the whole matrix inside an
+upload request. `manage.py build_face_index --if-needed`, run periodically,
+folds the delta into a fresh snapshot once it passes
+FACE_INDEX_COMPACT_THRESHOLD rows. Until the first snapshot exists, lookups
+build the index in memory from the database.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger('users')
+
+# Rows saved this close to the snapshot cutoff are re-read as delta, in case
+# their transaction had not committed yet when the snapshot was taken.
+SNAPSHOT_SAFETY_MARGIN = timedelta(seconds=60)
+
+# How many nearest rows to consider when the best one turns out to be stale
+MATCH_CANDIDATES = 5
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def normalize(vectors):
+    """L2-normalise a vector or each row of a matrix."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+@contextmanager
+def _exclusive_lock(path, blocking):
+    """
+    Hold an exclusive lock on the file at `path` across processes. Yields False
+    when another process holds it and `blocking` is off.
+    """
+    with open(path, 'a+b') as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            # Windows
+            import msvcrt
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class EmbeddingSnapshotStore:
+    """
+    On-disk snapshots for one model version.
+
+    Layout of FACE_INDEX_DIR/<model_version>/:
+        manifest.json           -> which snapshot is current
+        <snapshot_id>.f32       -> normalised float32 matrix, one row per user
+        <snapshot_id>.ids.npy   -> user ID of every row
+    The manifest is replaced atomically, so readers never see a partial snapshot.
+    """
+
+    def __init__(self, model_version):
+        self.model_version = model_version
+        base_dir = getattr(settings, 'FACE_INDEX_DIR', os.path.join(settings.BASE_DIR, 'face_index'))
+        self.directory = os.path.join(str(base_dir), model_version)
+        self.manifest_path = os.path.join(self.directory, 'manifest.json')
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def open_snapshot(self, manifest):
+        """Map the snapshot described by `manifest` read-only."""
+        snapshot_id = manifest['snapshot_id']
+        user_ids = np.load(os.path.join(self.directory, f"{snapshot_id}.ids.npy"))
+
+        if manifest['rows'] == 0:
+            return np.empty((0, manifest['dim']), dtype=np.float32), user_ids
+
+        matrix = np.memmap(
+            os.path.join(self.directory, f"{snapshot_id}.f32"),
+            dtype=np.float32,
+            mode='r',
+            shape=(manifest['rows'], manifest['dim'])
+        )
+        return matrix, user_ids
+
+    def write_snapshot(self):
+        """
+        Write every embedding of this version to a new snapshot and make it current.
+        Callers must hold the compaction lock.
+
+        Returns:
+            dict: The new manifest
+        """
+        from users.models import FaceEmbedding
+
+        os.makedirs(self.directory, exist_ok=True)
+        start_time = time.time()
+
+        # Everything saved after the cutoff is served from the delta instead. Only
+        # rows at or before it are written, so a row saved while this runs (whatever
+        # its user_id) can never fall between the snapshot and the delta
+        cutoff = timezone.now() - SNAPSHOT_SAFETY_MARGIN
+        rows = FaceEmbedding.objects.filter(
+            model_version=self.model_version,
+            updated_at__lte=cutoff
+        ).order_by('user_id')
+
+        snapshot_id = f"{int(time.time() * 1000)}-{os.getpid()}"
+        matrix_path = os.path.join(self.directory, f"{snapshot_id}.f32")
+        ids_path = os.path.join(self.directory, f"{snapshot_id}.ids.npy")
+
+        # Rows are appended to the raw float32 file, which np.memmap reads back
+        user_ids = []
+        dim = None
+        with open(matrix_path, 'wb') as f:
+            for user_id, encoding in rows.values_list('user_id', 'encoding').iterator(chunk_size=2000):
+                if dim is None and encoding:
+                    dim = len(encoding)
+                if encoding is None or len(encoding) != dim:
+                    logger.error(f"[FaceIndex] Skipping bad embedding for user {user_id} ({self.model_version})")
+                    continue
+                f.write(normalize(encoding).tobytes())
+                user_ids.append(user_id)
+        written = len(user_ids)
+        if not written:
+            os.remove(matrix_path)
+
+        with open(ids_path, 'wb') as f:
+            np.save(f, np.asarray(user_ids, dtype=np.int64))
+
+        manifest = {
+            'snapshot_id': snapshot_id,
+            'model_version': self.model_version,
+            'rows': written,
+            'dim': dim or 0,
+            'cutoff': cutoff.isoformat(),
+        }
+        tmp_path = f"{self.manifest_path}.{snapshot_id}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+        self._remove_stale_snapshots(keep=snapshot_id)
+        logger.info(
+            f"[FaceIndex] Wrote '{self.model_version}' snapshot {snapshot_id} "
+            f"({written} rows) in {time.time() - start_time:.3f}s."
+        )
+        return manifest
+
+    def compact(self, blocking=False):
+        """
+        Fold the delta into a new snapshot, unless another process is already doing so.
+
+        Returns:
+            dict or None: The new manifest, or None if the lock was busy
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with _exclusive_lock(os.path.join(self.directory, '.lock'), blocking) as locked:
+            if not locked:
+                return None
+            return self.write_snapshot()
+
+    def _remove_stale_snapshots(self, keep):
+        # Processes that still map an old file keep their mapping after unlink
+        for name in os.listdir(self.directory):
+            if name.endswith(('.f32', '.ids.npy')) and not name.startswith(keep):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+class FaceIndex:
+    """
+    Snapshot matrix plus delta for one model version.
+    Every row is L2-normalised, so cosine similarity against every known user
+    is a single matrix-vector product.
+    """
+
+    def __init__(self, model_version, matrix, user_ids, snapshot_id=None, cutoff=None):
+        self.model_version = model_version
+        self.matrix = matrix
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.snapshot_id = snapshot_id
+        self.cutoff = cutoff
+
+        self.delta_matrix = np.empty((0, 0), dtype=np.float32)
+        self.delta_user_ids = np.empty(0, dtype=np.int64)
+        # Snapshot rows superseded by a newer delta row
+        self.overridden = np.zeros(len(self.user_ids), dtype=bool)
+        self.compaction_logged = False
+
+    def __len__(self):
+        return int(len(self.user_ids) - self.overridden.sum() + len(self.delta_user_ids))
+
+    @classmethod
+    def build(cls, model_version):
+        """Load every embedding stored for `model_version` straight from the database."""
+        from users.models import FaceEmbedding
+
+        rows = FaceEmbedding.objects.filter(
+            model_version=model_version
+        ).values_list('user_id', 'encoding')
+
+        user_ids, matrix = _stack(model_version, rows.iterator())
+        return cls(model_version, matrix, user_ids)
+
+    @classmethod
+    def open(cls, store, manifest):
+        """Map the snapshot described by `manifest`."""
+        matrix, user_ids = store.open_snapshot(manifest)
+        return cls(
+            store.model_version,
+            matrix,
+            user_ids,
+            snapshot_id=manifest['snapshot_id'],
+            cutoff=parse_datetime(manifest['cutoff']),
+        )
+
+    def refresh_delta(self):
+        """Reload embeddings saved since the snapshot cutoff."""
+        if self.cutoff is None:
+            return
+
+        from users.models import FaceEmbedding
+
+        rows = FaceEmbedding.objects.filter(
+            model_version=self.model_version,
+            updated_at__gt=self.cutoff
+        ).values_list('user_id', 'encoding')
+
+        delta_user_ids, delta_matrix = _stack(self.model_version, rows.iterator())
+        # Swap the three arrays together so concurrent matches see a consistent delta
+        self.delta_user_ids, self.delta_matrix, self.overridden = (
+            delta_user_ids, delta_matrix, np.isin(self.user_ids, delta_user_ids)
+        )
+
+    def match(self, embedding, model_version, threshold=None):
+        """
+        Return (user_id, score) of the best match above `threshold`,
+        or (None, best_score) when nobody is close enough.
+        """
+        return self.match_many([embedding], model_version, threshold)[0]
+
+    def match_many(self, embeddings, model_version, threshold=None):
+        """
+        Match several query embeddings at once.
+
+        Candidates are checked against the database in one query, so a user whose
+        embedding was removed since the snapshot is skipped in favour of the next
+        best row.
+
+        Returns:
+            list: (user_id or None, score) per query embedding
+        """
+        if model_version != self.model_version:
+            raise ValueError(
+                f"Embedding from '{model_version}' cannot be matched against the "
+                f"'{self.model_version}' index"
+            )
+
+        if not len(embeddings):
+            return []
+
+        if len(self) == 0:
+            return [(None, 0.0)] * len(embeddings)
+
+        if threshold is None:
+            threshold = getattr(settings, 'FACE_MATCH_THRESHOLD', 0.5)
+
+        queries = normalize(np.vstack([np.asarray(e, dtype=np.float32) for e in embeddings]))
+        delta_user_ids, delta_matrix, overridden = self.delta_user_ids, self.delta_matrix, self.overridden
+
+        scores_parts = []
+        ids_parts = []
+        if len(self.user_ids):
+            snapshot_scores = np.asarray(self.matrix @ queries.T)
+            snapshot_scores[overridden] = -np.inf
+            scores_parts.append(snapshot_scores)
+            ids_parts.append(self.user_ids)
+        if len(delta_user_ids):
+            scores_parts.append(delta_matrix @ queries.T)
+            ids_parts.append(delta_user_ids)
+
+        scores = np.vstack(scores_parts)
+        row_ids = np.concatenate(ids_parts)
+
+        k = min(MATCH_CANDIDATES, len(row_ids))
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+
+        candidates = []
+        for column in range(len(embeddings)):
+            rows = top[:, column]
+            rows = rows[np.argsort(-scores[rows, column])]
+            candidates.append([
+                (int(row_ids[row]), float(scores[row, column]))
+                for row in rows
+            ])
+
+        live_ids = self._live_user_ids({
+            user_id
+            for column in candidates
+            for user_id, score in column
+            if score > threshold
+        })
+
+        results = []
+        for column in candidates:
+            best_score = column[0][1]
+            match = next(
+                ((user_id, score) for user_id, score in column if score > threshold and user_id in live_ids),
+                (None, best_score)
+            )
+            results.append(match)
+        return results
+
+    def _live_user_ids(self, user_ids):
+        if not user_ids:
+            return set()
+        if self.cutoff is None:
+            # Built straight from the database, nothing can be stale
+            return user_ids
+
+        from users.models import FaceEmbedding
+
+        return set(FaceEmbedding.objects.filter(
+            model_version=self.model_version,
+            user_id__in=user_ids
+        ).values_list('user_id', flat=True))
+
+
+def _stack(model_version, rows):
+    """Turn (user_id, encoding) rows into (user_ids, normalised matrix)."""
+    user_ids = []
+    encodings = []
+    for user_id, encoding in rows:
+        try:
+            encodings.append(np.asarray(encoding, dtype=np.float32))
+            user_ids.append(user_id)
+        except (TypeError, ValueError) as e:
+            logger.error(f"[FaceIndex] Bad embedding for user {user_id} ({model_version}): {e}")
+
+    if not encodings:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    return np.asarray(user_ids, dtype=np.int64), normalize(np.vstack(encodings))
+
+
+def needs_compaction(index):
+    """Whether the delta has outgrown FACE_INDEX_COMPACT_THRESHOLD."""
+    if index.cutoff is None:
+        return True
+    threshold = getattr(settings, 'FACE_INDEX_COMPACT_THRESHOLD', 1000)
+    # A snapshot younger than the safety margin would just re-read the same rows
+    snapshot_settled = timezone.now() - index.cutoff > 2 * SNAPSHOT_SAFETY_MARGIN
+    return len(index.delta_user_ids) > threshold and snapshot_settled
+
+
+def load_face_index(store):
+    """
+    The process's index for `store`'s current snapshot, with a fresh delta,
+    or None when no snapshot has been written yet.
+    """
+    manifest = store.read_manifest()
+    if manifest is None:
+        return None
+
+    with _indexes_lock:
+        index = _indexes.get(store.model_version)
+        if index is None or index.snapshot_id != manifest['snapshot_id']:
+            try:
+                index = FaceIndex.open(store, manifest)
+            except FileNotFoundError:
+                # Compacted between reading the manifest and opening the files
+                index = FaceIndex.open(store, store.read_manifest())
+            _indexes[store.model_version] = index
+
+    index.refresh_delta()
+    return index
+
+
+def get_face_index(model_version):
+    """
+    Return the matching index for `model_version`: the current snapshot mapped
+    read-only plus the delta, one query. Never writes a snapshot.
+    """
+    index = load_face_index(EmbeddingSnapshotStore(model_version))
+    if index is None:
+        logger.warning(
+            f"[FaceIndex] No '{model_version}' snapshot yet, building in memory; run build_face_index."
+        )
+        return FaceIndex.build(model_version)
+
+    if not index.compaction_logged and needs_compaction(index):
+        index.compaction_logged = True
+        logger.warning(
+            f"[FaceIndex] '{model_version}' delta has {len(index.delta_user_ids)} rows; "
+            f"run build_face_index --if-needed to compact it."
+        )
+    return index
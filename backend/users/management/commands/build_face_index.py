@@ -0,0 +1,38 @@
+# backend/users/management/commands/build_face_index.py
+
+from django.core.management.base import BaseCommand
+from users.face_engine import get_maintained_model_versions
+from users.face_index import EmbeddingSnapshotStore, load_face_index, needs_compaction
+
+
+class Command(BaseCommand):
+    help = 'Write fresh memory-mapped face index snapshots (run periodically to compact the delta)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model-version',
+            dest='model_version',
+            type=str,
+            help='Only rebuild the snapshot for this model version',
+        )
+        parser.add_argument(
+            '--if-needed',
+            action='store_true',
+            help='Skip versions whose delta is below FACE_INDEX_COMPACT_THRESHOLD (for a frequent cron job)',
+        )
+
+    def handle(self, *args, **options):
+        versions = [options['model_version']] if options['model_version'] else get_maintained_model_versions()
+
+        for version in versions:
+            store = EmbeddingSnapshotStore(version)
+            if options['if_needed']:
+                index = load_face_index(store)
+                if index is not None and not needs_compaction(index):
+                    self.stdout.write(f"{version}: delta has {len(index.delta_user_ids)} rows, snapshot kept")
+                    continue
+            self.stdout.write(f"Writing snapshot for '{version}'...")
+            manifest = store.compact(blocking=True)
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ {version}: snapshot {manifest['snapshot_id']} with {manifest['rows']} rows")
+            )
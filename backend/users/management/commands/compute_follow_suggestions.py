@@ -0,0 +1,36 @@
+# backend/users/management/commands/compute_follow_suggestions.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from users.models import CustomUser
+from users.suggestions import compute_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Recompute "who to follow" suggestions from the follow graph (run periodically, e.g. nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            action='append',
+            dest='usernames',
+            help='Only recompute these users\' suggestions',
+        )
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.filter(is_active=True).order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        start_time = time.time()
+        computed = stored = 0
+        for user in users.iterator(chunk_size=500):
+            stored += compute_suggestions(user)
+            computed += 1
+            if computed % 1000 == 0:
+                self.stdout.write(f"  {computed} users...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Stored {stored} suggestions for {computed} users in {time.time() - start_time:.1f}s"
+        ))
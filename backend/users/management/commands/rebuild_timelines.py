@@ -0,0 +1,34 @@
+# backend/users/management/commands/rebuild_timelines.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from photos.timeline import rebuild_timeline
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Rewrite home timelines from the follow graph (after deploying timelines, or bulk imports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            action='append',
+            dest='usernames',
+            help='Only rebuild these users\' timelines',
+        )
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        start_time = time.time()
+        rebuilt = 0
+        for user in users.iterator(chunk_size=500):
+            rebuild_timeline(user)
+            rebuilt += 1
+            if rebuilt % 1000 == 0:
+                self.stdout.write(f"  {rebuilt} timelines...")
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt {rebuilt} timelines in {time.time() - start_time:.1f}s"))
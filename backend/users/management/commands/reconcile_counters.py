@@ -0,0 +1,41 @@
+# backend/users/management/commands/reconcile_counters.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount like/comment/follower/following counters in chunks and fix any that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--counter',
+            action='append',
+            dest='counters',
+            help=f"Only these counters, e.g. --counter like_count (choices: {', '.join(c.field for c in COUNTERS)})",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows recounted per statement')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        counters = COUNTERS
+        if options['counters']:
+            counters = [c for c in COUNTERS if c.field in options['counters']]
+            unknown = set(options['counters']) - {c.field for c in counters}
+            if unknown:
+                raise CommandError(f"Unknown counter(s): {', '.join(sorted(unknown))}")
+
+        totals = {}
+        start_time = time.time()
+        for counter, checked, fixed in reconcile(counters, options['batch_size'], options['dry_run']):
+            total = totals.setdefault(counter, [0, 0])
+            total[0] += checked
+            total[1] += fixed
+
+        verb = 'drifted' if options['dry_run'] else 'fixed'
+        for counter in counters:
+            checked, fixed = totals.get(counter, (0, 0))
+            self.stdout.write(f"  {counter.model}.{counter.field}: {checked} checked, {fixed} {verb}")
+        self.stdout.write(self.style.SUCCESS(f"✓ Reconciled in {time.time() - start_time:.1f}s"))
@@ -0,0 +1,75 @@
+# backend/users/management/commands/reembed_faces.py
+
+from django.core.management.base import BaseCommand
+from users.services import (
+    activate_model_version,
+    get_reembedding_coverage,
+    reembed_face_encodings,
+    retire_model_version,
+)
+
+
+class Command(BaseCommand):
+    help = 'Backfill face embeddings for a new recognition model and activate it once coverage is complete'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model_version',
+            type=str,
+            help="InsightFace model pack to embed with, e.g. 'antelopev2'",
+        )
+        parser.add_argument(
+            '--activate',
+            action='store_true',
+            help='Switch photo processing to this version when every user is covered',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Activate even if some users could not be re-embedded',
+        )
+        parser.add_argument(
+            '--retire',
+            action='store_true',
+            help='Abandon a backfill: stop computing embeddings for this version',
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Only show coverage, do not compute anything',
+        )
+
+    def handle(self, *args, **options):
+        model_version = options['model_version']
+
+        if options['retire']:
+            if retire_model_version(model_version):
+                self.stdout.write(self.style.SUCCESS(f"✓ '{model_version}' retired"))
+            else:
+                self.stdout.write(self.style.WARNING(f"✗ '{model_version}' is active or not being backfilled"))
+            return
+
+        if not options['status']:
+            self.stdout.write(f"Re-embedding users with '{model_version}'...")
+            stats = reembed_face_encodings(model_version)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Processed {stats['total']} users:\n"
+                    f"  ✓ Success: {stats['success']}\n"
+                    f"  ✗ Failed: {stats['failed']}"
+                )
+            )
+
+        coverage = get_reembedding_coverage(model_version)
+        self.stdout.write(
+            f"Coverage vs active '{coverage['active_version']}': "
+            f"{coverage['covered']}/{coverage['required']} users"
+        )
+
+        if options['activate']:
+            if activate_model_version(model_version, force=options['force']):
+                self.stdout.write(self.style.SUCCESS(f"✓ '{model_version}' is now the active model version"))
+            else:
+                self.stdout.write(
+                    self.style.WARNING("✗ Coverage incomplete, not activated (use --force to override)")
+                )
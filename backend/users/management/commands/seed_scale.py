@@ -0,0 +1,397 @@
+# backend/users/management/commands/seed_scale.py
+
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+import time
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from benchmarks.synthetic import make_encodings
+from core.counters import reconcile
+from direct_chat.models import Conversation, Message
+from interactions.models import Comment, Like
+from photos.models import ConsentRequest, DetectedFace, Photo, TimelineEntry
+from photos.timeline import get_fanout_limit
+from users.face_engine import get_active_model_version
+from users.models import CustomUser, FaceEmbedding, Follow
+from users.suggestions import compute_suggestions
+
+# Every seeded account logs in with this password. Its hash, salted with the
+# prefix, marks the rows seed_scale created: --flush deletes only those
+SEED_PASSWORD = 'seed-password'
+# Exponent of the popularity distribution: a few accounts get most follows, likes and uploads
+POPULARITY_EXPONENT = 1.1
+CONSENT_STATUSES = ['PENDING', 'APPROVED', 'DENIED']
+CONSENT_STATUS_WEIGHTS = [0.5, 0.35, 0.15]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def _explicit_timestamps(*fields):
+    """
+    Let bulk_create store the timestamps we generate instead of now().
+    `fields` are (model, field name) pairs with auto_now / auto_now_add.
+    """
+    saved = []
+    for model, name in fields:
+        field = model._meta.get_field(name)
+        saved.append((field, field.auto_now, field.auto_now_add))
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with a deterministic synthetic data set for scale testing: '
+        'users with face embeddings, photos with detected faces and consent requests, '
+        'a power-law follow graph, likes, comments and conversations'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users')
+        parser.add_argument('--photos', type=int, default=5000, help='Number of photos')
+        parser.add_argument('--faces-per-photo', type=float, default=2.0, help='Average detected faces per photo')
+        parser.add_argument('--follows-per-user', type=float, default=20.0, help='Average accounts each user follows')
+        parser.add_argument('--likes-per-photo', type=float, default=8.0, help='Average likes per photo')
+        parser.add_argument('--comments-per-photo', type=float, default=2.0, help='Average comments per photo')
+        parser.add_argument('--conversations', type=int, default=500, help='Number of 1-on-1 conversations')
+        parser.add_argument('--messages-per-conversation', type=float, default=20.0, help='Average messages per conversation')
+        parser.add_argument('--days', type=int, default=90, help='Spread content over this many past days')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data set')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create')
+        parser.add_argument('--prefix', default='seed', help="Seeded usernames are '<prefix>_<n>'")
+        parser.add_argument('--flush', action='store_true', help='Delete previously seeded users (and everything they own) first')
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help='Do not ask for confirmation before --flush deletes'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = np.random.default_rng(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        prefix = options['prefix']
+        # Hashing once with a fixed salt keeps seeding fast and deterministic
+        self.password = make_password(SEED_PASSWORD, salt=f'{prefix}seedscale')
+
+        if options['users'] < 2:
+            raise CommandError('--users must be at least 2')
+
+        named = CustomUser.objects.filter(username__startswith=f'{prefix}_')
+        if named.exclude(password=self.password).exists():
+            raise CommandError(f"Users named '{prefix}_*' exist that seed_scale did not create; use another --prefix")
+        if named.exists():
+            if not options['flush']:
+                raise CommandError(f"Users named '{prefix}_*' already exist; use --flush or another --prefix")
+            self.flush(named)
+
+        start_time = time.time()
+        user_ids = self.seed_users(options['users'])
+        self.popularity = self._popularity(len(user_ids))
+        self.seed_embeddings(user_ids)
+        self.seed_follows(user_ids)
+        photo_ids, photo_uploaders, photo_times = self.seed_photos(user_ids)
+        self.seed_timelines(user_ids, photo_ids, photo_uploaders, photo_times)
+        self.seed_faces(user_ids, photo_ids, photo_uploaders)
+        self.seed_interactions(user_ids, photo_ids, photo_times)
+        self.seed_conversations(user_ids)
+        self.seed_counters()
+        self.seed_suggestions(user_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Seeded in {time.time() - start_time:.1f}s. Log in as {prefix}_0 / {SEED_PASSWORD}; "
+            f"run build_face_index to snapshot the new embeddings."
+        ))
+
+    def flush(self, seeded):
+        if self.options['interactive']:
+            confirm = input(
+                f"This deletes {seeded.count()} seeded users named '{self.options['prefix']}_*' "
+                f"and everything they own. Type 'yes' to continue: "
+            )
+            if confirm != 'yes':
+                raise CommandError('Flush cancelled')
+
+        deleted, _ = seeded.delete()
+        self.stdout.write(f"Deleted {deleted} previously seeded rows")
+
+    # --- helpers ---
+
+    def _bulk(self, model, rows, label):
+        """bulk_create `rows` (any iterable) in batches; returns the created objects' ids."""
+        start_time = time.time()
+        ids = []
+        for chunk in _chunks(rows, self.batch_size):
+            created = model.objects.bulk_create(chunk, batch_size=self.batch_size)
+            ids.extend(obj.pk for obj in created)
+        self.stdout.write(f"  {label}: {len(ids)} rows in {time.time() - start_time:.1f}s")
+        return ids
+
+    def _popularity(self, count):
+        """Zipf-like weights over users, shuffled so the celebrities are random accounts."""
+        weights = 1.0 / np.arange(1, count + 1) ** POPULARITY_EXPONENT
+        self.rng.shuffle(weights)
+        weights /= weights.sum()
+        self.popularity_cdf = np.cumsum(weights)
+        return weights
+
+    def _popular_users(self, size):
+        """Indexes into user_ids drawn by popularity."""
+        cdf = self.popularity_cdf
+        return np.minimum(np.searchsorted(cdf, self.rng.random(size)), len(cdf) - 1)
+
+    def _timestamps(self, count):
+        """Sorted creation times over the last --days days."""
+        offsets = np.sort(self.rng.random(count))[::-1] * self.options['days'] * 86400
+        return [self.now - timedelta(seconds=float(offset)) for offset in offsets]
+
+    # --- stages ---
+
+    def seed_users(self, count):
+        prefix = self.options['prefix']
+        public = self.rng.random(count) < 0.2
+
+        rows = (
+            CustomUser(
+                username=f'{prefix}_{i}',
+                email=f'{prefix}_{i}@example.com',
+                password=self.password,
+                bio=f'Synthetic user {i}',
+                # Mirrors the active centroid, like extract_face_encoding does
+                face_encoding=encoding,
+                encoding_status='SUCCESS',
+                face_sharing_mode=(
+                    CustomUser.FaceSharingMode.PUBLIC if public[i]
+                    else CustomUser.FaceSharingMode.REQUIRE_CONSENT
+                ),
+            )
+            for i, encoding in enumerate(self._encodings(count))
+        )
+        return self._bulk(CustomUser, rows, 'users')
+
+    def _encodings(self, count):
+        """The same embeddings on every call for a given --seed."""
+        for chunk in make_encodings(count, seed=self.options['seed'], chunk_size=self.batch_size):
+            yield from chunk.tolist()
+
+    def seed_embeddings(self, user_ids):
+        """One centroid per user for the active model version."""
+        model_version = get_active_model_version()
+        rows = (
+            FaceEmbedding(user_id=user_id, model_version=model_version, encoding=encoding)
+            for user_id, encoding in zip(user_ids, self._encodings(len(user_ids)))
+        )
+        self._bulk(FaceEmbedding, rows, f"face embeddings ('{model_version}')")
+
+    def seed_follows(self, user_ids):
+        count = len(user_ids)
+        degrees = self.rng.poisson(self.options['follows_per_user'], size=count)
+        followers = np.repeat(np.arange(count), degrees)
+        targets = self._popular_users(len(followers))
+
+        # No self-follows, no duplicate edges
+        keep = followers != targets
+        edges = np.unique(followers[keep].astype(np.int64) * count + targets[keep])
+        rows = (
+            Follow(follower_id=user_ids[edge // count], following_id=user_ids[edge % count])
+            for edge in edges.tolist()
+        )
+        self.follow_edges = edges
+        self._bulk(Follow, rows, 'follows')
+
+    def seed_photos(self, user_ids):
+        count = self.options['photos']
+        uploaders = self._popular_users(count)
+        created = self._timestamps(count)
+        rows = (
+            Photo(
+                uploader_id=user_ids[uploaders[i]],
+                original_image=f'photos/originals/seed/{self.options["prefix"]}_{i}.jpg',
+                public_image=f'photos/public/seed/{self.options["prefix"]}_{i}.jpg',
+                caption=f'Synthetic photo {i}',
+                created_at=created[i],
+            )
+            for i in range(count)
+        )
+        with _explicit_timestamps((Photo, 'created_at')):
+            photo_ids = self._bulk(Photo, rows, 'photos')
+        return photo_ids, uploaders, created
+
+    def seed_timelines(self, user_ids, photo_ids, photo_uploaders, photo_times):
+        """Home timelines as fan_out_photo would have written them."""
+        count = len(user_ids)
+        edges = self.follow_edges
+        followers, targets = edges // count, edges % count
+        follower_counts = np.bincount(targets, minlength=count)
+        # Followers of user u are followers[by_target[bounds[u]:bounds[u + 1]]]
+        by_target = np.argsort(targets, kind='stable')
+        bounds = np.searchsorted(targets[by_target], np.arange(count + 1))
+        fanout_limit = get_fanout_limit()
+
+        def entry_rows():
+            for i, photo_id in enumerate(photo_ids):
+                uploader = int(photo_uploaders[i])
+                owners = [uploader]
+                if follower_counts[uploader] < fanout_limit:
+                    owners.extend(followers[by_target[bounds[uploader]:bounds[uploader + 1]]].tolist())
+                for owner in owners:
+                    yield TimelineEntry(owner_id=user_ids[owner], photo_id=photo_id, created_at=photo_times[i])
+
+        self._bulk(TimelineEntry, entry_rows(), 'timeline entries')
+
+    def seed_faces(self, user_ids, photo_ids, photo_uploaders):
+        """Detected faces; about half are matched, to accounts drawn by popularity."""
+        faces_per_photo = self.rng.poisson(self.options['faces_per_photo'], size=len(photo_ids))
+        # Far fewer than faces; filled while the faces stream into the database
+        consent_rows = []
+
+        def face_rows():
+            for i, photo_id in enumerate(photo_ids):
+                uploader = user_ids[photo_uploaders[i]]
+                requested = set()
+                matches = self._popular_users(faces_per_photo[i]).tolist()
+                for n in range(faces_per_photo[i]):
+                    left, top = (int(v) for v in self.rng.integers(0, 2600, size=2))
+                    size = int(self.rng.integers(24, 400))
+                    box = f'{left},{top},{left + size},{top + size}'
+                    matched = user_ids[matches[n]] if self.rng.random() < 0.5 else None
+                    yield DetectedFace(
+                        photo_id=photo_id,
+                        bounding_box=box,
+                        matched_user_id=matched,
+                        det_score=float(self.rng.uniform(0.6, 0.99)),
+                    )
+                    if matched and matched != uploader and matched not in requested:
+                        requested.add(matched)
+                        consent_rows.append(ConsentRequest(
+                            photo_id=photo_id,
+                            requested_user_id=matched,
+                            bounding_box=box,
+                            status=str(self.rng.choice(CONSENT_STATUSES, p=CONSENT_STATUS_WEIGHTS)),
+                        ))
+
+        self._bulk(DetectedFace, face_rows(), 'detected faces')
+        self._bulk(ConsentRequest, consent_rows, 'consent requests')
+
+    def seed_interactions(self, user_ids, photo_ids, photo_times):
+        count = len(user_ids)
+        likes_per_photo = self.rng.poisson(self.options['likes_per_photo'], size=len(photo_ids))
+        photo_index = np.repeat(np.arange(len(photo_ids)), likes_per_photo)
+        likers = self._popular_users(len(photo_index))
+        # (user, photo) is unique
+        pairs = np.unique(photo_index.astype(np.int64) * count + likers)
+
+        def like_rows():
+            for pair in pairs.tolist():
+                photo = pair // count
+                yield Like(
+                    photo_id=photo_ids[photo],
+                    user_id=user_ids[pair % count],
+                    created_at=photo_times[photo] + timedelta(minutes=int(self.rng.integers(1, 2880))),
+                )
+
+        comments_per_photo = self.rng.poisson(self.options['comments_per_photo'], size=len(photo_ids))
+
+        def comment_rows():
+            for photo, comments in enumerate(comments_per_photo.tolist()):
+                commenters = self._popular_users(comments)
+                for n, user in enumerate(commenters.tolist()):
+                    yield Comment(
+                        photo_id=photo_ids[photo],
+                        user_id=user_ids[user],
+                        text=f'Synthetic comment {n}',
+                        created_at=photo_times[photo] + timedelta(minutes=int(self.rng.integers(1, 2880))),
+                    )
+
+        with _explicit_timestamps((Like, 'created_at'), (Comment, 'created_at')):
+            self._bulk(Like, like_rows(), 'likes')
+            self._bulk(Comment, comment_rows(), 'comments')
+
+    def seed_conversations(self, user_ids):
+        """Conversations between accounts that follow each other or one another."""
+        count = len(user_ids)
+        edges = self.follow_edges
+        wanted = min(self.options['conversations'], len(edges))
+        if not wanted:
+            return
+
+        chosen = self.rng.choice(edges, size=wanted, replace=False)
+        # One conversation per pair, whoever follows whom
+        pairs = sorted({tuple(sorted((edge // count, edge % count))) for edge in chosen.tolist()})
+        message_counts = self.rng.poisson(self.options['messages_per_conversation'], size=len(pairs))
+        starts = self._timestamps(len(pairs))
+
+        with _explicit_timestamps((Conversation, 'created_at'), (Message, 'created_at')):
+            conversation_ids = self._bulk(
+                Conversation,
+                (Conversation(created_at=starts[i]) for i in range(len(pairs))),
+                'conversations'
+            )
+            Participant = Conversation.participants.through
+            self._bulk(
+                Participant,
+                (
+                    Participant(conversation_id=conversation_id, customuser_id=user_ids[user])
+                    for conversation_id, pair in zip(conversation_ids, pairs)
+                    for user in pair
+                ),
+                'conversation participants'
+            )
+
+            last_message_at = {}
+
+            def message_rows():
+                for i, (conversation_id, pair) in enumerate(zip(conversation_ids, pairs)):
+                    sent = starts[i]
+                    total = int(message_counts[i])
+                    for n in range(total):
+                        sent = sent + timedelta(seconds=int(self.rng.integers(5, 3600)))
+                        yield Message(
+                            conversation_id=conversation_id,
+                            sender_id=user_ids[pair[n % 2]],
+                            text=f'Synthetic message {n}',
+                            # Everything but the tail of the conversation has been read
+                            is_read=n < total - 3,
+                            created_at=sent,
+                        )
+                    if total:
+                        last_message_at[conversation_id] = sent
+
+            self._bulk(Message, message_rows(), 'messages')
+
+        Conversation.objects.bulk_update(
+            [Conversation(id=cid, last_message_at=sent) for cid, sent in last_message_at.items()],
+            ['last_message_at'],
+            batch_size=self.batch_size
+        )
+
+    def seed_counters(self):
+        """bulk_create skips the write paths that maintain the counter columns."""
+        start_time = time.time()
+        fixed = sum(fixed for _, _, fixed in reconcile(batch_size=self.batch_size))
+        self.stdout.write(f"  counters: {fixed} rows recounted in {time.time() - start_time:.1f}s")
+
+    def seed_suggestions(self, user_ids):
+        """Ranked by follower_count, so after seed_counters."""
+        start_time = time.time()
+        stored = 0
+        for user in CustomUser.objects.filter(pk__in=user_ids).iterator(chunk_size=self.batch_size):
+            stored += compute_suggestions(user)
+        self.stdout.write(f"  follow suggestions: {stored} rows in {time.time() - start_time:.1f}s")
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.13 on 2026-10-19 07:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Every encoding stored before versioning was computed with buffalo_l
+LEGACY_MODEL_VERSION = 'buffalo_l'
+
+
+def tag_existing_encodings(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    FaceEmbedding = apps.get_model('users', 'FaceEmbedding')
+    FaceModelVersion = apps.get_model('users', 'FaceModelVersion')
+
+    FaceModelVersion.objects.create(name=LEGACY_MODEL_VERSION, is_active=True)
+
+    users = CustomUser.objects.filter(
+        encoding_status='SUCCESS',
+        face_encoding__isnull=False
+    ).values_list('id', 'face_encoding')
+    FaceEmbedding.objects.bulk_create(
+        [
+            FaceEmbedding(user_id=user_id, model_version=LEGACY_MODEL_VERSION, encoding=encoding)
+            for user_id, encoding in users.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_follow_options_alter_follow_follower_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(db_index=True, max_length=50)),
+                ('encoding', models.JSONField(help_text='Embedding vector produced by model_version')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FaceModelVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="InsightFace model pack name, e.g. 'buffalo_l'", max_length=50, unique=True)),
+                ('is_active', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='facemodelversion',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='unique_active_face_model_version'),
+        ),
+        migrations.AddField(
+            model_name='faceembedding',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='face_embeddings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='faceembedding',
+            unique_together={('user', 'model_version')},
+        ),
+        migrations.RunPython(tag_existing_encodings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-19 07:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_face_model_versions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='faceembedding',
+            index=models.Index(fields=['model_version', 'updated_at'], name='users_facee_model_v_c06c56_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.13 on 2026-10-19 07:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def register_profile_pictures(apps, schema_editor):
+    """Turn every existing profile-picture embedding into a single reference."""
+    CustomUser = apps.get_model('users', 'CustomUser')
+    FaceEmbedding = apps.get_model('users', 'FaceEmbedding')
+    FaceReference = apps.get_model('users', 'FaceReference')
+    FaceReferenceEmbedding = apps.get_model('users', 'FaceReferenceEmbedding')
+
+    references = {}
+    for user in CustomUser.objects.exclude(profile_pic__in=['', None]).iterator():
+        references[user.id] = FaceReference.objects.create(
+            user=user,
+            image=user.profile_pic.name,
+            is_profile_pic=True
+        )
+
+    FaceReferenceEmbedding.objects.bulk_create(
+        [
+            FaceReferenceEmbedding(
+                reference=references[embedding.user_id],
+                model_version=embedding.model_version,
+                encoding=embedding.encoding,
+                quality=1.0
+            )
+            for embedding in FaceEmbedding.objects.iterator()
+            if embedding.user_id in references
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_face_embedding_delta_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to='face_references/')),
+                ('is_profile_pic', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='face_references', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-is_profile_pic', 'created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FaceReferenceEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(max_length=50)),
+                ('encoding', models.JSONField()),
+                ('quality', models.FloatField(default=1.0, help_text='Detector score scaled by face size')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reference', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='embeddings', to='users.facereference')),
+            ],
+            options={
+                'unique_together': {('reference', 'model_version')},
+            },
+        ),
+        migrations.RunPython(register_profile_pictures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# Expressions match the SQL Django emits for istartswith/icontains on PostgreSQL
+CREATE_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS user_search_trgm_idx ON users_customuser USING gin ('
+    'UPPER("username"::text) gin_trgm_ops, '
+    'UPPER("first_name"::text) gin_trgm_ops, '
+    'UPPER("last_name"::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS user_username_prefix_idx ON users_customuser '
+    '(UPPER("username"::text) text_pattern_ops)',
+]
+
+DROP_SQL = [
+    'DROP INDEX IF EXISTS user_search_trgm_idx',
+    'DROP INDEX IF EXISTS user_username_prefix_idx',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        # Trigram indexes are PostgreSQL-only; elsewhere search falls back to scans
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.13 on 2026-10-19 09:02
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def retire_replaced_versions(apps, schema_editor):
+    # Inactive versions that were once activated have been replaced; the rest are backfills
+    FaceModelVersion = apps.get_model('users', 'FaceModelVersion')
+    FaceModelVersion.objects.filter(is_active=False, activated_at__isnull=False).update(retired_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facemodelversion',
+            name='retired_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(retire_replaced_versions, migrations.RunPython.noop),
+    ]
@@ -72,6 +72,16 @@ class CustomUser(AbstractUser):
         default=FaceSharingMode.REQUIRE_CONSENT,
         help_text="User's preference for face sharing"
     )
+
+    # Denormalised counts, kept in step by the follow write path (core/counters.py)
+    follower_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Most-followed accounts first: the fallback for follow suggestions
+            models.Index(fields=['-follower_count', 'id'], name='user_popularity_idx'),
+        ]
     
     # Fix for groups and user_permissions to avoid clashes
     groups = models.ManyToManyField(
@@ -97,3 +107,147 @@ class CustomUser(AbstractUser):
     def has_valid_face_encoding(self):
         """Check if user has a successfully computed face encoding."""
         return self.encoding_status == 'SUCCESS' and self.face_encoding is not None
+
+
+class FollowSuggestion(models.Model):
+    """
+    An account suggested for `user` to follow, precomputed by users/suggestions.py.
+    `rank` 1 is the best; `mutual_count` is how many of the accounts `user`
+    follows already follow `suggested` (0 for a popular-account fallback).
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions'
+    )
+    suggested = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    rank = models.PositiveIntegerField()
+    mutual_count = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'suggested'], name='unique_follow_suggestion'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'rank'], name='follow_suggestion_rank_idx'),
+        ]
+        ordering = ['rank']
+
+    def __str__(self):
+        return f"{self.suggested_id} for {self.user_id} (#{self.rank})"
+
+
+class FaceModelVersion(models.Model):
+    """
+    A recognition model (InsightFace model pack) that embeddings are computed with.
+
+    Embeddings from different models live in different vector spaces, so every
+    FaceEmbedding is tagged with the version it came from. Exactly one version is
+    active at a time; photo processing only ever matches against that version.
+
+    A version that is neither active nor retired is being backfilled, and new
+    embeddings are computed for it too. Activating a version retires the one it
+    replaces; retired versions are no longer computed or loaded.
+    """
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="InsightFace model pack name, e.g. 'buffalo_l'"
+    )
+    is_active = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+    retired_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'],
+                condition=models.Q(is_active=True),
+                name='unique_active_face_model_version',
+            ),
+        ]
+
+    def __str__(self):
+        if self.is_active:
+            return f"{self.name} (active)"
+        return f"{self.name}{' (retired)' if self.retired_at else ' (backfilling)'}"
+
+
+class FaceEmbedding(models.Model):
+    """
+    A user's face embedding for one specific model version.
+    Old and new versions coexist while a re-embedding job is running.
+
+    This is the single row the face index matches against: the quality-weighted
+    centroid of the user's FaceReferenceEmbeddings for that version.
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='face_embeddings'
+    )
+    model_version = models.CharField(max_length=50, db_index=True)
+    encoding = models.JSONField(help_text="Embedding vector produced by model_version")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'model_version')
+        indexes = [
+            # Delta lookups for the memory-mapped face index
+            models.Index(fields=['model_version', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"Embedding for {self.user.username} ({self.model_version})"
+
+
+class FaceReference(models.Model):
+    """
+    A reference image a user registered so they can be recognised in photos.
+    The current profile picture is always kept as one reference (is_profile_pic).
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='face_references'
+    )
+    image = models.ImageField(upload_to='face_references/')
+    is_profile_pic = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-is_profile_pic', 'created_at']
+
+    def __str__(self):
+        kind = 'profile pic' if self.is_profile_pic else 'reference'
+        return f"Face {kind} {self.id} of {self.user.username}"
+
+
+class FaceReferenceEmbedding(models.Model):
+    """
+    Embedding of one reference image under one model version.
+    `quality` weights the reference inside the user's centroid (FaceEmbedding).
+    """
+    reference = models.ForeignKey(
+        FaceReference,
+        on_delete=models.CASCADE,
+        related_name='embeddings'
+    )
+    model_version = models.CharField(max_length=50)
+    encoding = models.JSONField()
+    quality = models.FloatField(default=1.0, help_text="Detector score scaled by face size")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('reference', 'model_version')
+
+    def __str__(self):
+        return f"Embedding of reference {self.reference_id} ({self.model_version})"
@@ -0,0 +1,31 @@
+# backend/users/search.py
+"""
+User directory search: username prefixes and substrings of usernames and
+names, prefix matches first.
+
+On PostgreSQL these are index lookups (migration 0008): a trigram GIN index
+over the upper-cased username and names serves `icontains`, and a pattern
+btree over the upper-cased username serves `istartswith`. Trigrams need
+three characters, so shorter queries only match username prefixes.
+"""
+
+from django.conf import settings
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import CustomUser
+
+MIN_SUBSTRING_LENGTH = 3
+
+
+def search_users(query):
+    """
+    Active users matching `query`, best first, at most USER_SEARCH_MAX_RESULTS.
+    """
+    prefix = Q(username__istartswith=query)
+    matches = prefix
+    if len(query) >= MIN_SUBSTRING_LENGTH:
+        matches |= Q(username__icontains=query) | Q(first_name__icontains=query) | Q(last_name__icontains=query)
+
+    return CustomUser.objects.filter(matches, is_active=True).annotate(
+        rank=Case(When(prefix, then=Value(0)), default=Value(1), output_field=IntegerField())
+    ).order_by('rank', 'username')[:getattr(settings, 'USER_SEARCH_MAX_RESULTS', 50)]
@@ -1,9 +1,10 @@
 # users/serializers.py
 
 from rest_framework import serializers
-from .models import CustomUser
+from core.serializers import TimedSerializerMixin
+from .models import CustomUser, FaceReference, FollowSuggestion
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the CustomUser model.
     """
@@ -36,4 +37,59 @@ class CustomUserSerializer(serializers.ModelSerializer):
         if password is not None:
             instance.set_password(password)
         instance.save()
-        return instance
\ No newline at end of file
+        return instance
+
+
+class ProfileSerializer(CustomUserSerializer):
+    """
+    A profile's owner with their counts and how they relate to the viewer.
+    photo_count, is_following and follows_you are annotations (users/views.py).
+    """
+    photo_count = serializers.IntegerField(read_only=True)
+    is_following = serializers.BooleanField(read_only=True)
+    follows_you = serializers.BooleanField(read_only=True)
+
+    class Meta(CustomUserSerializer.Meta):
+        fields = CustomUserSerializer.Meta.fields + [
+            'follower_count', 'following_count', 'photo_count', 'is_following', 'follows_you'
+        ]
+        read_only_fields = ['id', 'follower_count', 'following_count']
+
+
+class UserSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Just enough to show who someone is (avatar and name) in lists of likes,
+    comments and the like. Never embeds email, bio or sharing settings.
+    """
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username', 'profile_pic']
+        read_only_fields = fields
+
+
+class UserDirectorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """A user in the directory and search results: who they are, nothing private."""
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username', 'first_name', 'last_name', 'profile_pic']
+        read_only_fields = fields
+
+
+class FollowSuggestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """A suggested account and how many of the accounts you follow follow it."""
+    user = UserDirectorySerializer(source='suggested', read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ['user', 'mutual_count']
+        read_only_fields = fields
+
+
+class FaceReferenceSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for a user's reference images used for face recognition.
+    """
+    class Meta:
+        model = FaceReference
+        fields = ['id', 'image', 'is_profile_pic', 'created_at']
+        read_only_fields = ['id', 'is_profile_pic', 'created_at']
@@ -2,92 +2,279 @@
 
 import numpy as np
 import cv2
-from insightface.app import FaceAnalysis
 import logging
 import os
 
+from .face_engine import get_active_model_version, get_face_engine, get_maintained_model_versions
+
 logger = logging.getLogger('users')
 
-# Initialize the model ONCE (Global singleton)
-# 'buffalo_l' is more accurate and robust for profile pictures.
-# providers=['CPUExecutionProvider'] ensures it runs efficiently on your CPU.
-# The reliable, crash-proof setting
-app = FaceAnalysis(name='buffalo_l', providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
-app.prepare(ctx_id=0, det_size=(640, 640))
 
-def extract_face_encoding(user):
+def _read_image(image_field, label):
     """
-    Extract and save face encoding from user's profile picture using InsightFace.
-    This should be called when a user uploads/updates their profile pic.
+    Load an ImageField with OpenCV.
+    
+    Returns:
+        numpy array (BGR) or None if the file is missing or unreadable
+    """
+    # Verify file existence before trying to load
+    img_path = image_field.path
+    if not os.path.exists(img_path):
+        logger.error(f"{label} file not found: {img_path}")
+        return None
+
+    img = cv2.imread(img_path)
+    if img is None:
+        # Fallback if cv2 fails to read a file that exists (corrupt, format, etc)
+        logger.error(f"Error reading {label} file: {img_path}")
+    return img
+
+
+def compute_reference_embedding(reference, model_version, img=None):
+    """
+    Compute and store the embedding of one reference image for one model version.
+
+    The largest face is used. Its quality weight is the detector score scaled
+    down for faces smaller than FACE_REFERENCE_MIN_SIZE, so blurry or tiny
+    selfies pull the user's centroid less than good ones.
     
     Args:
-        user: CustomUser instance
+        reference: FaceReference instance
+        model_version: Model version to embed with
+        img: Already loaded BGR image (optional)
         
     Returns:
-        bool: True if encoding extracted successfully, False otherwise
+        bool: True if a face was found and stored
     """
-    if not user.profile_pic:
-        logger.warning(f"User {user.username} has no profile picture")
-        user.encoding_status = 'NO_FACE'
-        user.save()
-        return False
-    
-    try:
-        # 1. Verify file existence before trying to load
-        # This allows us to catch the specific "File not found" error logic you had before
-        img_path = user.profile_pic.path
-        if not os.path.exists(img_path):
-            logger.error(f"Profile picture file not found for user {user.username}")
-            user.encoding_status = 'ERROR'
-            user.save()
-            return False
+    from django.conf import settings
+    from users.models import FaceReferenceEmbedding
 
-        # 2. Load the profile picture using OpenCV
-        img = cv2.imread(img_path)
-        
+    if img is None:
+        img = _read_image(reference.image, f"Reference image {reference.id}")
         if img is None:
-            # Fallback if cv2 fails to read a file that exists (corrupt, format, etc)
-            logger.error(f"Error reading image file for user {user.username}")
-            user.encoding_status = 'ERROR'
-            user.save()
             return False
-        
-        # 3. Get faces (InsightFace handles detection & alignment internally)
-        faces = app.get(img)
-        
-        if len(faces) == 0:
-            logger.warning(f"No face detected in profile pic for user {user.username}")
-            user.encoding_status = 'NO_FACE'
-            user.face_encoding = None
-            user.save()
-            return False
-            
-        # 4. Handle Multiple Faces (Restoring your original logging logic)
-        if len(faces) > 1:
-            logger.warning(f"Multiple faces detected for user {user.username}, using first one")
-            
-        # 5. Sort by size (largest face is likely the user)
-        # bbox is [x1, y1, x2, y2], so we calculate area (w * h)
-        faces = sorted(faces, key=lambda x: (x.bbox[2]-x.bbox[0]) * (x.bbox[3]-x.bbox[1]), reverse=True)
-        
-        # 6. Get the embedding of the largest face
-        # InsightFace returns a numpy array, we convert to list for JSON storage
-        encoding = faces[0].embedding.tolist()
-        
-        user.face_encoding = encoding
+
+    # InsightFace handles detection & alignment internally
+    faces = get_face_engine(model_version).get(img)
+
+    if len(faces) == 0:
+        logger.warning(f"No face detected in reference {reference.id} of user {reference.user.username} ({model_version})")
+        FaceReferenceEmbedding.objects.filter(reference=reference, model_version=model_version).delete()
+        return False
+
+    if len(faces) > 1:
+        logger.warning(f"Multiple faces detected in reference {reference.id} of user {reference.user.username}, using the largest")
+
+    # Sort by size (largest face is likely the user)
+    # bbox is [x1, y1, x2, y2], so we calculate area (w * h)
+    face = max(faces, key=lambda x: (x.bbox[2]-x.bbox[0]) * (x.bbox[3]-x.bbox[1]))
+
+    min_size = getattr(settings, 'FACE_REFERENCE_MIN_SIZE', 112)
+    face_size = min(face.bbox[2] - face.bbox[0], face.bbox[3] - face.bbox[1])
+    quality = float(face.det_score) * min(1.0, float(face_size) / min_size)
+
+    FaceReferenceEmbedding.objects.update_or_create(
+        reference=reference,
+        model_version=model_version,
+        defaults={
+            # InsightFace returns a numpy array, we convert to list for JSON storage
+            'encoding': face.embedding.tolist(),
+            'quality': quality,
+        }
+    )
+    return True
+
+
+def rebuild_face_centroid(user, model_version):
+    """
+    Recompute the user's matching row for one model version.
+
+    The row is the quality-weighted mean of the user's normalised reference
+    embeddings, so the index keeps one row per user however many references
+    they register. Only this user's row changes; the face index picks it up
+    through its delta.
+    
+    Returns:
+        bool: True if the user has a centroid for `model_version`
+    """
+    from users.face_index import normalize
+    from users.models import FaceEmbedding, FaceReferenceEmbedding
+
+    rows = list(FaceReferenceEmbedding.objects.filter(
+        reference__user=user,
+        model_version=model_version
+    ).values_list('encoding', 'quality'))
+
+    if not rows:
+        FaceEmbedding.objects.filter(user=user, model_version=model_version).delete()
+        return False
+
+    vectors = normalize(np.array([encoding for encoding, _ in rows], dtype=np.float32))
+    weights = np.array([max(quality, 1e-3) for _, quality in rows], dtype=np.float32)
+    centroid = normalize((vectors * weights[:, None]).sum(axis=0))
+
+    FaceEmbedding.objects.update_or_create(
+        user=user,
+        model_version=model_version,
+        defaults={'encoding': centroid.tolist()}
+    )
+    return True
+
+
+def _sync_user_encoding(user, has_active_centroid):
+    """Mirror the active centroid onto the user's legacy encoding fields."""
+    from users.models import FaceEmbedding
+
+    if has_active_centroid:
+        user.face_encoding = FaceEmbedding.objects.filter(
+            user=user,
+            model_version=get_active_model_version()
+        ).values_list('encoding', flat=True).first()
         user.encoding_status = 'SUCCESS'
-        user.save()
+    else:
+        user.face_encoding = None
+        user.encoding_status = 'NO_FACE'
+    user.save(update_fields=['face_encoding', 'encoding_status'])
+
+
+def _refresh_user_centroids(user, versions):
+    """
+    Rebuild the user's centroid for each version and update the visible status.
+    
+    Returns:
+        dict: version -> whether the user has a centroid for it
+    """
+    active_version = get_active_model_version()
+    results = {version: rebuild_face_centroid(user, version) for version in versions}
+    if active_version in results:
+        _sync_user_encoding(user, results[active_version])
+    return results
+
+
+def extract_face_encoding(user, model_version=None):
+    """
+    Extract and save face encoding from user's profile picture using InsightFace.
+    This should be called when a user uploads/updates their profile pic.
+
+    The profile picture is kept as one of the user's reference images; the
+    user's matching row is the centroid of all their references. Embeddings are
+    stored once per model version. Without `model_version`, every maintained
+    version is computed (the active one plus any version being backfilled), so
+    a re-embedding job never falls behind new profile pictures.
+    
+    Args:
+        user: CustomUser instance
+        model_version: Only compute embeddings for this model version
         
-        logger.info(f"Successfully extracted face encoding for user {user.username}")
-        return True
+    Returns:
+        bool: True if the user can be recognised with the (active or given) version
+    """
+    from users.models import FaceReference
+
+    active_version = get_active_model_version()
+    versions = [model_version] if model_version else get_maintained_model_versions()
+
+    def set_error():
+        if active_version in versions:
+            user.encoding_status = 'ERROR'
+            user.save(update_fields=['encoding_status'])
+
+    try:
+        # 1. Keep the profile-picture reference in sync with the current picture
+        profile_reference = user.face_references.filter(is_profile_pic=True).first()
+
+        if not user.profile_pic:
+            logger.warning(f"User {user.username} has no profile picture")
+            if profile_reference:
+                profile_reference.delete()
+        elif profile_reference is None:
+            FaceReference.objects.create(user=user, image=user.profile_pic.name, is_profile_pic=True)
+        elif profile_reference.image.name != user.profile_pic.name:
+            profile_reference.image = user.profile_pic.name
+            profile_reference.save(update_fields=['image'])
+            profile_reference.embeddings.all().delete()
+
+        # 2. Embed every reference that is missing an embedding (the profile pic
+        #    is always recomputed, it may have been replaced in place)
+        for reference in user.face_references.prefetch_related('embeddings'):
+            embedded_versions = {e.model_version for e in reference.embeddings.all()}
+            pending = [v for v in versions if reference.is_profile_pic or v not in embedded_versions]
+            if not pending:
+                continue
+
+            img = _read_image(reference.image, f"Reference image {reference.id}")
+            if img is None:
+                if reference.is_profile_pic:
+                    set_error()
+                    return False
+                continue
+
+            for version in pending:
+                compute_reference_embedding(reference, version, img=img)
+
+        # 3. Rebuild the centroid the face index matches against
+        results = _refresh_user_centroids(user, versions)
+
+        target_version = model_version or active_version
+        if results.get(target_version):
+            logger.info(f"Successfully extracted face encoding for user {user.username} ({', '.join(v for v, ok in results.items() if ok)})")
+            return True
+
+        logger.warning(f"No usable face found for user {user.username} ({target_version})")
+        return False
         
     except Exception as e:
         logger.error(f"Error extracting face encoding for user {user.username}: {str(e)}")
-        user.encoding_status = 'ERROR'
-        user.save()
+        set_error()
         return False
 
 
+def add_face_reference(user, image):
+    """
+    Register an extra reference image for a user and fold it into their centroid.
+    
+    Args:
+        user: CustomUser instance
+        image: Uploaded image file
+        
+    Returns:
+        tuple: (FaceReference, bool whether a face was found with the active version)
+    """
+    from users.models import FaceReference
+
+    reference = FaceReference.objects.create(user=user, image=image)
+    versions = get_maintained_model_versions()
+
+    img = _read_image(reference.image, f"Reference image {reference.id}")
+    found = {}
+    if img is not None:
+        for version in versions:
+            found[version] = compute_reference_embedding(reference, version, img=img)
+
+    _refresh_user_centroids(user, versions)
+    logger.info(f"Added face reference {reference.id} for user {user.username}")
+    return reference, found.get(get_active_model_version(), False)
+
+
+def remove_face_reference(reference):
+    """
+    Delete a reference image and rebuild the owner's centroid without it.
+    The profile picture itself is left alone when its reference is removed.
+    """
+    user = reference.user
+    versions = list(reference.embeddings.values_list('model_version', flat=True))
+
+    if not reference.is_profile_pic and reference.image:
+        try:
+            reference.image.delete(save=False)
+        except Exception as e:
+            logger.error(f"Failed to delete file of face reference {reference.id}: {e}")
+    reference.delete()
+
+    _refresh_user_centroids(user, versions)
+    logger.info(f"Removed face reference for user {user.username}")
+
+
 def get_users_with_encodings():
     """
     Get all users who have successfully computed face encodings.
@@ -102,36 +289,6 @@ def get_users_with_encodings():
     )
 
 
-def get_face_encodings_dict():
-    """
-    Get a dictionary mapping user IDs to their face encodings.
-    This is optimized for batch face recognition operations.
-    
-    Returns:
-        tuple: (numpy array of encodings, list of user objects)
-    """
-    users = get_users_with_encodings()
-    
-    if not users.exists():
-        return np.array([]), []
-    
-    encodings = []
-    user_list = []
-    
-    for user in users:
-        try:
-            # Convert JSON list back to numpy array
-            # Ensure float32 type for optimal InsightFace calculations
-            encoding = np.array(user.face_encoding, dtype=np.float32)
-            encodings.append(encoding)
-            user_list.append(user)
-        except Exception as e:
-            logger.error(f"Error loading encoding for user {user.username}: {str(e)}")
-            continue
-    
-    return np.array(encodings), user_list
-
-
 def recompute_all_face_encodings():
     """
     Recompute face encodings for all users with profile pictures.
@@ -162,4 +319,130 @@ def recompute_all_face_encodings():
             stats['error'] += 1
     
     logger.info(f"Face encoding recomputation complete: {stats}")
-    return stats
\ No newline at end of file
+    return stats
+
+def get_reembedding_coverage(model_version):
+    """
+    Compare `model_version` against the active version.
+
+    Every user that can be matched under the active version must also have an
+    embedding under `model_version` before it may be activated.
+    
+    Returns:
+        dict: required/covered counts and the queryset of users still missing
+    """
+    from users.models import CustomUser, FaceEmbedding
+
+    active_version = get_active_model_version()
+    required = CustomUser.objects.filter(
+        face_embeddings__model_version=active_version
+    )
+    covered_ids = FaceEmbedding.objects.filter(
+        model_version=model_version
+    ).values('user_id')
+    missing = required.exclude(id__in=covered_ids)
+
+    required_count = required.count()
+    missing_count = missing.count()
+    return {
+        'active_version': active_version,
+        'required': required_count,
+        'covered': required_count - missing_count,
+        'missing': missing,
+    }
+
+
+def reembed_face_encodings(model_version):
+    """
+    Backfill embeddings for `model_version` without touching the active version.
+    Photo processing keeps matching against the active version while this runs.
+    
+    Returns:
+        dict: Statistics about the backfill
+    """
+    from users.models import FaceModelVersion
+
+    # Backfilling a retired version brings it back into maintenance
+    FaceModelVersion.objects.update_or_create(name=model_version, defaults={'retired_at': None})
+    missing = get_reembedding_coverage(model_version)['missing']
+
+    stats = {'total': missing.count(), 'success': 0, 'failed': 0}
+    for user in missing.iterator():
+        if extract_face_encoding(user, model_version=model_version):
+            stats['success'] += 1
+        else:
+            stats['failed'] += 1
+
+    logger.info(f"Re-embedding for '{model_version}' complete: {stats}")
+    return stats
+
+
+def activate_model_version(model_version, force=False):
+    """
+    Atomically make `model_version` the version photo processing matches against.
+
+    Refuses to flip while coverage is incomplete (unless `force`), so processing
+    never runs against a half-filled matrix. The previously active version is
+    retired. The user-facing `face_encoding` mirror is refreshed after the flip;
+    users a forced flip leaves uncovered have theirs cleared (PENDING), since
+    their old vector belongs to the retired version's space.
+    
+    Returns:
+        bool: True if the version is now active
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from users.models import CustomUser, FaceEmbedding, FaceModelVersion
+
+    coverage = get_reembedding_coverage(model_version)
+    if coverage['covered'] < coverage['required'] and not force:
+        logger.warning(
+            f"Refusing to activate '{model_version}': "
+            f"{coverage['covered']}/{coverage['required']} users covered"
+        )
+        return False
+    uncovered_ids = list(coverage['missing'].values_list('id', flat=True))
+
+    with transaction.atomic():
+        now = timezone.now()
+        target, _ = FaceModelVersion.objects.select_for_update().get_or_create(name=model_version)
+        FaceModelVersion.objects.filter(is_active=True).exclude(pk=target.pk).update(
+            is_active=False, retired_at=now
+        )
+        target.is_active = True
+        target.activated_at = now
+        target.retired_at = None
+        target.save(update_fields=['is_active', 'activated_at', 'retired_at'])
+        if uncovered_ids:
+            CustomUser.objects.filter(id__in=uncovered_ids).update(face_encoding=None, encoding_status='PENDING')
+
+    batch = []
+    for user_id, encoding in FaceEmbedding.objects.filter(
+        model_version=model_version
+    ).values_list('user_id', 'encoding').iterator():
+        batch.append(CustomUser(pk=user_id, face_encoding=encoding, encoding_status='SUCCESS'))
+        if len(batch) >= 1000:
+            CustomUser.objects.bulk_update(batch, ['face_encoding', 'encoding_status'])
+            batch = []
+    if batch:
+        CustomUser.objects.bulk_update(batch, ['face_encoding', 'encoding_status'])
+
+    logger.info(f"Activated face model version '{model_version}'")
+    return True
+
+
+def retire_model_version(model_version):
+    """
+    Stop maintaining a version that is being backfilled (an abandoned
+    re-embedding). Its embeddings stay until a later backfill reuses them.
+
+    Returns:
+        bool: False if the version is active or unknown
+    """
+    from django.utils import timezone
+    from users.models import FaceModelVersion
+
+    retired = FaceModelVersion.objects.filter(
+        name=model_version, is_active=False, retired_at__isnull=True
+    ).update(retired_at=timezone.now())
+    return bool(retired)
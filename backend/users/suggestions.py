@@ -0,0 +1,91 @@
+# backend/users/suggestions.py
+"""
+"Who to follow": accounts followed by the accounts you follow, ranked by how
+many of them do (mutual count), then by popularity. When that runs short,
+the most-followed accounts fill the list.
+
+Suggestions are computed in batches (the compute_follow_suggestions command,
+run periodically) into FollowSuggestion rows, FOLLOW_SUGGESTIONS_PER_USER per
+user, so serving them is one indexed range read. Following a suggested
+account removes it straight away; users with no rows yet (new accounts) are
+computed on their first read.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import CustomUser, Follow, FollowSuggestion
+
+
+def get_suggestion_size():
+    return getattr(settings, 'FOLLOW_SUGGESTIONS_PER_USER', 20)
+
+
+def friends_of_friends(user, limit):
+    """(account id, mutual count) pairs, best first, excluding `user` and accounts they follow."""
+    followed = Follow.objects.filter(follower=user).values('following_id')
+    return list(
+        Follow.objects.filter(follower_id__in=followed, following__is_active=True)
+        .exclude(following_id=user.pk)
+        .exclude(following_id__in=followed)
+        .values('following_id')
+        .annotate(mutual_count=Count('follower_id'))
+        .order_by('-mutual_count', '-following__follower_count', 'following_id')
+        .values_list('following_id', 'mutual_count')[:limit]
+    )
+
+
+def popular_accounts(user, limit, exclude_ids=()):
+    """Ids of the most-followed active accounts `user` doesn't follow yet."""
+    return list(
+        CustomUser.objects.filter(is_active=True)
+        .exclude(pk=user.pk)
+        .exclude(pk__in=exclude_ids)
+        .exclude(follower_set__follower=user)
+        .order_by('-follower_count', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def compute_suggestions(user):
+    """
+    Replace `user`'s suggestions with freshly ranked ones.
+
+    Returns:
+        int: Number of suggestions stored
+    """
+    size = get_suggestion_size()
+    ranked = friends_of_friends(user, size)
+    if len(ranked) < size:
+        seen = [account_id for account_id, _ in ranked]
+        ranked += [(account_id, 0) for account_id in popular_accounts(user, size - len(ranked), seen)]
+
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user=user).delete()
+        FollowSuggestion.objects.bulk_create([
+            FollowSuggestion(user=user, suggested_id=account_id, rank=rank, mutual_count=mutual_count)
+            for rank, (account_id, mutual_count) in enumerate(ranked, start=1)
+        ])
+    return len(ranked)
+
+
+def remove_suggestion(user, suggested):
+    """`user` followed `suggested`: stop suggesting it."""
+    FollowSuggestion.objects.filter(user=user, suggested=suggested).delete()
+
+
+def get_suggestions(user, limit):
+    """The best `limit` suggestions for `user`, with the suggested accounts, in one query."""
+    def top():
+        return list(
+            FollowSuggestion.objects.filter(user=user, suggested__is_active=True)
+            .select_related('suggested')
+            .order_by('rank')[:limit]
+        )
+
+    suggestions = top()
+    if not suggestions and not FollowSuggestion.objects.filter(user=user).exists():
+        compute_suggestions(user)
+        suggestions = top()
+    return suggestions
@@ -1,3 +1,676 @@
-from django.test import TestCase
+# backend/users/tests.py
+"""
+Query budgets for the profile and follower endpoints, the profile page, follow
+counters and suggestions; model version switches, reference galleries and the
+face index; the seed_scale data set. Face engines are stubbed: faces are boxes,
+scores and embeddings.
+"""
 
-# Create your tests here.
+import json
+import tempfile
+
+import numpy as np
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from core.counters import reconcile
+from core.testing import seed_photos, seed_users
+from direct_chat.models import Message
+from interactions.models import Comment, Like
+from photos import cache as feed_cache
+from photos.models import ConsentRequest, DetectedFace, Photo
+from .admin import FaceModelVersionAdmin
+from . import face_index
+from .face_engine import FaceEngine, _nms, get_active_model_version, get_maintained_model_versions
+from .models import (
+    CustomUser, FaceEmbedding, FaceModelVersion, FaceReference, FaceReferenceEmbedding, Follow, FollowSuggestion
+)
+from . import services
+from .services import activate_model_version
+from .suggestions import compute_suggestions
+
+
+@override_settings(FEED_CACHE_ENABLED=False)
+class UserQueryCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(12)
+        cls.viewer, cls.subject = cls.users[0], cls.users[1]
+        seed_photos(cls.subject, cls.users, 10)
+        Follow.objects.bulk_create([
+            Follow(follower=user, following=cls.subject) for user in cls.users[2:7]
+        ] + [
+            Follow(follower=cls.subject, following=user) for user in cls.users[2:5]
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+
+    def assertQueryBudget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_profile_query_budget_does_not_grow(self):
+        url = reverse('user-profile', kwargs={'username': self.subject.username})
+        # ETag version, annotated user, one page of photos
+        response = self.assertQueryBudget(url, 3)
+        self.assertEqual(len(response.data['photos']['results']), 10)
+
+        seed_photos(self.subject, self.users, 30, likes_per_photo=10, comments_per_photo=5)
+        response = self.assertQueryBudget(url, 3)
+        self.assertEqual(len(response.data['photos']['results']), 20)
+        self.assertEqual(response.data['user']['photo_count'], 40)
+
+    def test_followers_query_budget_does_not_grow(self):
+        url = reverse('user-followers', kwargs={'pk': self.subject.pk})
+        response = self.assertQueryBudget(url, 2)
+        self.assertEqual(len(response.data), 5)
+
+        Follow.objects.bulk_create([Follow(follower=user, following=self.subject) for user in self.users[7:]])
+        response = self.assertQueryBudget(url, 2)
+        self.assertEqual(len(response.data), 10)
+
+    def test_following_query_budget_does_not_grow(self):
+        url = reverse('user-following', kwargs={'pk': self.subject.pk})
+        response = self.assertQueryBudget(url, 2)
+        self.assertEqual(len(response.data), 3)
+
+        Follow.objects.bulk_create([Follow(follower=self.subject, following=user) for user in self.users[5:]])
+        response = self.assertQueryBudget(url, 2)
+        self.assertEqual(len(response.data), 10)
+
+
+class ProfilePageTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer, cls.subject = seed_users(2)
+        seed_photos(cls.subject, [cls.subject], 3, likes_per_photo=0, comments_per_photo=0)
+        Follow.objects.create(follower=cls.subject, following=cls.viewer)
+
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        self.client.force_authenticate(self.viewer)
+        self.url = reverse('user-profile', kwargs={'username': self.subject.username})
+
+    def test_follow_state_is_embedded_and_kept_current(self):
+        user = self.client.get(self.url).data['user']
+        self.assertEqual((user['is_following'], user['follows_you'], user['follower_count']), (False, True, 0))
+
+        self.client.post(reverse('user-follow', kwargs={'pk': self.subject.pk}))
+        user = self.client.get(self.url).data['user']
+        self.assertEqual((user['is_following'], user['follower_count']), (True, 1))
+
+        self.client.delete(reverse('user-follow', kwargs={'pk': self.subject.pk}))
+        self.assertFalse(self.client.get(self.url).data['user']['is_following'])
+
+    def test_grid_continues_at_the_photos_endpoint(self):
+        photos = self.client.get(self.url, {'page_size': 2}).data['photos']
+        self.assertEqual(set(photos['results'][0]), {
+            'id', 'public_image', 'caption', 'created_at', 'like_count', 'comment_count'
+        })
+        self.assertIn(reverse('user-profile-photos', kwargs={'username': self.subject.username}), photos['next'])
+
+        rest = self.client.get(photos['next']).data
+        self.assertEqual(len(rest['results']), 1)
+        self.assertIsNone(rest['next'])
+        self.assertEqual(
+            self.client.get(reverse('user-profile-photos', kwargs={'username': 'nobody'})).status_code, 404
+        )
+
+
+class FollowCounterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(4)
+
+    def _counts(self, user):
+        response = self.client.get(reverse('user-follow-counts', kwargs={'pk': user.pk}))
+        return response.data['followers_count'], response.data['following_count']
+
+    def test_follow_and_unfollow_keep_counters_in_step(self):
+        for follower in self.users[1:]:
+            self.client.force_authenticate(follower)
+            self.client.post(reverse('user-follow', kwargs={'pk': self.users[0].pk}))
+        # Following twice counts once
+        self.client.post(reverse('user-follow', kwargs={'pk': self.users[0].pk}))
+        self.assertEqual(self._counts(self.users[0]), (3, 0))
+        self.assertEqual(self._counts(self.users[3]), (0, 1))
+
+        self.client.delete(reverse('user-follow', kwargs={'pk': self.users[0].pk}))
+        self.client.delete(reverse('user-follow', kwargs={'pk': self.users[0].pk}))
+        self.assertEqual(self._counts(self.users[0]), (2, 0))
+        self.assertEqual(self._counts(self.users[3]), (0, 0))
+
+    def test_reconcile_fixes_drift(self):
+        Follow.objects.bulk_create([Follow(follower=user, following=self.users[0]) for user in self.users[1:]])
+        CustomUser.objects.filter(pk=self.users[1].pk).update(follower_count=5)
+
+        list(reconcile())
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self._counts(self.users[0]), (3, 0))
+        self.assertEqual(self._counts(self.users[1]), (0, 1))
+
+
+@override_settings(FEED_CACHE_ENABLED=False)
+class ProfileETagTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer, cls.subject = seed_users(2)
+        cls.photo = seed_photos(cls.subject, [cls.subject], 2)[0]
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+        self.url = reverse('user-profile', kwargs={'username': self.subject.username})
+
+    def test_unchanged_profile_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_profile_and_photo_changes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.client.post(reverse('photo-like', kwargs={'pk': self.photo.pk}))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        CustomUser.objects.filter(pk=self.subject.pk).update(bio='New bio')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.data['user']['bio'], 'New bio')
+
+    def test_missing_profile_is_a_404(self):
+        response = self.client.get(reverse('user-profile', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, 404)
+
+
+class UserDirectoryTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = CustomUser.objects.create(username='viewer')
+        for username, first_name in [('anna', ''), ('joanne', ''), ('annabel', ''), ('bob', 'Hannah'), ('an', '')]:
+            CustomUser.objects.create(username=username, first_name=first_name, email=f'{username}@example.com')
+        CustomUser.objects.create(username='anonymous', is_active=False)
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+
+    def search(self, query):
+        return self.client.get(reverse('user-search'), {'q': query})
+
+    def test_directory_is_paged_by_username_without_private_fields(self):
+        url = reverse('user-list')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'page_size': 3})
+        self.assertEqual([u['username'] for u in response.data['results']], ['an', 'anna', 'annabel'])
+        self.assertNotIn('email', response.data['results'][0])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([u['username'] for u in response.data['results']], ['bob', 'joanne'])
+
+    def test_prefix_matches_come_first(self):
+        with self.assertNumQueries(2):
+            response = self.search('ann')
+        self.assertEqual(
+            [u['username'] for u in response.data['results']],
+            ['anna', 'annabel', 'bob', 'joanne']
+        )
+
+    def test_short_queries_match_username_prefixes_only(self):
+        response = self.search('an')
+        self.assertEqual([u['username'] for u in response.data['results']], ['an', 'anna', 'annabel'])
+
+    @override_settings(USER_SEARCH_MAX_RESULTS=2)
+    def test_results_are_limited(self):
+        response = self.search('a')
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(self.client.get(reverse('user-search')).status_code, 400)
+
+
+class FollowSuggestionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer, cls.a, cls.b, cls.c, cls.d, cls.popular, cls.quiet = seed_users(7)
+        Follow.objects.bulk_create([
+            Follow(follower=cls.viewer, following=cls.a),
+            Follow(follower=cls.viewer, following=cls.b),
+            Follow(follower=cls.a, following=cls.c),
+            Follow(follower=cls.a, following=cls.d),
+            Follow(follower=cls.b, following=cls.c),
+            Follow(follower=cls.b, following=cls.viewer),
+            Follow(follower=cls.c, following=cls.popular),
+            Follow(follower=cls.d, following=cls.popular),
+        ])
+        list(reconcile())
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+
+    def suggested(self, **params):
+        response = self.client.get(reverse('user-suggestions'), params)
+        return [(s['user']['username'], s['mutual_count']) for s in response.data]
+
+    def test_friends_of_friends_by_mutuals_then_popular_accounts(self):
+        # Nothing stored yet: computed on the first read
+        self.assertEqual(self.suggested(), [
+            (self.c.username, 2), (self.d.username, 1), (self.popular.username, 0), (self.quiet.username, 0)
+        ])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.suggested(limit=2), [(self.c.username, 2), (self.d.username, 1)])
+
+    @override_settings(FOLLOW_SUGGESTIONS_PER_USER=3)
+    def test_following_a_suggestion_removes_it(self):
+        self.assertEqual(compute_suggestions(self.viewer), 3)
+        self.client.post(reverse('user-follow', kwargs={'pk': self.c.pk}))
+        self.assertEqual(self.suggested(), [(self.d.username, 1), (self.popular.username, 0)])
+
+        compute_suggestions(self.viewer)
+        # c's follow of `popular` now counts; ties go to the more followed account
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(user=self.viewer).values_list('suggested', 'mutual_count')),
+            [(self.popular.pk, 1), (self.d.pk, 1), (self.quiet.pk, 0)]
+        )
+
+
+class ModelVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Active since migration 0004
+        cls.old = get_active_model_version()
+        cls.covered, cls.uncovered = seed_users(2)
+        for user in (cls.covered, cls.uncovered):
+            FaceEmbedding.objects.create(user=user, model_version=cls.old, encoding=[1.0, 0.0])
+        CustomUser.objects.update(face_encoding=[1.0, 0.0], encoding_status='SUCCESS')
+        FaceEmbedding.objects.create(user=cls.covered, model_version='new', encoding=[0.0, 1.0])
+
+    def reembed(self, *args):
+        # --status: only coverage and activation, no model is loaded
+        call_command('reembed_faces', 'new', '--status', *args, stdout=StringIO())
+
+    def test_retired_versions_are_not_maintained(self):
+        FaceModelVersion.objects.create(name='new')
+        FaceModelVersion.objects.create(name='abandoned')
+        self.reembed('--retire')
+        call_command('reembed_faces', 'abandoned', '--retire', stdout=StringIO())
+        self.assertEqual(get_maintained_model_versions(), [self.old])
+
+    def test_activation_waits_for_coverage_and_retires_the_old_version(self):
+        FaceModelVersion.objects.create(name='new')
+        self.assertEqual(get_maintained_model_versions(), [self.old, 'new'])
+        self.reembed('--activate')
+        self.assertEqual(get_active_model_version(), self.old)
+
+        FaceEmbedding.objects.create(user=self.uncovered, model_version='new', encoding=[0.0, 1.0])
+        self.reembed('--activate')
+        self.assertEqual(get_active_model_version(), 'new')
+        self.assertIsNotNone(FaceModelVersion.objects.get(name=self.old).retired_at)
+        self.assertEqual(get_maintained_model_versions(), ['new'])
+        self.assertEqual(CustomUser.objects.get(pk=self.uncovered.pk).face_encoding, [0.0, 1.0])
+
+    def test_forced_activation_clears_uncovered_encodings(self):
+        self.assertTrue(activate_model_version('new', force=True))
+        covered = CustomUser.objects.get(pk=self.covered.pk)
+        uncovered = CustomUser.objects.get(pk=self.uncovered.pk)
+        self.assertEqual((covered.face_encoding, covered.encoding_status), ([0.0, 1.0], 'SUCCESS'))
+        # Their only vector is from the retired model's space
+        self.assertEqual((uncovered.face_encoding, uncovered.encoding_status), (None, 'PENDING'))
+
+    def test_admin_cannot_add_or_edit_versions(self):
+        request = RequestFactory().get('/')
+        request.user = CustomUser.objects.create(username='staff', is_staff=True, is_superuser=True)
+        model_admin = FaceModelVersionAdmin(FaceModelVersion, site)
+        self.assertFalse(model_admin.has_add_permission(request))
+        self.assertFalse(model_admin.has_change_permission(request, FaceModelVersion.objects.first()))
+
+
+class FaceIndexTests(TestCase):
+    VERSION = 'stub'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann, cls.bob, cls.cat = seed_users(3)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(FACE_INDEX_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(face_index._indexes.clear)
+        self.store = face_index.EmbeddingSnapshotStore(self.VERSION)
+
+    def embed(self, user, encoding):
+        FaceEmbedding.objects.update_or_create(
+            user=user, model_version=self.VERSION, defaults={'encoding': encoding}
+        )
+
+    def snapshot(self):
+        """Snapshot every embedding saved so far, well outside the safety margin."""
+        FaceEmbedding.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        return self.store.compact(blocking=True)
+
+    def match(self, encoding):
+        return face_index.get_face_index(self.VERSION).match(encoding, self.VERSION)[0]
+
+    def test_snapshot_and_delta_are_merged(self):
+        self.embed(self.ann, [1, 0, 0, 0])
+        self.embed(self.bob, [0, 1, 0, 0])
+        self.assertEqual(self.snapshot()['rows'], 2)
+
+        self.embed(self.cat, [0, 0, 1, 0])
+        index = face_index.get_face_index(self.VERSION)
+        self.assertEqual(list(index.delta_user_ids), [self.cat.pk])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(self.match([0.9, 0.1, 0, 0]), self.ann.pk)
+        self.assertEqual(self.match([0, 0.1, 0.9, 0]), self.cat.pk)
+
+    def test_re_embedded_rows_override_the_snapshot(self):
+        self.embed(self.ann, [1, 0, 0, 0])
+        self.embed(self.bob, [0, 1, 0, 0])
+        self.snapshot()
+
+        self.embed(self.ann, [0, 0, 0, 1])
+        self.assertEqual(len(face_index.get_face_index(self.VERSION)), 2)
+        self.assertIsNone(self.match([1, 0, 0, 0]))
+        self.assertEqual(self.match([0, 0, 0, 1]), self.ann.pk)
+
+    def test_deleted_rows_are_skipped_for_the_next_best(self):
+        self.embed(self.ann, [1, 0, 0, 0])
+        self.embed(self.bob, [0.9, 0.3, 0, 0])
+        self.snapshot()
+
+        FaceEmbedding.objects.filter(user=self.ann).delete()
+        self.assertEqual(self.match([1, 0, 0, 0]), self.bob.pk)
+        FaceEmbedding.objects.filter(user=self.bob).delete()
+        self.assertIsNone(self.match([1, 0, 0, 0]))
+
+    def test_rows_saved_during_a_snapshot_are_served_from_the_delta(self):
+        self.embed(self.bob, [0, 1, 0, 0])
+        self.embed(self.cat, [0, 0, 1, 0])
+        FaceEmbedding.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+        normalize = face_index.normalize
+
+        def normalize_and_insert(vectors):
+            # A user sorting before every snapshot row saves their face mid-snapshot
+            if not FaceEmbedding.objects.filter(user=self.ann).exists():
+                self.embed(self.ann, [1, 0, 0, 0])
+            return normalize(vectors)
+
+        with mock.patch.object(face_index, 'normalize', normalize_and_insert):
+            manifest = self.store.compact(blocking=True)
+
+        self.assertEqual(manifest['rows'], 2)
+        index = face_index.get_face_index(self.VERSION)
+        self.assertEqual(list(index.delta_user_ids), [self.ann.pk])
+        for user, encoding in ((self.ann, [1, 0, 0, 0]), (self.bob, [0, 1, 0, 0]), (self.cat, [0, 0, 1, 0])):
+            self.assertEqual(self.match(encoding), user.pk)
+
+    @override_settings(FACE_INDEX_COMPACT_THRESHOLD=1)
+    def test_lookups_never_write_snapshots(self):
+        self.embed(self.ann, [1, 0, 0, 0])
+        self.assertEqual(self.match([1, 0, 0, 0]), self.ann.pk)
+        self.assertIsNone(self.store.read_manifest())
+
+        snapshot_id = self.snapshot()['snapshot_id']
+        self.embed(self.bob, [0, 1, 0, 0])
+        self.embed(self.cat, [0, 0, 1, 0])
+        # Saved after the snapshot, but old enough for the next one to take them
+        FaceEmbedding.objects.filter(user__in=[self.bob, self.cat]).update(
+            updated_at=timezone.now() - timedelta(minutes=10)
+        )
+        # Settle the snapshot so its two-row delta is past the threshold
+        manifest = self.store.read_manifest()
+        manifest['cutoff'] = (timezone.now() - timedelta(minutes=30)).isoformat()
+        with open(self.store.manifest_path, 'w') as f:
+            json.dump(manifest, f)
+
+        self.assertTrue(face_index.needs_compaction(face_index.get_face_index(self.VERSION)))
+        self.assertEqual(self.store.read_manifest()['snapshot_id'], snapshot_id)
+
+        call_command('build_face_index', '--model-version', self.VERSION, '--if-needed', stdout=StringIO())
+        manifest = self.store.read_manifest()
+        self.assertNotEqual(manifest['snapshot_id'], snapshot_id)
+        self.assertEqual(manifest['rows'], 3)
+
+
+def stub_face(box, score, embedding):
+    return SimpleNamespace(bbox=np.array(box, dtype=np.float32), det_score=score, embedding=np.array(embedding))
+
+
+class StubEngine:
+    """Returns the faces queued for each image, in order."""
+    def __init__(self, *images):
+        self.images = list(images)
+
+    def get(self, img):
+        return self.images.pop(0)
+
+
+class ReferenceGalleryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_users(1)[0]
+        cls.version = get_active_model_version()
+
+    def reference(self, encoding, quality):
+        reference = FaceReference.objects.create(user=self.user, image='face_references/stub.jpg')
+        FaceReferenceEmbedding.objects.create(
+            reference=reference, model_version=self.version, encoding=encoding, quality=quality
+        )
+        return reference
+
+    def centroid(self):
+        return FaceEmbedding.objects.get(user=self.user, model_version=self.version).encoding
+
+    def test_centroid_is_the_quality_weighted_mean(self):
+        self.reference([2.0, 0.0], 3.0)  # Normalised before weighting
+        self.reference([0.0, 1.0], 1.0)
+        self.assertTrue(services.rebuild_face_centroid(self.user, self.version))
+        np.testing.assert_allclose(self.centroid(), np.array([3.0, 1.0]) / np.sqrt(10), rtol=1e-6)
+
+    def test_no_references_removes_the_centroid(self):
+        reference = self.reference([1.0, 0.0], 1.0)
+        services.rebuild_face_centroid(self.user, self.version)
+        reference.delete()
+        self.assertFalse(services.rebuild_face_centroid(self.user, self.version))
+        self.assertFalse(FaceEmbedding.objects.filter(user=self.user).exists())
+
+    def test_largest_face_is_embedded_with_its_quality(self):
+        reference = FaceReference.objects.create(user=self.user, image='face_references/stub.jpg')
+        engine = StubEngine([
+            stub_face([0, 0, 56, 70], 0.9, [0.0, 1.0]),
+            stub_face([0, 0, 40, 40], 0.99, [1.0, 0.0]),
+        ])
+        with mock.patch.object(services, 'get_face_engine', return_value=engine):
+            self.assertTrue(services.compute_reference_embedding(reference, self.version, img=np.zeros((1, 1, 3))))
+
+        embedding = FaceReferenceEmbedding.objects.get(reference=reference)
+        self.assertEqual(embedding.encoding, [0.0, 1.0])
+        # det_score scaled by the short side against FACE_REFERENCE_MIN_SIZE (112)
+        self.assertAlmostEqual(embedding.quality, 0.9 * 56 / 112, places=5)
+
+    def test_adding_and_removing_references_moves_the_centroid(self):
+        engine = StubEngine(
+            [stub_face([0, 0, 200, 200], 1.0, [1.0, 0.0])],
+            [stub_face([0, 0, 200, 200], 1.0, [0.0, 1.0])],
+        )
+        with mock.patch.object(services, 'get_face_engine', return_value=engine), \
+                mock.patch.object(services, '_read_image', return_value=np.zeros((1, 1, 3))):
+            first, found = services.add_face_reference(self.user, 'face_references/a.jpg')
+            self.assertTrue(found)
+            second, _ = services.add_face_reference(self.user, 'face_references/b.jpg')
+
+        np.testing.assert_allclose(self.centroid(), [np.sqrt(0.5), np.sqrt(0.5)], rtol=1e-6)
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).encoding_status, 'SUCCESS')
+
+        services.remove_face_reference(first)
+        np.testing.assert_allclose(self.centroid(), [0.0, 1.0], atol=1e-6)
+
+        # Removing the last one through the API reports the new status
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.delete(reverse(
+            'user-delete-face-reference', kwargs={'pk': self.user.pk, 'reference_id': second.pk}
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['encoding_status'], 'NO_FACE')
+        self.assertFalse(FaceEmbedding.objects.filter(user=self.user).exists())
+
+
+class StubDetector:
+    """
+    Finds every block of equal non-zero pixels, but only those at least
+    DETECTOR_MIN_FACE (16) px tall once the image is scaled to the input size,
+    like a real detector missing faces too small at its resolution.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def detect(self, img, input_size):
+        self.calls.append((img.shape, input_size))
+        scale = input_size[0] / max(img.shape[:2])
+        boxes = []
+        for value in np.unique(img[img > 0]):
+            ys, xs = np.nonzero(img == value)
+            x1, y1, x2, y2 = xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+            if (y2 - y1) * scale >= 16:
+                boxes.append([x1, y1, x2, y2, 0.9])
+        return np.array(boxes, dtype=np.float32).reshape(-1, 5), None
+
+
+@override_settings(FACE_DETECTION_MODE='adaptive', FACE_MIN_FACE_SIZE=24, FACE_ADAPTIVE_MAX_DET_SIZE=1280)
+class AdaptiveDetectionTests(TestCase):
+    def engine(self):
+        engine = FaceEngine.__new__(FaceEngine)
+        engine.det_size = (640, 640)
+        engine.det_model = StubDetector()
+        return engine
+
+    def photo(self, width, height, faces):
+        img = np.zeros((height, width), dtype=np.uint8)
+        for value, (x, y, size) in enumerate(faces, start=1):
+            img[y:y + size, x:x + size] = value
+        return img
+
+    def boxes(self, faces):
+        return sorted(face.bbox.astype(int).tolist() for face in faces)
+
+    def test_small_images_take_one_pass(self):
+        engine = self.engine()
+        faces = engine.detect(self.photo(640, 480, [(100, 100, 40)]))
+        self.assertEqual(self.boxes(faces), [[100, 100, 140, 140]])
+        self.assertEqual(engine.det_model.calls, [((480, 640), (640, 640))])
+
+    def test_tiles_find_small_faces_once_each(self):
+        # The 30 px face is under 16 px at 1280, the 300 px one is seen whole and by several tiles
+        engine = self.engine()
+        faces = engine.detect(self.photo(4000, 3000, [(100, 100, 30), (1800, 1400, 300)]))
+        self.assertGreater(len(engine.det_model.calls), 1)
+        self.assertEqual(self.boxes(faces), [[100, 100, 130, 130], [1800, 1400, 2100, 1700]])
+
+    @override_settings(FACE_DETECTION_TIME_BUDGET=0)
+    def test_spent_budget_keeps_the_whole_image_pass(self):
+        engine = self.engine()
+        faces = engine.detect(self.photo(4000, 3000, [(100, 100, 30), (1800, 1400, 300)]))
+        self.assertEqual(len(engine.det_model.calls), 1)
+        self.assertEqual(self.boxes(faces), [[1800, 1400, 2100, 1700]])
+
+    def test_nms_keeps_the_best_of_overlapping_boxes(self):
+        detections = [
+            (np.array([0, 0, 100, 100, 0.8]), 'a'),
+            (np.array([5, 5, 105, 105, 0.95]), 'b'),
+            (np.array([300, 300, 400, 400, 0.5]), 'c'),
+        ]
+        self.assertEqual([kps for _, kps in _nms(detections, 0.4)], ['b', 'c'])
+
+
+
+class SeedScaleTests(TestCase):
+    def seed(self, *args, **options):
+        options = {'users': 20, 'photos': 30, 'conversations': 5, 'interactive': False, **options}
+        call_command('seed_scale', *args, stdout=StringIO(), **options)
+
+    def snapshot(self):
+        """Everything seeded, by username and caption (ids and timestamps differ between runs)."""
+        return {
+            'users': list(CustomUser.objects.order_by('username').values_list('username', 'face_sharing_mode')),
+            'follows': sorted(Follow.objects.values_list('follower__username', 'following__username')),
+            'photos': sorted(Photo.objects.values_list('caption', 'uploader__username')),
+            'faces': sorted(DetectedFace.objects.values_list('photo__caption', 'bounding_box', 'matched_user__username')),
+            'consent': sorted(ConsentRequest.objects.values_list('photo__caption', 'requested_user__username', 'status')),
+            'likes': sorted(Like.objects.values_list('photo__caption', 'user__username')),
+            'comments': sorted(Comment.objects.values_list('photo__caption', 'user__username', 'text')),
+            'messages': Message.objects.count(),
+        }
+
+    def test_same_seed_same_data(self):
+        self.seed(seed=7)
+        first = self.snapshot()
+        self.assertEqual(len(first['users']), 20)
+        self.assertEqual(len(first['photos']), 30)
+
+        self.seed('--flush', seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+        self.seed('--flush', seed=8)
+        self.assertNotEqual(self.snapshot()['follows'], first['follows'])
+
+    def test_follow_graph_and_counters(self):
+        self.seed()
+        edges = list(Follow.objects.values_list('follower_id', 'following_id'))
+        self.assertTrue(edges)
+        self.assertFalse([edge for edge in edges if edge[0] == edge[1]])
+        self.assertEqual(len(edges), len(set(edges)))
+
+        # seed_counters left nothing for a reconcile to fix
+        self.assertEqual(sum(fixed for _, _, fixed in reconcile()), 0)
+        user = CustomUser.objects.order_by('-follower_count').first()
+        self.assertEqual(user.follower_count, Follow.objects.filter(following=user).count())
+        photo = Photo.objects.order_by('-like_count').first()
+        self.assertEqual(photo.like_count, Like.objects.filter(photo=photo).count())
+
+    def test_flush_only_deletes_seeded_users(self):
+        self.seed()
+        real = CustomUser.objects.create_user('seed_admin', password='not-the-seed-password')
+
+        with self.assertRaisesMessage(CommandError, 'seed_scale did not create'):
+            self.seed('--flush')
+        self.assertTrue(CustomUser.objects.filter(pk=real.pk).exists())
+        self.assertEqual(CustomUser.objects.filter(username__startswith='seed_').count(), 21)
+
+        # Another prefix leaves both alone
+        self.seed(prefix='other')
+        self.assertEqual(CustomUser.objects.filter(username__startswith='seed_').count(), 21)
+
+    def test_invalid_arguments_fail_before_flushing(self):
+        self.seed()
+        with self.assertRaisesMessage(CommandError, '--users must be at least 2'):
+            self.seed('--flush', users=1)
+        self.assertEqual(CustomUser.objects.count(), 20)
+
+    def test_flush_asks_for_confirmation(self):
+        self.seed()
+        with self.assertRaisesMessage(CommandError, 'already exist'):
+            self.seed()
+
+        with mock.patch('builtins.input', return_value='no') as prompt:
+            with self.assertRaisesMessage(CommandError, 'Flush cancelled'):
+                self.seed('--flush', interactive=True)
+        self.assertIn('20 seeded users', prompt.call_args.args[0])
+        self.assertEqual(CustomUser.objects.count(), 20)
+
+        with mock.patch('builtins.input', return_value='yes'):
+            self.seed('--flush', interactive=True, users=5)
+        self.assertEqual(CustomUser.objects.count(), 5)
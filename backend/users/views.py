@@ -2,11 +2,28 @@
 
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef
+from django.urls import reverse
+from core.counters import increment
+from core.etags import conditional
+from notifications.models import Notification
+from notifications.services import notify
 from .models import CustomUser, Follow
 from photos.models import Photo
-from .services import extract_face_encoding  # Import the encoding service
+from photos.pagination import KeysetPagination
+from photos.serializers import ProfilePhotoSerializer
+from photos import cache as feed_cache, timeline
+from .search import search_users
+from .serializers import (
+    FaceReferenceSerializer, FollowSuggestionSerializer, ProfileSerializer, UserDirectorySerializer
+)
+from .suggestions import get_suggestion_size, get_suggestions, remove_suggestion
+from .services import extract_face_encoding, add_face_reference, remove_face_reference
 
 # Import whatever serializer name you actually have
 # Try both common patterns:
@@ -15,17 +32,43 @@ try:
 except ImportError:
     from .serializers import CustomUserSerializer as UserSerializer
 
-try:
-    from photos.serializers import PhotoSerializer
-except ImportError:
-    # If PhotoSerializer doesn't exist, we'll create a simple dict response
-    PhotoSerializer = None
-
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def with_profile_state(queryset, viewer):
+    """Annotate what a profile shows besides the user's columns: photo count and follow state with `viewer`."""
+    return queryset.annotate(
+        photo_count=Count('uploaded_photos'),
+        is_following=Exists(Follow.objects.filter(follower=viewer, following=OuterRef('pk'))),
+        follows_you=Exists(Follow.objects.filter(follower=OuterRef('pk'), following=viewer)),
+    )
+
+
+def profile_version(request, username=None):
+    """Everything the profile shows, plus the newest updated_at of its photos, in one query."""
+    fields = [name for name in ProfileSerializer.Meta.fields if name != 'password']
+    version = with_profile_state(CustomUser.objects.filter(username=username), request.user).annotate(
+        photos_updated=Max('uploaded_photos__updated_at'),
+    ).values_list(*fields, 'photos_updated').first()
+    # No user: no ETag, and the view answers 404
+    return version
+
+
+class UserDirectoryPagination(CursorPagination):
+    ordering = 'username'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class UserSearchPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """
     ViewSet for user management with a built-in follow system.
@@ -33,6 +76,7 @@ class UserViewSet(viewsets.ModelViewSet):
     """
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
+    pagination_class = UserDirectoryPagination
     
     # We remove the class-level permission_classes to use get_permissions instead
     # permission_classes = [IsAuthenticated] 
@@ -47,6 +91,56 @@ class UserViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    def get_serializer_class(self):
+        if self.action in ('list', 'search'):
+            return UserDirectorySerializer
+        if self.action == 'suggestions':
+            return FollowSuggestionSerializer
+        return UserSerializer
+
+    def list(self, request, *args, **kwargs):
+        """
+        Everyone but the current user, by username, a page at a time.
+        GET /api/users/?cursor=<from next/previous>&page_size=20
+        """
+        queryset = CustomUser.objects.filter(is_active=True).exclude(pk=request.user.pk)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def search(self, request):
+        """
+        Users whose username starts with or contains ?q=, or whose first or
+        last name contains it; username prefixes first (users/search.py).
+        GET /api/users/search/?q=ann&page=2
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'q is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        paginator = UserSearchPagination()
+        page = paginator.paginate_queryset(search_users(query), request, view=self)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def suggestions(self, request):
+        """
+        Who to follow, best first (users/suggestions.py).
+        GET /api/users/suggestions/?limit=5
+        """
+        try:
+            limit = int(request.query_params.get('limit', 5))
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, get_suggestion_size()))
+        return Response(self.get_serializer(get_suggestions(request.user, limit), many=True).data)
+
     def perform_create(self, serializer):
         """
         Hook that runs during user registration (POST /api/users/).
@@ -61,46 +155,82 @@ class UserViewSet(viewsets.ModelViewSet):
             # This calls our optimized InsightFace service
             extract_face_encoding(user)
 
+    def _photo_grid(self, request, user, base_url=None):
+        """One keyset page of `user`'s photos as grid tiles: {next, previous, results}."""
+        paginator = KeysetPagination()
+        paginator.base_url = base_url
+        photos = Photo.objects.filter(uploader=user).only(*ProfilePhotoSerializer.Meta.fields)
+        page = paginator.paginate_queryset(photos, request, view=self)
+        return paginator.get_paginated_response(ProfilePhotoSerializer(page, many=True).data).data
+
     @action(
         detail=False, 
         methods=['get'], 
         url_path='profile/(?P<username>[^/.]+)',
         permission_classes=[IsAuthenticated]
     )
+    @conditional(profile_version)
     def profile(self, request, username=None):
         """
-        Custom endpoint to fetch a full user profile.
+        Everything a profile page needs in one response.
         URL: /api/users/profile/<username>/
-        
+
         Returns:
-            - user: The user's details (bio, profile pic, etc.)
-            - photos: A list of photos uploaded by this user.
+            - user: The user's details, follower/following/photo counts, and
+              whether the viewer follows them (is_following) and they follow
+              the viewer (follows_you); one annotated query
+            - photos: The first page of their photo grid, newest first; `next`
+              continues at /api/users/profile/<username>/photos/
+
+        Sends an ETag; If-None-Match gets a 304 while neither has changed.
         """
-        try:
-            # 1. Fetch the user object by username
-            user = CustomUser.objects.get(username=username)
-            
-            # 2. Fetch their photos, ordered by newest first
-            photos = Photo.objects.filter(uploader=user).order_by('-created_at')
-            
-            # 3. Serialize the data into JSON format
-            user_data = UserSerializer(user).data
-            # Use the photo serializer if available, otherwise return empty list
-            photos_data = PhotoSerializer(photos, many=True).data if PhotoSerializer else []
-            
+        def build():
+            user = with_profile_state(CustomUser.objects.filter(username=username), request.user).first()
+            if user is None:
+                return None
+
+            photos_url = request.build_absolute_uri(reverse('user-profile-photos', kwargs={'username': username}))
+            photos = self._photo_grid(request, user, base_url=photos_url)
+
             logger.info(f"Profile fetched: {username} by {request.user.username}")
-            
-            return Response({
-                'user': user_data,
-                'photos': photos_data
-            }, status=status.HTTP_200_OK)
-            
-        except CustomUser.DoesNotExist:
+            tokens = [feed_cache.author_token(user.pk), feed_cache.follows_token(user.pk)]
+            return {'user': ProfileSerializer(user).data, 'photos': photos}, tokens + feed_cache.photo_tokens(photos['results'])
+
+        # Cached per viewer until the user, their follows or one of their photos change (photos/cache.py)
+        data = feed_cache.cached_page('profile', request, build)
+        if data is None:
             logger.warning(f"Profile not found: {username}")
             return Response(
                 {'error': 'User not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='profile/(?P<username>[^/.]+)/photos',
+        permission_classes=[IsAuthenticated]
+    )
+    def profile_photos(self, request, username=None):
+        """
+        Later pages of a profile's photo grid (the first comes with the profile).
+        GET /api/users/profile/<username>/photos/?cursor=<from next/previous>
+        """
+        def build():
+            user = CustomUser.objects.filter(username=username).only('pk').first()
+            if user is None:
+                return None
+            data = self._photo_grid(request, user)
+            return data, [feed_cache.author_token(user.pk)] + feed_cache.photo_tokens(data['results'])
+
+        data = feed_cache.cached_page('profile', request, build)
+        if data is None:
+            return Response(
+                {'error': 'User not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(data)
     
     @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
     def follow(self, request, pk=None):
@@ -122,10 +252,17 @@ class UserViewSet(viewsets.ModelViewSet):
         
         if request.method == 'POST':
             # Create the follow relationship if it doesn't exist
-            follow, created = Follow.objects.get_or_create(
-                follower=current_user,
-                following=target_user
-            )
+            with transaction.atomic():
+                follow, created = Follow.objects.get_or_create(
+                    follower=current_user,
+                    following=target_user
+                )
+                if created:
+                    increment(CustomUser, current_user.pk, following_count=1)
+                    increment(CustomUser, target_user.pk, follower_count=1)
+                    timeline.backfill_follow(current_user, target_user)
+                    remove_suggestion(current_user, target_user)
+                    notify(target_user.pk, Notification.Verb.FOLLOW, actor_id=current_user.pk)
             
             if created:
                 logger.info(f"{current_user.username} followed {target_user.username}")
@@ -141,10 +278,17 @@ class UserViewSet(viewsets.ModelViewSet):
         
         elif request.method == 'DELETE':
             # Remove the follow relationship
-            deleted_count, _ = Follow.objects.filter(
-                follower=current_user,
-                following=target_user
-            ).delete()
+            with transaction.atomic():
+                deleted_count, _ = Follow.objects.filter(
+                    follower=current_user,
+                    following=target_user
+                ).delete()
+                if deleted_count:
+                    increment(CustomUser, current_user.pk, following_count=-deleted_count)
+                    increment(CustomUser, target_user.pk, follower_count=-deleted_count)
+                    timeline.remove_follow(current_user, target_user)
+                    # Follows are bulk-deleted with users, so no post_delete receiver (photos/signals.py)
+                    feed_cache.bump([feed_cache.follows_token(current_user.pk), feed_cache.follows_token(target_user.pk)])
             
             if deleted_count > 0:
                 logger.info(f"{current_user.username} unfollowed {target_user.username}")
@@ -177,15 +321,15 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def follow_counts(self, request, pk=None):
         """
-        Return the social stats for a user.
+        Return the social stats for a user, from the counter columns.
         - followers_count: How many people follow them.
         - following_count: How many people they follow.
         """
         user = self.get_object()
         
         return Response({
-            'followers_count': Follow.objects.filter(following=user).count(),
-            'following_count': Follow.objects.filter(follower=user).count()
+            'followers_count': user.follower_count,
+            'following_count': user.following_count
         })
     
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
@@ -252,4 +396,80 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response({
                 'error': 'Failed to recompute face encoding',
                 'encoding_status': user.encoding_status
-            }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['get', 'post'], url_path='face-references', permission_classes=[IsAuthenticated])
+    def face_references(self, request, pk=None):
+        """
+        The reference images used to recognise this user in photos.
+
+        GET: List the user's references (the profile picture is one of them).
+        POST: Upload another reference image (multipart field 'image').
+        """
+        user = self.get_object()
+
+        # Security: Only the user themselves or an Admin can see or change references
+        if request.user != user and not request.user.is_staff:
+            return Response(
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        if request.method == 'GET':
+            serializer = FaceReferenceSerializer(
+                user.face_references.all(), many=True, context={'request': request}
+            )
+            return Response(serializer.data)
+
+        max_references = getattr(settings, 'FACE_MAX_REFERENCES', 10)
+        if user.face_references.count() >= max_references:
+            return Response(
+                {'error': f'You can register at most {max_references} reference images'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = FaceReferenceSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+
+        reference, face_found = add_face_reference(user, serializer.validated_data['image'])
+        logger.info(f"Face reference {reference.id} added for {user.username} (face found: {face_found})")
+
+        return Response({
+            'reference': FaceReferenceSerializer(reference, context={'request': request}).data,
+            'face_found': face_found,
+            'encoding_status': user.encoding_status
+        }, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=True,
+        methods=['delete'],
+        url_path='face-references/(?P<reference_id>[^/.]+)',
+        permission_classes=[IsAuthenticated]
+    )
+    def delete_face_reference(self, request, pk=None, reference_id=None):
+        """
+        Remove one reference image. The user's centroid is rebuilt without it.
+        """
+        user = self.get_object()
+
+        if request.user != user and not request.user.is_staff:
+            return Response(
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        reference = user.face_references.filter(id=reference_id).first()
+        if reference is None:
+            return Response(
+                {'error': 'Reference not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        remove_face_reference(reference)
+        # Report the status the service stored, whichever instance it saved through
+        user.refresh_from_db(fields=['encoding_status'])
+
+        return Response(
+            {'message': 'Reference removed', 'encoding_status': user.encoding_status},
+            status=status.HTTP_200_OK
+        )
@@ -1,18 +1,30 @@
+# backend/warmup_gpu.py
+# Run with: python warmup_gpu.py
+#
+# Server processes warm the face engine themselves at startup (see
+# FACE_WARMUP_ON_STARTUP and /readyz). This script runs the same warm-up by
+# hand, e.g. to pre-download model packs or check that the GPU provider loads.
+
 import os
-import cv2
-import numpy as np
-from insightface.app import FaceAnalysis
+import sys
+import django
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from users.face_engine import get_warmup_state, warmup_face_engine
+
 
 def warmup():
-    print("🔥 Warming up GPU...")
-    # Initialize the app exactly how your server does
-    app = FaceAnalysis(providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
-    app.prepare(ctx_id=0, det_size=(640, 640))
-    
-    # Run a dummy inference on a tiny black square
-    dummy_img = np.zeros((640, 640, 3), dtype=np.uint8)
-    app.get(dummy_img)
-    print("✅ GPU is Hot and Ready!")
+    print("🔥 Warming up face engine...")
+    if warmup_face_engine():
+        state = get_warmup_state()
+        print(f"✅ '{state['model_version']}' is Hot and Ready! ({state['seconds']}s)")
+    else:
+        print(f"❌ Warm-up failed: {get_warmup_state()['error']}")
+        sys.exit(1)
+
 
 if __name__ == "__main__":
-    warmup()
\ No newline at end of file
+    warmup()
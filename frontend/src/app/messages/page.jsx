@@ -484,16 +484,21 @@ function NewChatModal({ conversations, onClose, onSelectUser }) {
   const [searchQuery, setSearchQuery] = useState('');
   const [creating, setCreating] = useState(null);
 
+  // The directory's first page, or search results once something is typed
   useEffect(() => {
-    fetchUsers();
-  }, []);
+    const debounceTimer = setTimeout(fetchUsers, searchQuery ? 300 : 0);
+    return () => clearTimeout(debounceTimer);
+  }, [searchQuery]);
 
   const fetchUsers = async () => {
+    setLoading(true);
     try {
-      const response = await api.get('/api/users/');
-      // Filter out current user
-      const filteredUsers = response.data.filter(u => u.id !== user?.id);
-      setUsers(filteredUsers);
+      const query = searchQuery.trim();
+      const response = query
+        ? await api.get('/api/users/search/', { params: { q: query, page_size: 20 } })
+        : await api.get('/api/users/', { params: { page_size: 20 } });
+      // Search results may include the current user
+      setUsers(response.data.results.filter(u => u.id !== user?.id));
     } catch (error) {
       console.error('Failed to fetch users:', error);
     } finally {
@@ -539,11 +544,6 @@ function NewChatModal({ conversations, onClose, onSelectUser }) {
     }
   };
 
-  const filteredUsers = users.filter(u =>
-    u.username.toLowerCase().includes(searchQuery.toLowerCase()) ||
-    `${u.first_name} ${u.last_name}`.toLowerCase().includes(searchQuery.toLowerCase())
-  );
-
   // Check if user already has a conversation
   const hasConversation = (userId) => {
     return conversations.some(conv => conv.other_participant?.id === userId);
@@ -586,9 +586,9 @@ function NewChatModal({ conversations, onClose, onSelectUser }) {
               <div className="flex justify-center py-8">
                 <Loader2 className="w-6 h-6 animate-spin text-primary" />
               </div>
-            ) : filteredUsers.length > 0 ? (
+            ) : users.length > 0 ? (
               <div className="space-y-2">
-                {filteredUsers.map((u) => {
+                {users.map((u) => {
                   const alreadyHasConv = hasConversation(u.id);
                   return (
                     <button
@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef, useCallback } from 'react';
 import { useParams, useRouter } from 'next/navigation';
 import { useAuth } from '@/context/AuthContext';
 import api from '@/lib/api';
@@ -12,6 +12,9 @@ import FollowersModal from '@/components/profile/FollowersModal';
 export default function ProfilePage() {
   const [userProfile, setUserProfile] = useState(null);
   const [photos, setPhotos] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [photoCount, setPhotoCount] = useState(0);
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('posts');
   const [isFollowing, setIsFollowing] = useState(false);
@@ -19,6 +22,7 @@ export default function ProfilePage() {
   const [followingCount, setFollowingCount] = useState(0);
   const [showFollowersModal, setShowFollowersModal] = useState(false);
   const [showFollowingModal, setShowFollowingModal] = useState(false);
+  const sentinelRef = useRef(null);
   
   const params = useParams();
   const router = useRouter();
@@ -34,31 +38,16 @@ export default function ProfilePage() {
     
     setLoading(true);
     try {
+      // One request: the user with counts and follow state, and the first page of photos
       const response = await api.get(`/api/users/profile/${username}/`);
-      setUserProfile(response.data.user);
-      setPhotos(response.data.photos || []);
-
-      const userId = response.data.user.id;
-      const isOwnProfile = loggedInUser?.username === username;
-
-      if (!isOwnProfile && userId) {
-        try {
-          const followStatusRes = await api.get(`/api/users/${userId}/follow-status/`);
-          setIsFollowing(followStatusRes.data.is_following);
-        } catch (err) {
-          console.error('Error fetching follow status:', err);
-        }
-      }
-
-      if (userId) {
-        try {
-          const countsRes = await api.get(`/api/users/${userId}/follow-counts/`);
-          setFollowerCount(countsRes.data.followers_count);
-          setFollowingCount(countsRes.data.following_count);
-        } catch (err) {
-          console.error('Error fetching follow counts:', err);
-        }
-      }
+      const { user: profile, photos: firstPage } = response.data;
+      setUserProfile(profile);
+      setIsFollowing(profile.is_following);
+      setFollowerCount(profile.follower_count);
+      setFollowingCount(profile.following_count);
+      setPhotoCount(profile.photo_count);
+      setPhotos(firstPage.results);
+      setNextUrl(firstPage.next);
     } catch (error) {
       console.error("Failed to fetch profile data:", error);
       setUserProfile(null);
@@ -81,8 +70,38 @@ export default function ProfilePage() {
     }
   };
 
+  const loadMore = useCallback(async () => {
+    if (!nextUrl || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await api.get(nextUrl);
+      setPhotos(prev => [...prev, ...response.data.results]);
+      setNextUrl(response.data.next);
+    } catch (error) {
+      console.error("Failed to load more photos:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [nextUrl, loadingMore]);
+
+  // Infinite scroll: fetch the next page when the bottom of the grid comes into view
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !nextUrl) return;
+
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries[0].isIntersecting) loadMore();
+      },
+      { rootMargin: '600px' }
+    );
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [nextUrl, loadMore, activeTab]);
+
   const handlePhotoDelete = (photoId) => {
     setPhotos(prev => prev.filter(photo => photo.id !== photoId));
+    setPhotoCount(prev => prev - 1);
   };
 
   if (loading) {
@@ -120,7 +139,7 @@ export default function ProfilePage() {
             isFollowing={isFollowing}
             followerCount={followerCount}
             followingCount={followingCount}
-            postCount={photos.length}
+            postCount={photoCount}
             onFollowToggle={handleFollowToggle}
             onFollowersClick={() => setShowFollowersModal(true)}
             onFollowingClick={() => setShowFollowingModal(true)}
@@ -173,11 +192,19 @@ export default function ProfilePage() {
 
         <div className="bg-white rounded-b-lg border-b border-x border-gray-200 p-4">
           {activeTab === 'posts' && (
-            <PhotoGrid
-              photos={photos}
-              isOwnProfile={isOwnProfile}
-              onPhotoDelete={handlePhotoDelete}
-            />
+            <>
+              {/* Grid tiles are slim; the modal shows them with the profile's owner */}
+              <PhotoGrid
+                photos={photos.map(photo => ({ ...photo, uploader: userProfile }))}
+                isOwnProfile={isOwnProfile}
+                onPhotoDelete={handlePhotoDelete}
+              />
+              {nextUrl && (
+                <div ref={sentinelRef} className="flex justify-center py-6">
+                  {loadingMore && <Loader2 className="w-6 h-6 animate-spin text-[#556B2F]" />}
+                </div>
+              )}
+            </>
           )}
           
           {activeTab === 'saved' && (
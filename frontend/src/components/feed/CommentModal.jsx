@@ -5,17 +5,37 @@
 // =======================================================================
 'use client';
 
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
 import { useAuth } from '@/context/AuthContext';
 import api from '@/lib/api';
-import { X, Send } from 'lucide-react';
+import { X, Send, Loader2 } from 'lucide-react';
 
 export default function CommentModal({ post, onClose, onCommentAdded }) {
     const { user } = useAuth();
-    const [comments, setComments] = useState(post.comments || []);
+    const [comments, setComments] = useState([]);
+    const [nextUrl, setNextUrl] = useState(null);
+    const [loading, setLoading] = useState(true);
     const [newComment, setNewComment] = useState('');
     const [isSubmitting, setIsSubmitting] = useState(false);
 
+    // Comments are paginated, oldest first
+    const loadComments = async (url) => {
+        setLoading(true);
+        try {
+            const response = await api.get(url);
+            setComments(prev => [...prev, ...response.data.results]);
+            setNextUrl(response.data.next);
+        } catch (error) {
+            console.error("Failed to load comments:", error);
+        } finally {
+            setLoading(false);
+        }
+    };
+
+    useEffect(() => {
+        loadComments(`/api/photos/${post.id}/comments/`);
+    }, [post.id]);
+
     const handleCommentSubmit = async (e) => {
         e.preventDefault();
         if (!newComment.trim()) return;
@@ -24,8 +44,9 @@ export default function CommentModal({ post, onClose, onCommentAdded }) {
         try {
             const response = await api.post('/api/comments/', { photo: post.id, text: newComment });
             const newCommentData = response.data;
-            // Update the modal's internal state
-            setComments([...comments, newCommentData]);
+            // Update the modal's internal state (only once the last page is loaded,
+            // otherwise the new comment shows up when paging reaches the end)
+            if (!nextUrl) setComments([...comments, newCommentData]);
             // Notify the parent Post component so it can update its state too
             onCommentAdded(newCommentData);
             setNewComment('');
@@ -49,7 +70,11 @@ export default function CommentModal({ post, onClose, onCommentAdded }) {
 
                 {/* Comments List (Scrollable) */}
                 <div className="flex-1 overflow-y-auto p-4 space-y-4">
-                    {comments.length > 0 ? (
+                    {loading && comments.length === 0 ? (
+                        <div className="flex justify-center py-8">
+                            <Loader2 className="w-6 h-6 text-primary animate-spin" />
+                        </div>
+                    ) : comments.length > 0 ? (
                         comments.map(comment => (
                             <div key={comment.id} className="flex items-start space-x-3">
                                 <img src={comment.user.profile_pic} alt={comment.user.username} className="w-9 h-9 rounded-full object-cover" />
@@ -67,6 +92,15 @@ export default function CommentModal({ post, onClose, onCommentAdded }) {
                     ) : (
                         <p className="text-center text-gray-500 py-8">No comments yet.</p>
                     )}
+                    {nextUrl && (
+                        <button
+                            onClick={() => loadComments(nextUrl)}
+                            disabled={loading}
+                            className="w-full text-sm text-gray-500 hover:text-gray-700 disabled:opacity-50"
+                        >
+                            {loading ? 'Loading...' : 'Load more comments'}
+                        </button>
+                    )}
                 </div>
 
                 {/* Comment Input Form (Fixed at the bottom) */}
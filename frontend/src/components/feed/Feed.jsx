@@ -4,7 +4,7 @@
 // =======================================================================
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef, useCallback } from 'react';
 import { useAuth } from '@/context/AuthContext';
 import api from '@/lib/api';
 import Post from './Post';
@@ -14,6 +14,9 @@ import { Loader2, ImageOff } from 'lucide-react';
 export default function Feed() {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const sentinelRef = useRef(null);
   const { user } = useAuth();
 
   useEffect(() => {
@@ -24,8 +27,10 @@ export default function Feed() {
       }
       setLoading(true);
       try {
-        const photosResponse = await api.get('/api/photos/');
-        setPosts(photosResponse.data);  // No reverse needed - backend handles ordering
+        // First page of the home timeline (people I follow), newest first with a cursor
+        const photosResponse = await api.get('/api/photos/home/');
+        setPosts(photosResponse.data.results);
+        setNextUrl(photosResponse.data.next);
       } catch (error) {
         console.error("Failed to fetch feed data:", error);
       } finally {
@@ -35,6 +40,35 @@ export default function Feed() {
     fetchData();
   }, [user]);
 
+  const loadMore = useCallback(async () => {
+    if (!nextUrl || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await api.get(nextUrl);
+      setPosts(prev => [...prev, ...response.data.results]);
+      setNextUrl(response.data.next);
+    } catch (error) {
+      console.error("Failed to load more posts:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [nextUrl, loadingMore]);
+
+  // Infinite scroll: fetch the next page when the bottom of the feed comes into view
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !nextUrl) return;
+
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries[0].isIntersecting) loadMore();
+      },
+      { rootMargin: '600px' }
+    );
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [nextUrl, loadMore]);
+
   if (loading) {
     return (
       <div className="w-full flex items-center justify-center py-20">
@@ -61,6 +95,13 @@ export default function Feed() {
               uploader={post.uploader}
             />
           ))}
+
+          {/* Infinite scroll sentinel */}
+          {nextUrl && (
+            <div ref={sentinelRef} className="flex justify-center py-6">
+              {loadingMore && <Loader2 className="w-8 h-8 text-primary animate-spin" />}
+            </div>
+          )}
         </div>
       ) : (
         /* Empty State */
@@ -18,7 +18,8 @@ export default function Moments() {
     const fetchMomentsData = async () => {
       setLoading(true);
       try {
-        const response = await api.get('/api/users/');
+        // People you may know (never includes the current user)
+        const response = await api.get('/api/users/suggestions/', { params: { limit: 20 } });
         
         // Create "Your Story" moment
         const currentUserMoment = {
@@ -29,9 +30,7 @@ export default function Moments() {
         };
 
         // Get other users
-        const otherUsers = response.data
-          .filter(u => u.username !== currentUser.username)
-          .map(u => ({ ...u, isYou: false }));
+        const otherUsers = response.data.map(s => ({ ...s.user, isYou: false }));
 
         setMoments([currentUserMoment, ...otherUsers]);
 
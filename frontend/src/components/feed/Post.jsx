@@ -11,8 +11,11 @@ import CommentModal from './CommentModal';
 export default function Post({ post, uploader }) {
   const { user } = useAuth();
   const router = useRouter();
-  const [likes, setLikes] = useState(post.likes || []);
-  const [comments, setComments] = useState(post.comments || []);
+  // The feed carries a summary; the full lists load on demand in CommentModal
+  const [hasLiked, setHasLiked] = useState(post.liked_by_me || false);
+  const [likeCount, setLikeCount] = useState(post.like_count || 0);
+  const [commentCount, setCommentCount] = useState(post.comment_count || 0);
+  const [latestComments, setLatestComments] = useState(post.latest_comments || []);
   const [isCommentModalOpen, setCommentModalOpen] = useState(false);
 
   // Early returns for invalid props
@@ -20,11 +23,6 @@ export default function Post({ post, uploader }) {
     return null;
   }
 
-  // ✅ Safe check for hasLiked
-  const hasLiked = user 
-    ? likes.some(like => like.user?.id === user.id)
-    : false;
-
   // ✅ Safe like handler
   const handleLike = async () => {
     if (!user) {
@@ -33,16 +31,11 @@ export default function Post({ post, uploader }) {
     }
 
     try {
-      if (hasLiked) {
-        const like = likes.find(like => like.user.id === user.id);
-        if (like) {
-          await api.delete(`/api/likes/${like.id}/`);
-          setLikes(likes.filter(l => l.id !== like.id));
-        }
-      } else {
-        const response = await api.post('/api/likes/', { photo: post.id });
-        setLikes([...likes, response.data]);
-      }
+      const response = hasLiked
+        ? await api.delete(`/api/photos/${post.id}/like/`)
+        : await api.post(`/api/photos/${post.id}/like/`);
+      setHasLiked(response.data.liked);
+      setLikeCount(response.data.like_count);
     } catch (error) {
       console.error('Failed to toggle like:', error);
       // Optionally show error toast
@@ -59,7 +52,8 @@ export default function Post({ post, uploader }) {
   };
 
   const handleCommentAdded = (newComment) => {
-    setComments([...comments, newComment]);
+    setCommentCount(count => count + 1);
+    setLatestComments(prev => [...prev, newComment].slice(-2));
   };
 
   const handleProfileClick = () => {
@@ -168,20 +162,11 @@ export default function Post({ post, uploader }) {
           </div>
 
           {/* Likes Count */}
-          {likes.length > 0 && (
+          {likeCount > 0 && (
             <div className="flex items-center space-x-2">
-              {likes.length === 1 ? (
-                <p className="text-sm">
-                  <span className="font-semibold text-gray-900">
-                    {likes[0].user?.username || 'Someone'}
-                  </span>
-                  <span className="text-gray-600"> liked this</span>
-                </p>
-              ) : (
-                <p className="text-sm font-semibold text-gray-900">
-                  {likes.length.toLocaleString()} likes
-                </p>
-              )}
+              <p className="text-sm font-semibold text-gray-900">
+                {likeCount === 1 ? '1 like' : `${likeCount.toLocaleString()} likes`}
+              </p>
             </div>
           )}
 
@@ -199,18 +184,18 @@ export default function Post({ post, uploader }) {
           )}
 
           {/* Comments Preview */}
-          {comments.length > 0 && (
+          {commentCount > 0 && (
             <div className="space-y-1 md:space-y-2">
-              {comments.length > 2 && (
+              {commentCount > latestComments.length && (
                 <button 
                   onClick={handleOpenComments}
                   className="text-sm text-gray-500 hover:text-gray-700 transition-colors"
                 >
-                  View all {comments.length} comments
+                  View all {commentCount.toLocaleString()} comments
                 </button>
               )}
               
-              {comments.slice(0, 2).map(comment => (
+              {latestComments.map(comment => (
                 <div key={comment.id} className="text-sm">
                   <span className="font-semibold text-gray-900 mr-2">
                     {comment.user?.username || 'Unknown'}
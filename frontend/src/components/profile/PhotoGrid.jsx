@@ -62,11 +62,11 @@ export default function PhotoGrid({ photos, isOwnProfile, onPhotoDelete }) {
                 <div className="absolute inset-0 bg-black bg-opacity-40 flex items-center justify-center gap-6 transition-opacity">
                   <div className="flex items-center gap-2 text-white font-semibold">
                     <Heart className="w-5 h-5 fill-white" />
-                    <span>{photo.likes_count || 0}</span>
+                    <span>{photo.like_count || 0}</span>
                   </div>
                   <div className="flex items-center gap-2 text-white font-semibold">
                     <MessageCircle className="w-5 h-5 fill-white" />
-                    <span>{photo.comments_count || 0}</span>
+                    <span>{photo.comment_count || 0}</span>
                   </div>
                 </div>
               )}
@@ -215,7 +215,7 @@ export default function PhotoModal({ photo, isOwnProfile, onClose, onDelete }) {
             {/* Like Count */}
             <div className="px-4 pb-2">
               <button className="font-semibold text-sm hover:text-gray-600">
-                {photo.likes_count || 0} likes
+                {photo.like_count || 0} likes
               </button>
             </div>
 
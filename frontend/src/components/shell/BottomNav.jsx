@@ -8,11 +8,11 @@ import { useState, useEffect } from 'react';
 import Link from 'next/link';
 import { usePathname, useRouter } from 'next/navigation';
 import { useAuth } from '@/context/AuthContext';
+import { useChat } from '@/context/ChatContext';
 import { LayoutGrid, Sparkles, PlusSquare, ShieldCheck, User } from 'lucide-react';
 import UploadModal from '@/components/upload/UploadModal';
 import UploadToast from '@/components/upload/UploadToast';
 import ConsentModal from '@/components/consent/ConsentModal';
-import api from '@/lib/api';
 
 export default function BottomNav() {
   const pathname = usePathname();
@@ -22,7 +22,8 @@ export default function BottomNav() {
   const [isUploadModalOpen, setUploadModalOpen] = useState(false);
   const [isConsentModalOpen, setConsentModalOpen] = useState(false);
   const [uploadStatus, setUploadStatus] = useState(null);
-  const [pendingCount, setPendingCount] = useState(0);
+  // Pushed over the WebSocket, no polling
+  const { pendingConsentCount: pendingCount, refreshPendingConsentCount } = useChat();
 
   // Update active tab based on pathname
   useEffect(() => {
@@ -31,24 +32,6 @@ export default function BottomNav() {
     else if (pathname.startsWith('/profile')) setActiveTab('profile');
   }, [pathname]);
 
-  // Fetch pending consent count
-  useEffect(() => {
-    const fetchPendingCount = async () => {
-      if (!user) return;
-      try {
-        const res = await api.get('/api/consent-requests/');
-        const pending = res.data.filter(r => r.status === 'PENDING').length;
-        setPendingCount(pending);
-      } catch (error) {
-        console.error('Failed to fetch consent count:', error);
-      }
-    };
-
-    fetchPendingCount();
-    const interval = setInterval(fetchPendingCount, 30000);
-    return () => clearInterval(interval);
-  }, [user]);
-
   const handleUploadStart = (status) => {
     setUploadStatus(status);
     if (status === 'success' || status === 'error') {
@@ -256,15 +239,8 @@ export default function BottomNav() {
           isOpen={isConsentModalOpen}
           onClose={() => {
             setConsentModalOpen(false);
-            // Refresh consent count
-            if (user) {
-              api.get('/api/consent-requests/')
-                .then(res => {
-                  const pending = res.data.filter(r => r.status === 'PENDING').length;
-                  setPendingCount(pending);
-                })
-                .catch(err => console.error('Failed to refresh count:', err));
-            }
+            // Normally already pushed; re-read in case the socket is down
+            if (user) refreshPendingConsentCount();
           }} 
         />
       )}
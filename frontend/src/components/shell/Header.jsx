@@ -48,13 +48,10 @@ export default function Header() {
 
       setIsSearching(true);
       try {
-        const response = await api.get('/api/users/');
-        const filtered = response.data.filter(user =>
-          user.username.toLowerCase().includes(searchQuery.toLowerCase()) ||
-          (user.first_name && user.first_name.toLowerCase().includes(searchQuery.toLowerCase())) ||
-          (user.last_name && user.last_name.toLowerCase().includes(searchQuery.toLowerCase()))
-        );
-        setSearchResults(filtered.slice(0, 10)); // Limit to 10 results
+        const response = await api.get('/api/users/search/', {
+          params: { q: searchQuery.trim(), page_size: 10 },
+        });
+        setSearchResults(response.data.results);
       } catch (error) {
         console.error('Search failed:', error);
         setSearchResults([]);
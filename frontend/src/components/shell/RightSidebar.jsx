@@ -5,39 +5,51 @@ import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import { Bell, Check, X, ShieldCheck, UserPlus, AlertCircle } from 'lucide-react';
 import { useAuth } from '@/context/AuthContext';
+import { useChat } from '@/context/ChatContext';
 import api from '@/lib/api';
 import ConsentModal from '@/components/consent/ConsentModal';
 
 export default function RightSidebar() {
   const { user } = useAuth();
+  const { pendingConsentCount } = useChat();
   const router = useRouter();
   const [consentRequests, setConsentRequests] = useState([]);
   const [suggestions, setSuggestions] = useState([]);
   const [loading, setLoading] = useState(true);
   const [isConsentModalOpen, setConsentModalOpen] = useState(false);
 
+  // The preview follows the pushed count, so new requests show up without polling
   useEffect(() => {
-    const fetchSidebarData = async () => {
+    const fetchConsentRequests = async () => {
       if (!user) return;
-      
-      try {
-        // Fetch consent requests
-        const consentRes = await api.get('/api/consent-requests/');
-        const pending = consentRes.data.filter(r => r.status === 'PENDING');
-        setConsentRequests(pending.slice(0, 3));
 
-        // Fetch user suggestions
-        const usersRes = await api.get('/api/users/');
-        const otherUsers = usersRes.data.filter(u => u.username !== user.username);
-        setSuggestions(otherUsers.slice(0, 3));
+      try {
+        const consentRes = await api.get('/api/consent-requests/?status=PENDING');
+        setConsentRequests(consentRes.data.slice(0, 3));
       } catch (error) {
-        console.error('Failed to fetch sidebar data:', error);
+        console.error('Failed to fetch consent requests:', error);
       } finally {
         setLoading(false);
       }
     };
 
-    fetchSidebarData();
+    fetchConsentRequests();
+  }, [user, pendingConsentCount]);
+
+  useEffect(() => {
+    const fetchSuggestions = async () => {
+      if (!user) return;
+      
+      try {
+        // Precomputed server-side: friends of friends, then popular accounts
+        const res = await api.get('/api/users/suggestions/', { params: { limit: 3 } });
+        setSuggestions(res.data.map(s => ({ ...s.user, mutual_count: s.mutual_count })));
+      } catch (error) {
+        console.error('Failed to fetch sidebar data:', error);
+      }
+    };
+
+    fetchSuggestions();
   }, [user]);
 
   const handleConsentAction = async (id, status) => {
@@ -71,11 +83,11 @@ export default function RightSidebar() {
             className="relative p-2 rounded-full hover:bg-background transition-colors group"
           >
             <Bell className="w-5 h-5 text-primary group-hover:scale-110 transition-transform" />
-            {consentRequests.length > 0 && (
+            {pendingConsentCount > 0 && (
               <>
                 <span className="absolute top-1 right-1 block h-2.5 w-2.5 rounded-full bg-red-500 animate-pulse"></span>
                 <span className="absolute top-0 right-0 h-5 w-5 rounded-full bg-red-500 text-white text-[10px] font-bold flex items-center justify-center">
-                  {consentRequests.length}
+                  {pendingConsentCount}
                 </span>
               </>
             )}
@@ -96,7 +108,7 @@ export default function RightSidebar() {
                   onClick={() => setConsentModalOpen(true)}
                   className="text-xs font-bold text-primary hover:text-dark-accent transition-colors"
                 >
-                  View All ({consentRequests.length})
+                  View All ({pendingConsentCount})
                 </button>
               )}
             </div>
@@ -114,12 +126,12 @@ export default function RightSidebar() {
                     onClick={() => setConsentModalOpen(true)}
                   />
                 ))}
-                {consentRequests.length > 2 && (
+                {pendingConsentCount > 2 && (
                   <button 
                     onClick={() => setConsentModalOpen(true)}
                     className="w-full py-2 text-xs font-semibold text-primary hover:bg-primary/5 rounded-lg transition-colors"
                   >
-                    + {consentRequests.length - 2} more request{consentRequests.length - 2 !== 1 ? 's' : ''}
+                    + {pendingConsentCount - 2} more request{pendingConsentCount - 2 !== 1 ? 's' : ''}
                   </button>
                 )}
               </>
@@ -263,7 +275,9 @@ const SuggestionItem = ({ user }) => {
         <div className="flex-1 min-w-0">
           <p className="font-semibold text-sm text-gray-800 truncate">{user.username}</p>
           <p className="text-xs text-gray-500 truncate">
-            {user.bio || 'New to SEC-UR Privacy'}
+            {user.mutual_count > 0
+              ? `Followed by ${user.mutual_count} you follow`
+              : 'Popular on SEC-UR Privacy'}
           </p>
         </div>
       </div>
@@ -1,40 +1,23 @@
 // frontend/src/components/shell/Sidebar.jsx
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState } from 'react';
 import Link from 'next/link';
 import { usePathname } from 'next/navigation';
 import { useAuth } from '@/context/AuthContext';
+import { useChat } from '@/context/ChatContext';
 import { mainNavItems, userNavItems, logoutNavItem } from '@/config/nav';
 import { PlusSquare, User, Bell } from 'lucide-react';
-import api from '@/lib/api';
 import ConsentModal from '@/components/consent/ConsentModal';
 
 export default function Sidebar({ onUploadClick }) {
   const { user, logoutUser } = useAuth();
   const pathname = usePathname();
   const [isConsentModalOpen, setConsentModalOpen] = useState(false);
-  const [pendingCount, setPendingCount] = useState(0);
+  // Pushed over the WebSocket, no polling
+  const { pendingConsentCount: pendingCount, refreshPendingConsentCount } = useChat();
   const [hoveredItem, setHoveredItem] = useState(null);
 
-  // Fetch pending consent count
-  useEffect(() => {
-    const fetchPendingCount = async () => {
-      if (!user) return;
-      try {
-        const res = await api.get('/api/consent-requests/');
-        const pending = res.data.filter(r => r.status === 'PENDING').length;
-        setPendingCount(pending);
-      } catch (error) {
-        console.error('Failed to fetch consent count:', error);
-      }
-    };
-
-    fetchPendingCount();
-    const interval = setInterval(fetchPendingCount, 30000);
-    return () => clearInterval(interval);
-  }, [user]);
-
   const handleNavItemClick = (item) => {
     if (item.modal === 'consent') {
       setConsentModalOpen(true);
@@ -178,15 +161,8 @@ export default function Sidebar({ onUploadClick }) {
         isOpen={isConsentModalOpen} 
         onClose={() => {
           setConsentModalOpen(false);
-          // Refresh count after closing modal
-          if (user) {
-            api.get('/api/consent-requests/')
-              .then(res => {
-                const pending = res.data.filter(r => r.status === 'PENDING').length;
-                setPendingCount(pending);
-              })
-              .catch(err => console.error('Failed to refresh count:', err));
-          }
+          // Normally already pushed; re-read in case the socket is down
+          if (user) refreshPendingConsentCount();
         }} 
       />
     </>
@@ -3,6 +3,7 @@
 
 import { createContext, useContext, useState, useEffect, useRef } from 'react';
 import { useAuth } from './AuthContext';
+import api from '@/lib/api';
 
 const ChatContext = createContext(null);
 
@@ -13,6 +14,9 @@ export const ChatProvider = ({ children }) => {
   const [conversations, setConversations] = useState([]);
   const [connectionStatus, setConnectionStatus] = useState('disconnected');
   const [typingUsers, setTypingUsers] = useState({});
+  // Pending consent requests, for the navigation badges; kept current by
+  // 'consent_count' events, re-read on every (re)connect to catch up
+  const [pendingConsentCount, setPendingConsentCount] = useState(0);
   const reconnectTimeoutRef = useRef(null);
 
   // Connect WebSocket when user is authenticated
@@ -35,6 +39,15 @@ export const ChatProvider = ({ children }) => {
     };
   }, [user]);
 
+  const refreshPendingConsentCount = async () => {
+    try {
+      const res = await api.get('/api/consent-requests/pending-count/');
+      setPendingConsentCount(res.data.pending);
+    } catch (error) {
+      console.error('Failed to fetch consent count:', error);
+    }
+  };
+
   const connectWebSocket = () => {
     // Get token from localStorage (same way your api.js does it)
     const token = localStorage.getItem('access_token');
@@ -56,6 +69,7 @@ export const ChatProvider = ({ children }) => {
       console.log('✅ WebSocket Connected');
       setConnectionStatus('connected');
       setSocket(ws);
+      refreshPendingConsentCount();
     };
 
     ws.onmessage = (event) => {
@@ -76,6 +90,10 @@ export const ChatProvider = ({ children }) => {
           handleTypingIndicator(data);
           break;
 
+        case 'consent_count':
+          setPendingConsentCount(data.pending);
+          break;
+
         case 'messages_marked_read':
           console.log('✓ Messages marked as read:', data);
           break;
@@ -187,6 +205,8 @@ export const ChatProvider = ({ children }) => {
     sendMessage,
     sendTypingIndicator,
     markAsRead,
+    pendingConsentCount,
+    refreshPendingConsentCount,
     reconnect: connectWebSocket,
   };
 